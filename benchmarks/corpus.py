@@ -0,0 +1,106 @@
+"""
+Benchmark corpus: for every solver mode, small / medium / adversarial cases.
+
+Each case is (subject, query, options). "algebra" has no subject of its own
+in the API, so it is benchmarked through algebra.dispatch directly only.
+"""
+from typing import Any, Dict, List, Tuple
+
+Case = Tuple[str, str, Dict[str, Any]]
+
+def _matrix(n: int, seed: int = 7) -> str:
+    # Deterministic integer matrix without importing random state from callers
+    rows = []
+    v = seed
+    for _ in range(n):
+        row = []
+        for _ in range(n):
+            v = (v * 1103515245 + 12345) % 2**31
+            row.append(str(v % 19 - 9))
+        rows.append("[" + ",".join(row) + "]")
+    return "[" + ",".join(rows) + "]"
+
+def _float_matrix(n: int, seed: int = 11) -> str:
+    rows = []
+    v = seed
+    for _ in range(n):
+        row = []
+        for _ in range(n):
+            v = (v * 1103515245 + 12345) % 2**31
+            row.append(f"{(v % 2000) / 100 - 10:.2f}")
+        rows.append("[" + ",".join(row) + "]")
+    return "[" + ",".join(rows) + "]"
+
+CORPUS: Dict[str, Dict[str, List[Case]]] = {
+    "auto": {
+        "small": [("calc1", "x^2 * sin(x)", {}), ("la", "[[1,2],[3,4]]", {}), ("discrete", "C(10, 3)", {})],
+        "medium": [("calc2", "\\int x e^{x} dx", {}), ("discrete", "(A & B) | (~A & C) | (B & C)", {})],
+        "adversarial": [("calc1", "sin(cos(tan(x^3 + exp(x^2))))^5", {})],
+    },
+    "algebra": {
+        "small": [("algebra", "(x + 1)^2", {}), ("algebra", "x^2 - 1", {})],
+        "medium": [("algebra", "(x + y)^5 * (x - y)^3", {})],
+        "adversarial": [("algebra", "(x + y + z + 1)^12", {})],
+    },
+    "derivative": {
+        "small": [("calc1", "x^2 * sin(x)", {}), ("calc1", "sin(x^2)", {}), ("calc1", "(x^2 + 1) / (x - 1)", {})],
+        "medium": [("calc1", "exp(sin(x)) * log(x^2 + 1) / sqrt(x)", {}), ("calc1", "atan(x^3) * cosh(2*x)^2", {})],
+        "adversarial": [("calc1", "x^x^x * sin(cos(tan(x)))^7 / (1 + exp(x^5))^3", {})],
+    },
+    "integral": {
+        "small": [("calc2", "x * exp(x)", {}), ("calc2", "sin(x) * cos(x)", {}), ("calc2", "3*x^2 + 2*x", {})],
+        "medium": [("calc2", "x^3 * log(x)^2", {}), ("calc2", "1 / (x^3 + 1)", {}),
+                   ("calc2", "exp(-x^2)", {"definite": True, "lower": 0, "upper": 1})],
+        "adversarial": [("calc2", "sqrt(tan(x))", {}), ("calc2", "exp(x^2) * log(x) / (1 + x^4)", {})],
+    },
+    "limit": {
+        "small": [("calc1", "sin(x)/x", {"point": 0}), ("calc1", "(3*x^2 + 2*x) / (x^2 - 1)", {"point": "oo"})],
+        "medium": [("calc1", "(1 + 1/x)^x", {"point": "oo"}), ("calc1", "(tan(x) - sin(x)) / x^3", {"point": 0})],
+        "adversarial": [("calc1", "(sin(tan(x)) - tan(sin(x))) / x^7", {"point": 0})],
+    },
+    "series": {
+        "small": [("calc2", "exp(x)", {}), ("calc2", "sin(x)", {"n": 8})],
+        "medium": [("calc2", "log(1 + x) / (1 - x)", {"n": 10}), ("calc2", "tan(x)", {"n": 12})],
+        "adversarial": [("calc2", "exp(sin(x)) * sqrt(1 + x)", {"n": 20})],
+    },
+    "ode": {
+        "small": [("calc2", "Derivative(y(x), x) - y(x)", {})],
+        "medium": [("calc2", "Derivative(y(x), x, 2) + 4*y(x) - sin(x)", {})],
+        "adversarial": [("calc2", "Derivative(y(x), x, 2) + x*Derivative(y(x), x) + y(x) - exp(x)", {})],
+    },
+    "rref": {
+        "small": [("la", "[[1,2,1],[2,4,0],[3,6,3]]", {}), ("la", "[[1,2],[3,4]]", {"trace": True})],
+        "medium": [("la", _matrix(10), {}), ("la", _matrix(10), {"trace": True})],
+        "adversarial": [("la", _matrix(40), {}), ("la", _float_matrix(50), {})],
+    },
+    "eigen": {
+        "small": [("la", "[[2,1],[1,2]]", {})],
+        "medium": [("la", "[[4,1,0],[1,3,1],[0,1,2]]", {}), ("la", _float_matrix(20), {})],
+        "adversarial": [("la", _matrix(6), {"engine": "exact"}), ("la", _matrix(50), {})],
+    },
+    "det": {
+        "small": [("la", "[[1,2,3],[4,5,6],[7,8,9]]", {})],
+        "medium": [("la", _matrix(12), {}), ("la", "[[a,b,c],[d,e,f],[g,h,i]]", {})],
+        "adversarial": [("la", _matrix(40), {}), ("la", _float_matrix(50), {})],
+    },
+    "nullspace": {
+        "small": [("la", "[[1,2,1],[2,4,0],[3,6,3]]", {})],
+        "medium": [("la", "[[1,2,3,4,5],[2,4,6,8,10],[1,0,1,0,1]]", {}), ("la", _matrix(10), {})],
+        "adversarial": [("la", _matrix(40), {}), ("la", _float_matrix(50), {"engine": "numeric"})],
+    },
+    "logic": {
+        "small": [("discrete", "!(A & B)", {}), ("discrete", "A | (A & B)", {})],
+        "medium": [("discrete", "(A & B) | (~A & C) | (B & C) | (D & ~E)", {})],
+        "adversarial": [("discrete", " | ".join(f"(x{i} & ~x{i + 1})" for i in range(10)), {})],
+    },
+    "combinatorics": {
+        "small": [("discrete", "C(10, 3)", {}), ("discrete", "P(10, 3)", {})],
+        "medium": [("discrete", "C(1000, 500)", {}), ("discrete", "P(2000, 1000)", {})],
+        "adversarial": [("discrete", "P(100000, 50000)", {})],
+    },
+    "recurrence": {
+        "small": [("discrete", "a(n) = a(n-1) + a(n-2), a(0) = 0, a(1) = 1", {})],
+        "medium": [("discrete", "a(n) = 3*a(n-1) - 2*a(n-2) + n, a(0) = 1, a(1) = 2", {})],
+        "adversarial": [("discrete", "a(n) = a(n-1) + a(n-2), a(0) = 0, a(1) = 1", {"term": 1000000})],
+    },
+}
@@ -0,0 +1,191 @@
+"""
+Benchmark every solver mode and compare against a saved baseline.
+
+    python -m benchmarks.run                          # direct + app, all tiers
+    python -m benchmarks.run --via direct --tiers small,medium
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.25
+
+"direct" calls each solver module's dispatch on a pre-parsed query; "app"
+posts to /api/solve through the FastAPI app with the result cache and the
+precomputed store disabled. Exits with status 1 when a group's p95 regresses
+past the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Measure real solver work, not cache hits
+os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
+os.environ.setdefault("PRECOMPUTED_ENABLED", "false")
+
+from benchmarks.corpus import CORPUS, Case  # noqa: E402
+
+TIERS = ("small", "medium", "adversarial")
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of the samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this whole process so far; it only grows, so it is not per group."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def run_direct(mode: str, case: Case, timeout: float) -> Dict[str, Any]:
+    from server.solvers import dispatch
+    from server.solvers.utils.budget import BudgetExceeded, enable_interrupts, time_budget
+    from server.solvers.utils.classify import classify_query
+    from server.solvers.utils.parse import parse_query
+
+    # Direct runs stand in for a pool worker: solves on the main thread, under SIGALRM budgets
+    enable_interrupts()
+    subject, query, options = case
+    parse_subject = "calc1" if subject == "algebra" else subject
+    qc = classify_query(parse_subject, query, mode)
+    expr, _ = parse_query(parse_subject, qc.query, options, fmt=qc.format)
+
+    t0 = time.perf_counter()
+    try:
+        with time_budget(timeout):
+            resp = dispatch(subject, expr, qc.mode, options)
+            resp.model_dump()  # include lazy LaTeX rendering
+    except BudgetExceeded:
+        return {"ms": (time.perf_counter() - t0) * 1000, "ok": False, "steps": 0, "timed_out": True}
+    return {"ms": (time.perf_counter() - t0) * 1000, "ok": resp.ok, "steps": len(resp.steps), "timed_out": False}
+
+def run_app(client: Any, mode: str, case: Case) -> Optional[Dict[str, Any]]:
+    subject, query, options = case
+    if subject == "algebra":
+        return None  # not reachable through the API's subjects
+    t0 = time.perf_counter()
+    r = client.post("/api/solve", json={"subject": subject, "query": query, "mode": mode, "options": options})
+    ms = (time.perf_counter() - t0) * 1000
+    body = r.json() if r.status_code == 200 else {}
+    return {
+        "ms": ms,
+        "ok": bool(body.get("ok")),
+        "steps": len(body.get("steps", [])),
+        "timed_out": bool(body.get("timed_out")),
+    }
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    times = [r["ms"] for r in runs]
+    return {
+        "n": len(runs),
+        "p50_ms": round(percentile(times, 50), 3),
+        "p95_ms": round(percentile(times, 95), 3),
+        "p99_ms": round(percentile(times, 99), 3),
+        "max_ms": round(max(times), 3) if times else 0.0,
+        "mean_steps": round(sum(r["steps"] for r in runs) / len(runs), 2) if runs else 0.0,
+        "failures": sum(1 for r in runs if not r["ok"]),
+        "timeouts": sum(1 for r in runs if r["timed_out"]),
+    }
+
+def benchmark(vias: List[str], tiers: List[str], modes: List[str], repeat: int, timeout: float) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    client = None
+    if "app" in vias:
+        from fastapi.testclient import TestClient
+        from server.main import app, startup
+        client = TestClient(app)
+        client.__enter__()
+        startup.wait()  # time warm requests, as a load balancer would only route them
+    try:
+        for via in vias:
+            for mode in modes:
+                for tier in tiers:
+                    cases = CORPUS.get(mode, {}).get(tier, [])
+                    if not cases:
+                        continue
+                    runs = []
+                    for case in cases:
+                        for _ in range(repeat):
+                            run = run_direct(mode, case, timeout) if via == "direct" else run_app(client, mode, case)
+                            if run is not None:
+                                runs.append(run)
+                    if runs:
+                        key = f"{via}/{mode}/{tier}"
+                        results[key] = summarize(runs)
+                        s = results[key]
+                        print(f"{key:40s} p50 {s['p50_ms']:9.2f}  p95 {s['p95_ms']:9.2f}  p99 {s['p99_ms']:9.2f} ms"
+                              f"  steps {s['mean_steps']:6.1f}  fail {s['failures']}")
+    finally:
+        if client is not None:
+            client.__exit__(None, None, None)
+    return results
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float, min_ms: float) -> List[str]:
+    """Groups whose p95 grew by more than `threshold` (and `min_ms`) over the baseline."""
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        cur = results.get(key)
+        if cur is None:
+            continue
+        before, after = base["p95_ms"], cur["p95_ms"]
+        if after > before * (1 + threshold) and after - before > min_ms:
+            regressions.append(f"{key}: p95 {before:.2f} -> {after:.2f} ms (+{(after / before - 1) * 100 if before else float('inf'):.0f}%)")
+        if cur["failures"] > base.get("failures", 0):
+            regressions.append(f"{key}: failures {base.get('failures', 0)} -> {cur['failures']}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SigmaLearn solver benchmarks")
+    parser.add_argument("--via", default="direct,app", help="comma-separated: direct, app")
+    parser.add_argument("--tiers", default=",".join(TIERS), help="comma-separated: small, medium, adversarial")
+    parser.add_argument("--modes", default=",".join(CORPUS), help="comma-separated solver modes")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-call budget in seconds for direct runs")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="write results as a new baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed fractional p95 growth")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore regressions smaller than this")
+    args = parser.parse_args(argv)
+
+    vias = [v for v in args.via.split(",") if v]
+    tiers = [t for t in args.tiers.split(",") if t]
+    modes = [m for m in args.modes.split(",") if m]
+    results = benchmark(vias, tiers, modes, args.repeat, args.timeout)
+    process_peak_rss_mb = round(peak_rss_mb(), 1)
+    print(f"\nProcess peak RSS {process_peak_rss_mb} MB")
+
+    if args.save_baseline:
+        import sympy
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "sympy": sympy.__version__,
+                    "machine": platform.machine(),
+                    "repeat": args.repeat,
+                    "process_peak_rss_mb": process_peak_rss_mb,
+                },
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
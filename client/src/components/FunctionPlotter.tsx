@@ -6,6 +6,7 @@ import { Button } from "@/components/ui/button";
 import { Label } from "@/components/ui/label";
 import { TrendingUp } from "lucide-react";
 import { create, all } from "mathjs";
+import { sample, decodeSamples } from "@/lib/api";
 
 interface FunctionPlotterProps {
   initialFunction?: string;
@@ -17,7 +18,7 @@ export function FunctionPlotter({ initialFunction = "x^2" }: FunctionPlotterProp
   const [functionExpr, setFunctionExpr] = useState(initialFunction);
   const [xMin, setXMin] = useState(-10);
   const [xMax, setXMax] = useState(10);
-  const [plotData, setPlotData] = useState<{x: number[], y: number[]} | null>(null);
+  const [plotData, setPlotData] = useState<{x: number[], y: (number | null)[]} | null>(null);
   const [error, setError] = useState<string>("");
 
   const evaluateFunction = (expr: string, x: number): number | null => {
@@ -36,9 +37,21 @@ export function FunctionPlotter({ initialFunction = "x^2" }: FunctionPlotterProp
     }
   };
 
-  const generatePlot = () => {
+  const generatePlot = async () => {
     setError("");
     
+    // The server samples adaptively (dense near jumps and poles, sparse where flat)
+    try {
+      const resp = await sample({ query: functionExpr, x_min: xMin, x_max: xMax });
+      if (resp.ok) {
+        const { x, y } = decodeSamples(resp);
+        setPlotData({ x, y: y.map((v) => (v !== null && Math.abs(v) < 1000 ? v : null)) });
+        return;
+      }
+    } catch (err) {
+      console.warn("Sampling endpoint unavailable, plotting locally", err);
+    }
+    
     try {
       const numPoints = 200;
       const step = (xMax - xMin) / numPoints;
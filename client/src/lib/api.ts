@@ -1,4 +1,4 @@
-import { SolveRequest, SolveResponse, OcrResponse } from "@shared/schema";
+import { SolveRequest, SolveResponse, OcrResponse, SampleRequest, SampleResponse } from "@shared/schema";
 
 export const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000/api";
 
@@ -39,6 +39,41 @@ export async function solve(body: SolveRequest): Promise<SolveResponse> {
   }
 }
 
+export async function sample(body: SampleRequest): Promise<SampleResponse> {
+  const response = await fetch(`${API_BASE}/sample`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  
+  if (!response.ok) {
+    throw new Error(await response.text());
+  }
+  
+  return await response.json();
+}
+
+// x and y arrays of a delta-encoded sample response (null y marks a gap)
+export function decodeSamples(resp: SampleResponse): { x: number[]; y: (number | null)[] } {
+  const { x_start, x_step, x_deltas, y_step, y_deltas } = resp.data;
+  const digits = Math.max(0, -Math.floor(Math.log10(y_step)));
+  const x: number[] = [];
+  const y: (number | null)[] = [];
+  let k = 0;
+  let q = 0;
+  for (let i = 0; i < x_deltas.length; i++) {
+    k += x_deltas[i];
+    x.push(x_start + k * x_step);
+    if (y_deltas[i] === null) {
+      y.push(null);
+    } else {
+      q += y_deltas[i];
+      y.push(Number((q * y_step).toFixed(digits)));
+    }
+  }
+  return { x, y };
+}
+
 export async function ocrToLatex(file: File): Promise<OcrResponse> {
   try {
     const formData = new FormData();
@@ -51,6 +51,7 @@ export const EXAMPLES: Record<SubjectKey, Example[]> = {
       title: "Limit at Infinity",
       query: "(3*x^2 + 2*x) / (x^2 - 1)",
       mode: "limit",
+      options: { point: "oo" },
       description: "Evaluate limit as x approaches infinity",
     },
   ],
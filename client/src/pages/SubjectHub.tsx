@@ -23,6 +23,7 @@ export default function SubjectHub() {
   const [topics, setTopics] = useState<Topic[]>([]);
   const [loading, setLoading] = useState(true);
   const [query, setQuery] = useState("");
+  const [example, setExample] = useState<Example | null>(null);
   const [solving, setSolving] = useState(false);
   const [solution, setSolution] = useState<SolveResponse | null>(null);
   const [error, setError] = useState<string | null>(null);
@@ -44,11 +45,15 @@ export default function SubjectHub() {
     setError(null);
     setSolution(null);
     
+    // An unedited example is solved the way it was curated (and precomputed)
+    const curated = example !== null && example.query === query.trim() ? example : null;
+    
     try {
       const response = await solve({
         subject: subject.key as SubjectKey,
         query: query.trim(),
-        mode: "auto",
+        mode: curated?.mode ?? "auto",
+        options: curated?.options,
       });
       
       if (!response.ok) {
@@ -65,6 +70,7 @@ export default function SubjectHub() {
 
   const handleSelectExample = (example: Example) => {
     setQuery(example.query);
+    setExample(example);
     setSolution(null);
     setError(null);
   };
@@ -0,0 +1,150 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict
+
+from server.solvers.utils.trace import span
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot get a solver slot; carries the HTTP status and Retry-After."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class _Lane:
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.active = 0
+        self.waiters: "Deque[asyncio.Future]" = deque()
+        self.service_s = 0.5  # EWMA of slot hold time, seeds Retry-After
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.cancelled = 0
+
+    def retry_after(self) -> int:
+        # Time for the backlog ahead of a new arrival to drain through the lane
+        return max(1, math.ceil(self.service_s * (len(self.waiters) + 1) / self.limit))
+
+class AdmissionController:
+    """
+    Bounded concurrency per solver class, so heavy modes cannot starve cheap ones.
+    Each class admits `limit` requests at once and queues up to `max_queue`
+    more; a full queue is rejected with 429, and a queued request that waits
+    longer than `queue_timeout` seconds gets 503. Must be used from one event loop.
+    """
+
+    def __init__(
+        self,
+        mode_classes: Dict[str, str],
+        limits: Dict[str, int],
+        queue_limits: Dict[str, int],
+        queue_timeout: float = 5.0,
+        default_class: str = "standard"
+    ):
+        self.mode_classes = mode_classes
+        self.default_class = default_class
+        self.queue_timeout = queue_timeout
+        self._lanes = {
+            name: _Lane(limit, queue_limits.get(name, limit * 4))
+            for name, limit in limits.items()
+        }
+        if default_class not in self._lanes:
+            self._lanes[default_class] = _Lane(8, 32)
+
+    def class_for(self, mode: str) -> str:
+        name = self.mode_classes.get(mode, self.default_class)
+        return name if name in self._lanes else self.default_class
+
+    @asynccontextmanager
+    async def slot(self, mode: str) -> AsyncIterator[str]:
+        """Hold a slot in the mode's class for the duration of the block."""
+        release = await self.acquire(mode)
+        try:
+            yield self.class_for(mode)
+        finally:
+            release()
+
+    async def acquire(self, mode: str) -> Callable[[], None]:
+        """
+        Take a slot in the mode's class and return its release callback, for
+        work that outlives any one block (a streamed response). Releasing
+        twice is harmless; the callback must run on the controller's loop.
+        """
+        name = self.class_for(mode)
+        lane = self._lanes[name]
+        with span("admission", lane=name):
+            await self._acquire(name, lane)
+        t0 = time.monotonic()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                lane.service_s = 0.8 * lane.service_s + 0.2 * (time.monotonic() - t0)
+                self._release(lane)
+        return release
+
+    async def _acquire(self, name: str, lane: _Lane) -> None:
+        if lane.active < lane.limit and not lane.waiters:
+            lane.active += 1
+            lane.admitted += 1
+            return
+        if len(lane.waiters) >= lane.max_queue:
+            lane.rejected += 1
+            raise AdmissionRejected(429, f"Too many pending '{name}' solves; retry later", lane.retry_after())
+
+        fut = asyncio.get_running_loop().create_future()
+        lane.waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if fut.done():  # handed a slot just as the wait expired
+                lane.admitted += 1
+                return
+            lane.waiters.remove(fut)
+            fut.cancel()
+            lane.queue_timeouts += 1
+            raise AdmissionRejected(503, f"Solver capacity for '{name}' is exhausted; retry later", lane.retry_after())
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if fut.done() and not fut.cancelled():
+                self._release(lane)
+            else:
+                lane.waiters.remove(fut)
+                fut.cancel()
+            lane.cancelled += 1
+            raise
+        lane.admitted += 1
+
+    def _release(self, lane: _Lane) -> None:
+        # Hand the slot straight to the next live waiter so arrivals cannot jump the queue
+        while lane.waiters:
+            fut = lane.waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        lane.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "limit": lane.limit,
+                "active": lane.active,
+                "waiting": len(lane.waiters),
+                "max_queue": lane.max_queue,
+                "admitted": lane.admitted,
+                "rejected": lane.rejected,
+                "queue_timeouts": lane.queue_timeouts,
+                "cancelled": lane.cancelled,
+                "mean_service_ms": round(lane.service_s * 1000, 1),
+            }
+            for name, lane in self._lanes.items()
+        }
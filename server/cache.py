@@ -0,0 +1,147 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from server.schemas import SolveResponse
+
+
+def canonical_expr(expr: Any) -> str:
+    """Canonical text for a parsed query (srepr for SymPy trees, raw text otherwise)."""
+    try:
+        from sympy import Basic, srepr
+        from sympy.matrices import MatrixBase
+
+        if isinstance(expr, (Basic, MatrixBase)):
+            return srepr(expr)
+    except ImportError:
+        pass
+    return "raw:" + " ".join(str(expr).split())
+
+
+def normalize_options(options: Optional[Dict[str, Any]]) -> str:
+    """Order-independent JSON encoding of request options."""
+    return json.dumps(options or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+# Options that change how a response is shown, never what is solved. The cache
+# key leaves them out and ResultCache.get fits the stored response to them
+PRESENTATION_OPTIONS = ("profile", "step_latex", "result_srepr")
+
+
+def canonical_key(subject: str, mode: str, options: Optional[Dict[str, Any]], expr: Any) -> str:
+    """Content-addressed key for a solve request after parsing; presentation options do not count."""
+    solve_options = {k: v for k, v in (options or {}).items() if k not in PRESENTATION_OPTIONS}
+    payload = "\x1f".join([subject, mode, normalize_options(solve_options), canonical_expr(expr)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def flight_key(key: str, options: Optional[Dict[str, Any]]) -> str:
+    """
+    `key` narrowed by the request's presentation options, for handing one
+    live response to identical requests (single flight, batch duplicates).
+    """
+    shown = {k: v for k, v in (options or {}).items() if k in PRESENTATION_OPTIONS}
+    return key + ":" + normalize_options(shown) if shown else key
+
+
+def _presentation(options: Optional[Dict[str, Any]]) -> Tuple[bool, bool]:
+    """(step LaTeX wanted, result srepr wanted) for a request's options."""
+    options = options or {}
+    return bool(options.get("step_latex", True)), bool(options.get("result_srepr"))
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of serialized SolveResponses.
+    Entries expire after `ttl` seconds and the total payload size is kept
+    under `max_bytes`.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 3600.0, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # key -> (stored_at, payload, has step LaTeX, has result srepr)
+        self._entries: "OrderedDict[str, Tuple[float, str, bool, bool]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, options: Optional[Dict[str, Any]] = None) -> Optional[SolveResponse]:
+        """
+        The stored response shown the way `options` ask: step LaTeX and the
+        result srepr are dropped when not wanted, and an entry stored without
+        one that is wanted counts as a miss.
+        """
+        want_latex, want_srepr = _presentation(options)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (want_latex and not entry[2]) or (want_srepr and not entry[3]):
+                self.misses += 1
+                return None
+            stored_at, payload, _, _ = entry
+            if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        resp = SolveResponse.model_validate_json(payload)
+        if not want_latex:
+            for step in resp.steps:
+                step.before_latex = step.after_latex = None
+        if not want_srepr:
+            resp.result_srepr = None
+        return resp
+
+    def put(self, key: str, resp: SolveResponse, options: Optional[Dict[str, Any]] = None) -> None:
+        """Store `resp`, solved with `options`; an entry that already shows more is kept."""
+        has_latex = _presentation(options)[0]
+        has_srepr = resp.result_srepr is not None
+        payload = resp.model_dump_json(exclude={"elapsed_ms"})
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                _, _, had_latex, had_srepr = self._entries[key]
+                if (had_latex and not has_latex) or (had_srepr and not has_srepr):
+                    return
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), payload, has_latex, has_srepr)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: str) -> None:
+        payload = self._entries.pop(key)[1]
+        self._bytes -= len(payload)
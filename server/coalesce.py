@@ -0,0 +1,177 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from server.executor import cancelled_response
+from server.schemas import SolveResponse
+
+def _own_copy(resp: SolveResponse) -> SolveResponse:
+    # Steps are shared read-only; the lists callers append to are copied
+    return resp.model_copy(update={"warnings": list(resp.warnings), "errors": list(resp.errors)})
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[SolveResponse] = None
+        self.error: Optional[BaseException] = None
+        self.cancels: List[Any] = []
+        self.waiters = 0
+        # (loop, event) of followers awaiting in an event loop
+        self.wakeups: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+class _FlightCancel:
+    """Cancel flag for a shared computation: set only once every attached request has cancelled."""
+
+    def __init__(self, flight: _Flight, lock: threading.Lock):
+        self._flight = flight
+        self._lock = lock
+
+    def is_set(self) -> bool:
+        with self._lock:
+            cancels = list(self._flight.cancels)
+        return all(c is not None and c.is_set() for c in cancels)
+
+class SingleFlight:
+    """
+    Deduplicates identical in-flight solves. The first caller for a key runs
+    the computation; callers arriving before it finishes wait and receive
+    the same SolveResponse instead of starting their own.
+    
+    Threaded callers use do(). Async callers claim the key with begin() in
+    the event loop and, when they are not the leader, wait with wait_async()
+    so a crowd of followers holds no threadpool threads; the leader runs
+    lead() in a worker thread.
+    """
+
+    def __init__(self, poll_seconds: float = 0.05):
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.max_waiters = 0
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def begin(self, key: str, cancel: Optional[Any] = None) -> Tuple[_Flight, bool]:
+        """Attach to the flight for `key`, starting one if there is none. Returns (flight, leader)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, flight.waiters)
+            flight.cancels.append(cancel)
+        return flight, leader
+
+    def lead(self, key: str, flight: _Flight, fn: Callable[[Any], SolveResponse]) -> SolveResponse:
+        """Run the leader's computation and hand its result to every follower."""
+        try:
+            flight.result = fn(_FlightCancel(flight, self._lock))
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._finish(key, flight)
+        return _own_copy(flight.result)
+
+    def abort(self, key: str, flight: _Flight, error: BaseException) -> None:
+        """Release the followers of a leader that never got to run lead()."""
+        if not flight.done.is_set():
+            flight.error = error
+            self._finish(key, flight)
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done.set()
+            wakeups = list(flight.wakeups)
+        for loop, event in wakeups:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[Any], SolveResponse],
+        cancel: Optional[threading.Event] = None
+    ) -> Tuple[SolveResponse, bool]:
+        """
+        Run `fn(cancel_flag)` once per key at a time. Returns (response, shared),
+        where `shared` is True for callers that attached to another caller's run.
+        Each caller gets its own response object so it can add warnings and timing.
+        """
+        flight, leader = self.begin(key, cancel)
+        if not leader:
+            return self._wait(flight, cancel), True
+        return self.lead(key, flight, fn), False
+
+    def _wait(self, flight: _Flight, cancel: Optional[threading.Event]) -> SolveResponse:
+        while not flight.done.wait(self.poll_seconds):
+            if cancel is not None and cancel.is_set():
+                return self._abandon(flight)
+        return self._result(flight)
+
+    async def wait_async(
+        self,
+        flight: _Flight,
+        cancel: threading.Event,
+        disconnected: Callable[[], Awaitable[bool]]
+    ) -> SolveResponse:
+        """
+        Follower side of begin() for async callers: await the leader in the
+        event loop, giving up (and setting `cancel`) once `disconnected()`.
+        """
+        woken = asyncio.Event()
+        with self._lock:
+            if flight.done.is_set():
+                woken.set()
+            else:
+                flight.wakeups.append((asyncio.get_running_loop(), woken))
+        try:
+            while not woken.is_set():
+                try:
+                    await asyncio.wait_for(woken.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    if await disconnected():
+                        cancel.set()
+                        return self._abandon(flight)
+        except asyncio.CancelledError:
+            cancel.set()
+            self._abandon(flight)
+            raise
+        return self._result(flight)
+
+    def _abandon(self, flight: _Flight) -> SolveResponse:
+        with self._lock:
+            flight.waiters -= 1
+            self.abandoned += 1
+        return cancelled_response()
+
+    def _result(self, flight: _Flight) -> SolveResponse:
+        with self._lock:
+            flight.waiters -= 1
+        if flight.error is not None:
+            return SolveResponse(ok=False, errors=[f"Solver error: {flight.error}"])
+        return _own_copy(flight.result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "waiting": sum(f.waiters for f in self._flights.values()),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "abandoned": self.abandoned,
+                "max_waiters": self.max_waiters,
+            }
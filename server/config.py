@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,6 +13,74 @@ class Settings(BaseSettings):
     JAVA_HEAP: str = "-Xmx256m"
     MAX_STEPS: int = 200
     MAX_INPUT_SIZE: int = 8000
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 2048
+    RESULT_CACHE_TTL_SECONDS: float = 3600.0
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    PRECOMPUTED_ENABLED: bool = True
+    PRECOMPUTED_DB: str = "server/data/precomputed.sqlite3"
+    PARSE_CACHE_MAX_ENTRIES: int = 4096
+    SOLVER_POOL_ENABLED: bool = True
+    SOLVER_WORKERS: int = 0  # 0 = one worker per CPU
+    SOLVER_MAX_TASKS_PER_WORKER: int = 500
+    SOLVER_START_METHOD: str = "spawn"
+    WARMUP_ENABLED: bool = True
+    IMPORT_BUDGET_MS: float = 2000.0  # warn when importing server.main takes longer
+    SOLVE_TIMEOUT_SECONDS: float = 10.0
+    SOLVE_MODE_TIMEOUTS: Dict[str, float] = {
+        "integral": 20.0,
+        "ode": 20.0,
+        "limit": 15.0,
+        "series": 15.0,
+        "eigen": 15.0,
+    }
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_CONCURRENCY: int = 0  # 0 = solver pool size
+    LA_NUMERIC_AUTO_SIZE: int = 8
+    LA_TRACE_COALESCE_SIZE: int = 6  # traced RREF: one step per pivot instead of per row operation above this
+    SIMPLIFY_BUDGET_MS: float = 500.0
+    SIMPLIFY_MAX_OPS: int = 400
+    INTEGRAL_BUDGET_MS: float = 15000.0  # whole staged pipeline, ending with integrate()
+    INTEGRAL_MANUAL_BUDGET_MS: float = 3000.0
+    NUMERIC_DPS: int = 30
+    NUMERIC_TOLERANCE: float = 1e-10  # relative error below which an estimate counts as converged
+    NUMERIC_SYMBOLIC_BUDGET_MS: float = 3000.0  # symbolic cut-off once a converged estimate exists
+    NUMERIC_MAX_POINTS: int = 1000  # series partial sums: evaluation points per request
+    SAMPLE_MAX_POINTS: int = 5000  # /api/sample: initial grid plus adaptive refinement
+    SAMPLE_CACHE_MAX_ENTRIES: int = 256
+    COMBINATORICS_MAX_BITS: int = 1_000_000  # refuse exact results beyond ~300k digits
+    COMBINATORICS_DISPLAY_DIGITS: int = 1000
+    COMBINATORICS_TABLE_MAX_N: int = 1000
+    COMBINATORICS_MAX_LOOP: int = 2_000_000
+    RECURRENCE_RSOLVE_BUDGET_MS: float = 2000.0
+    RECURRENCE_MAX_ITERATIONS: int = 1_000_000
+    LOGIC_MAX_VARS: int = 64
+    LOGIC_TRUTH_TABLE_MAX_VARS: int = 20  # 2^20-bit tables; larger formulas use the BDD only
+    LOGIC_TABLE_DISPLAY_VARS: int = 6
+    LOGIC_MAX_CUBES: int = 256
+    INTERN_ENABLED: bool = True
+    INTERN_MAX_ENTRIES: int = 200_000
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MODE_CLASSES: Dict[str, str] = {
+        "integral": "heavy",
+        "ode": "heavy",
+        "limit": "heavy",
+        "series": "heavy",
+        "eigen": "heavy",
+        "det": "light",
+        "rref": "light",
+        "nullspace": "light",
+        "combinatorics": "light",
+        "logic": "light",
+        "recurrence": "light",
+    }  # other modes are "standard"
+    ADMISSION_LIMITS: Dict[str, int] = {"heavy": 4, "standard": 8, "light": 16}
+    ADMISSION_QUEUE_LIMITS: Dict[str, int] = {"heavy": 16, "standard": 32, "light": 64}
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    DISCONNECT_POLL_SECONDS: float = 0.25
+    COALESCE_ENABLED: bool = True
+    METRICS_ENABLED: bool = True
+    PROFILE_TOP_CALLS: int = 25
 
     class Config:
         env_file = ".env"
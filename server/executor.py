@@ -0,0 +1,298 @@
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from server.config import settings
+from server.schemas import SolveResponse, Step
+from server.solvers.utils.trace import call_profile, cprofile_requested, graft, span
+
+# How often a running job checks its cancel flag
+CANCEL_POLL_SECONDS = 0.05
+
+
+def timeout_for(mode: str) -> float:
+    """Wall-clock budget in seconds for a solver mode."""
+    return float(settings.SOLVE_MODE_TIMEOUTS.get(mode, settings.SOLVE_TIMEOUT_SECONDS))
+
+
+def timeout_response(mode: str, budget: float, reason: Optional[str] = None) -> SolveResponse:
+    """Structured response returned when a solve exceeds its budget."""
+    return SolveResponse(
+        ok=False,
+        timed_out=True,
+        errors=[reason or f"Solver exceeded the {budget:g}s budget for mode '{mode}'"],
+    )
+
+
+def cancelled_response() -> SolveResponse:
+    """Response for work abandoned because the client disconnected."""
+    return SolveResponse(ok=False, errors=["Solve cancelled: client disconnected"])
+
+
+def run_dispatch(dispatch: Callable[..., SolveResponse], subject: str, expr: Any, mode: str, options: Dict) -> SolveResponse:
+    """Call `dispatch` inside a "dispatch" span, under cProfile when options.profile asks for it."""
+    with span("dispatch", subject=subject, mode=mode) as s, \
+            call_profile(cprofile_requested(options), settings.PROFILE_TOP_CALLS) as prof:
+        resp = dispatch(subject, expr, mode, options)
+    if prof and s is not None:
+        s.meta["cprofile"] = prof
+    if options.get("result_srepr") and resp.ok:
+        # Step expressions do not survive serialization; keep the result's exact form
+        from sympy import srepr
+        result = next((step._after for step in reversed(resp.steps) if step._after is not None), None)
+        resp.result_srepr = srepr(result) if result is not None else None
+    return resp
+
+
+def _worker_main(conn) -> None:
+    """Worker loop: import SymPy once, then serve dispatch jobs until told to stop."""
+    import sympy  # noqa: F401
+    from server.solvers import dispatch
+    from server.solvers.utils.budget import enable_interrupts
+    from server.solvers.utils.parse import warm_parsers
+    from server.warmup import warm_up
+    from server.solvers.utils.intern import intern_stats
+    from server.solvers.utils.latex import step_latex
+    from server.solvers.utils.steps import stream_steps
+    from server.solvers.utils.trace import tracing
+
+    def send_step(step: Step) -> None:
+        conn.send(("step", step.model_dump()))
+
+    # Solves run on this process's main thread, so budgets can cut them off with SIGALRM
+    enable_interrupts()
+    if settings.WARMUP_ENABLED:
+        warmup_ms = warm_up(dispatch)["total_ms"]
+    else:
+        t0 = time.perf_counter()
+        warm_parsers()
+        warmup_ms = round((time.perf_counter() - t0) * 1000, 1)
+    conn.send(("ready", os.getpid(), warmup_ms))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+        subject, expr, mode, options, stream = job
+        # The span tree travels back with the reply and is grafted into the request's trace
+        with tracing("worker") as root:
+            saved = intern_stats()["bytes_saved"]
+            try:
+                with stream_steps(send_step if stream else None), step_latex(options.get("step_latex", True)):
+                    resp = run_dispatch(dispatch, subject, expr, mode, options)
+                    with span("serialize"):
+                        payload = resp.model_dump()
+                reply = ("result", payload)
+            except Exception as e:
+                reply = ("error", f"Solver error: {e}")
+            root.meta["intern_bytes_saved"] = intern_stats()["bytes_saved"] - saved
+        conn.send(reply + (root.to_dict(),))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+        self.warmup_ms: Optional[float] = None
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.conn.poll(timeout):
+            return False
+        try:
+            msg = self.conn.recv()
+        except EOFError:
+            return False
+        if msg[0] != "ready":
+            return False
+        self.warmup_ms = msg[2] if len(msg) > 2 else None
+        return True
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(1.0)
+
+
+class SolverPool:
+    """
+    Pool of pre-warmed solver processes.
+    Each job runs under a wall-clock budget; a worker that overruns it is
+    killed and replaced in the background so the pool keeps its size.
+    """
+
+    def __init__(self, size: int = 0, max_tasks_per_worker: int = 500, start_method: str = "spawn"):
+        self.size = size or os.cpu_count() or 1
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: set = set()
+        self.started = False
+        self.completed = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.respawns = 0
+        self.cancelled = 0
+        self.intern_bytes_saved = 0
+        self.worker_warmup_ms: Optional[float] = None
+
+    def start(self, ready_timeout: float = 60.0) -> None:
+        workers = [_Worker(self._ctx) for _ in range(self.size)]
+        for worker in workers:
+            if worker.wait_ready(ready_timeout):
+                self._register(worker)
+            else:
+                worker.kill()
+        self.started = True
+
+    def shutdown(self) -> None:
+        self.started = False
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for worker in workers:
+            worker.stop()
+
+    def submit(
+        self,
+        subject: str,
+        expr: Any,
+        mode: str,
+        options: Dict,
+        timeout: Optional[float] = None,
+        on_step: Optional[Callable[[Step], None]] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> SolveResponse:
+        """
+        Run one dispatch call in a worker process under a hard timeout.
+        When `on_step` is given, steps are forwarded as the worker logs them.
+        Setting `cancel` kills the worker and returns a cancelled response.
+        A worker that dies mid-job is answered like a timeout. Raises
+        pickle.PicklingError, with no worker touched, when the job cannot be
+        sent to a process.
+        """
+        budget = timeout if timeout is not None else timeout_for(mode)
+        deadline = time.monotonic() + budget
+        try:
+            worker = self._idle.get(timeout=budget)
+        except queue.Empty:
+            self._count("timeouts")
+            return timeout_response(mode, budget, "No solver worker became available within the time budget")
+
+        try:
+            worker.conn.send((subject, expr, mode, options, on_step is not None))
+        except (BrokenPipeError, OSError):
+            self._replace(worker)
+            self._count("crashes")
+            return timeout_response(mode, budget, "Solver worker unavailable")
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            # Pickling failed before anything was written; the worker is still clean
+            self._idle.put(worker)
+            raise pickle.PicklingError(f"Cannot send the job to a worker: {e}") from e
+
+        while True:
+            remaining = max(0.0, deadline - time.monotonic())
+            wait = remaining if cancel is None else min(remaining, CANCEL_POLL_SECONDS)
+            if not worker.conn.poll(wait):
+                if cancel is not None and cancel.is_set():
+                    self._count("cancelled")
+                    self._replace(worker)
+                    return cancelled_response()
+                if time.monotonic() < deadline:
+                    continue
+                self._count("timeouts")
+                self._replace(worker)
+                return timeout_response(mode, budget)
+
+            try:
+                kind, payload, *trace = worker.conn.recv()
+            except (EOFError, OSError):
+                self._count("crashes")
+                self._replace(worker)
+                return timeout_response(mode, budget, "Solver worker crashed")
+
+            if kind != "step":
+                break
+            if on_step is not None:
+                on_step(Step.model_validate(payload))
+
+        if trace:
+            graft(trace[0])
+            self._count("intern_bytes_saved", trace[0].get("meta", {}).get("intern_bytes_saved", 0))
+        self._count("completed")
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks_per_worker:
+            self._replace(worker, graceful=True)
+        else:
+            self._idle.put(worker)
+
+        if kind == "error":
+            return SolveResponse(ok=False, errors=[payload])
+        return SolveResponse.model_validate(payload)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "alive": len(self._workers),
+                "idle": self._idle.qsize(),
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+                "respawns": self.respawns,
+                "cancelled": self.cancelled,
+                "intern_bytes_saved": self.intern_bytes_saved,
+                "worker_warmup_ms": self.worker_warmup_ms,
+            }
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        # Request threads submit concurrently; += on an attribute is not atomic
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _register(self, worker: _Worker) -> None:
+        with self._lock:
+            self._workers.add(worker)
+            if worker.warmup_ms is not None:
+                self.worker_warmup_ms = worker.warmup_ms
+        self._idle.put(worker)
+
+    def _replace(self, worker: _Worker, graceful: bool = False) -> None:
+        with self._lock:
+            self._workers.discard(worker)
+            self.respawns += 1
+        if graceful:
+            worker.stop()
+        else:
+            worker.kill()
+            worker.conn.close()
+        threading.Thread(target=self._spawn_one, daemon=True).start()
+
+    def _spawn_one(self) -> None:
+        if not self.started:
+            return
+        worker = _Worker(self._ctx)
+        if worker.wait_ready(60.0) and self.started:
+            self._register(worker)
+        else:
+            worker.kill()
@@ -1,15 +1,81 @@
 import time
-from fastapi import FastAPI, HTTPException
+
+# Measured from here so startup can report (and budget) the cost of importing the app
+_import_started = time.perf_counter()
+
+import asyncio
+import json
+import math
+import pickle
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from server.admission import AdmissionController, AdmissionRejected
+from server.cache import ResultCache, canonical_key, flight_key
+from server.coalesce import SingleFlight
 from server.config import settings
-from server.schemas import SolveRequest, SolveResponse, HealthResponse
-from server.solvers import algebra, calculus, linear_algebra, discrete
-from server.solvers.utils.parse import parse_query
+from server.executor import SolverPool, cancelled_response, run_dispatch
+from server.metrics import SpanMetrics, gauge
+from server.precompute import PrecomputedStore, request_key
+from server.sampling import CompiledCache, adaptive_sample, encode, plottable
+from server.schemas import (
+    SolveRequest, SolveResponse, Step, HealthResponse, BatchSolveRequest, BatchSolveResponse,
+    SampleRequest, SampleResponse
+)
+from server.solvers import dispatch
+from server.solvers.utils.intern import intern_stats
+from server.solvers.utils.parse import parse_query, parse_stats, warm_parsers
+from server.solvers.utils.classify import InvalidQuery, QueryClass, classify_query
+from server.solvers.utils.latex import step_latex
+from server.solvers.utils.steps import stream_steps
+from server.solvers.utils.trace import Span, span, tracing
+from server.warmup import Startup, warm_up
+
+solver_pool = SolverPool(
+    size=settings.SOLVER_WORKERS,
+    max_tasks_per_worker=settings.SOLVER_MAX_TASKS_PER_WORKER,
+    start_method=settings.SOLVER_START_METHOD,
+)
+
+startup = Startup()
+
+def startup_steps() -> List[Tuple[str, Callable[[], Optional[Dict[str, Any]]]]]:
+    """
+    Warm-up run before /health reports ready. Solves run in the pool when it
+    is enabled, so this process only warms parsing and each worker warms its
+    own solvers before it joins the pool.
+    """
+    steps: List[Tuple[str, Callable[[], Optional[Dict[str, Any]]]]] = []
+    if settings.WARMUP_ENABLED:
+        steps.append(("warmup", lambda: warm_up(None if settings.SOLVER_POOL_ENABLED else dispatch)))
+    else:
+        steps.append(("parsers", warm_parsers))
+    if settings.SOLVER_POOL_ENABLED:
+        def start_pool() -> Dict[str, Any]:
+            solver_pool.start()
+            return {"worker_warmup_ms": solver_pool.worker_warmup_ms}
+        steps.append(("pool", start_pool))
+    return steps
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup.report["app_import_ms"] = IMPORT_MS
+    if IMPORT_MS > settings.IMPORT_BUDGET_MS:
+        startup.report["import_over_budget"] = True
+    startup.start(startup_steps())
+    yield
+    startup.wait(5.0)
+    solver_pool.shutdown()
 
 app = FastAPI(
     title=settings.API_NAME,
     version=settings.API_VERSION,
-    description="Step-by-step mathematical solver API for SigmaLearn"
+    description="Step-by-step mathematical solver API for SigmaLearn",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -21,17 +87,73 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+precomputed = PrecomputedStore(settings.PRECOMPUTED_DB) if settings.PRECOMPUTED_ENABLED else None
+
+result_cache = ResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl=settings.RESULT_CACHE_TTL_SECONDS,
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+)
+
+span_metrics = SpanMetrics()
+
+compiled_functions = CompiledCache(max_entries=settings.SAMPLE_CACHE_MAX_ENTRIES)
+
+flights = SingleFlight() if settings.COALESCE_ENABLED else None
+
+admission = AdmissionController(
+    mode_classes=settings.ADMISSION_MODE_CLASSES,
+    limits=settings.ADMISSION_LIMITS,
+    queue_limits=settings.ADMISSION_QUEUE_LIMITS,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+) if settings.ADMISSION_ENABLED else None
+
 @app.get("/health", response_model=HealthResponse)
 def health():
-    """Health check endpoint."""
-    return HealthResponse(
-        status="ok",
+    """Health check endpoint; 503 with status "warming" until startup warm-up finishes."""
+    body = HealthResponse(
+        status="ok" if startup.ready else startup.status,
         ocr=settings.ENABLE_OCR,
-        java=settings.ENABLE_JAVA
+        java=settings.ENABLE_JAVA,
+        cache=result_cache.stats() if settings.RESULT_CACHE_ENABLED else None,
+        pool=solver_pool.stats() if solver_pool.started else None,
+        parse=parse_stats(),
+        precomputed=precomputed.stats() if precomputed is not None else None,
+        admission=admission.stats() if admission is not None else None,
+        coalesce=flights.stats() if flights is not None else None,
+        intern=intern_stats() if settings.INTERN_ENABLED else None,
+        stages=span_metrics.hit_rates() if settings.METRICS_ENABLED else None,
+        sample=compiled_functions.stats(),
+        warmup=startup.stats()
     )
+    if not startup.ready:
+        return JSONResponse(status_code=503, content=body.model_dump())
+    return body
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage latency histograms and cache/pool counters in Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    extra = gauge("sigmalearn_parse", "Parse cache counters.", parse_stats())
+    if settings.RESULT_CACHE_ENABLED:
+        extra += gauge("sigmalearn_result_cache", "Result cache counters.", result_cache.stats())
+    if solver_pool.started:
+        extra += gauge("sigmalearn_solver_pool", "Solver pool counters.", solver_pool.stats())
+    if precomputed is not None:
+        extra += gauge("sigmalearn_precomputed", "Precomputed store counters.", precomputed.stats())
+    if settings.INTERN_ENABLED:
+        extra += gauge("sigmalearn_intern", "Expression interning lookups, hits and memory saved in the API process.", intern_stats())
+    if flights is not None:
+        extra += gauge("sigmalearn_coalesce", "Single-flight leaders, coalesced waiters and in-flight solves.", flights.stats())
+    extra += gauge("sigmalearn_sample_cache", "Compiled sampling function cache counters.", compiled_functions.stats())
+    if admission is not None:
+        for lane, stats in admission.stats().items():
+            extra += gauge(f"sigmalearn_admission_{lane}", f"Admission counters for the '{lane}' class.", stats)
+    return PlainTextResponse(span_metrics.render(extra), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/solve", response_model=SolveResponse)
-def solve(req: SolveRequest):
+async def solve(req: SolveRequest, request: Request):
     """
     Solve mathematical problems with step-by-step solutions.
     
@@ -40,32 +162,537 @@ def solve(req: SolveRequest):
     - Calculus: derivatives, integrals, limits, series
     - Linear Algebra: RREF, eigenvalues, determinant, nullspace
     - Discrete Math: logic simplification, combinatorics
+    
+    Set `options.profile` to `true` to get the span tree of the solve back
+    in `profile`, or to `"cprofile"` to also attach the slowest solver calls.
+    
+    Solves are admitted per mode class (see `ADMISSION_*` settings); when a
+    class is saturated the request fails fast with 429 or 503 and a
+    `Retry-After` header. Work is cancelled if the client disconnects.
     """
-    t0 = time.time()
+    t0 = time.perf_counter()
     
     # Validate input size
     if len(req.query) > settings.MAX_INPUT_SIZE:
         raise HTTPException(status_code=413, detail="Input too large")
     
-    # Parse query
-    expr_or_data, parse_warnings = parse_query(req.subject, req.query, req.options)
+    with tracing("solve") as root:
+        # Classify input and resolve "auto" before any SymPy work
+        with span("classify"):
+            req, qc = classify(req)
+        
+        # Curated examples are served from the precomputed store
+        resp = lookup_precomputed(req, qc)
+        if resp is not None:
+            payload = resp.model_dump(mode="json")
+        else:
+            expr_or_data, parse_warnings, key = await run_in_threadpool(parse_request, req, qc)
+            args = (req, expr_or_data, parse_warnings, key)
+            # Requests joining an identical in-flight solve do not need a slot of their own
+            if admission is None or (flights is not None and flights.in_flight(flight_key(key, req.options))):
+                resp, payload = await solve_coalesced(request, *args)
+            else:
+                try:
+                    async with admission.slot(req.mode):
+                        resp, payload = await solve_coalesced(request, *args)
+                except AdmissionRejected as e:
+                    raise HTTPException(status_code=e.status_code, detail=e.detail,
+                                        headers={"Retry-After": str(e.retry_after)})
     
-    # Route to appropriate solver
-    if req.subject == "la":
-        resp = linear_algebra.dispatch(expr_or_data, req.mode, req.options)
-    elif req.subject in ("calc1", "calc2"):
-        resp = calculus.dispatch(expr_or_data, req.mode, req.options)
-    elif req.subject == "discrete":
-        resp = discrete.dispatch(expr_or_data, req.mode, req.options)
-    else:
-        resp = algebra.dispatch(expr_or_data, req.mode, req.options)
+    # Add timing and the span tree
+    payload["elapsed_ms"] = int((time.perf_counter() - t0) * 1000)
+    profile = finish_trace(root, req, resp)
+    if profile is not None:
+        payload["profile"] = profile
+    
+    return JSONResponse(payload)
+
+@app.post("/api/solve/batch", response_model=BatchSolveResponse)
+async def solve_batch(batch: BatchSolveRequest, stream: bool = False):
+    """
+    Solve many problems in one request.
+    
+    Identical items are solved once and fanned out in parallel across the
+    solver pool. Results come back in request order, or as NDJSON lines
+    (`{"index": i, "result": {...}}`) in completion order when `stream=true`.
+    
+    Each unique item takes a slot in its mode's admission class. Items that
+    cannot get one come back with ok=false; the whole response then carries
+    the rejection's 429 or 503 status and `Retry-After`, while NDJSON lines
+    carry `status` and `retry_after` instead.
+    """
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.BATCH_MAX_ITEMS} items")
+    
+    t0 = time.perf_counter()
+    # Share parsing between items with the same subject, format and query text
+    parsed: Dict[Tuple[str, str, str], Tuple[Any, List[str]]] = {}
+    text_keys: Dict[int, Tuple[str, str, str]] = {}
+    groups: Dict[str, List[int]] = {}
+    jobs: Dict[str, Tuple[SolveRequest, Any, str]] = {}
+    results: List[Optional[SolveResponse]] = [None] * len(batch.items)
+    rejected: Dict[str, AdmissionRejected] = {}
+    
+    def prepare() -> None:
+        for i, item in enumerate(batch.items):
+            if len(item.query) > settings.MAX_INPUT_SIZE:
+                results[i] = SolveResponse(ok=False, errors=["Input too large"])
+                continue
+            try:
+                item, qc = classify(item)
+            except HTTPException as e:
+                results[i] = SolveResponse(ok=False, errors=[str(e.detail)])
+                continue
+            stored = lookup_precomputed(item, qc)
+            if stored is not None:
+                stored.elapsed_ms = int((time.perf_counter() - t0) * 1000)
+                results[i] = stored
+                continue
+            text_key = text_keys[i] = (item.subject, qc.format, qc.query)
+            if text_key not in parsed:
+                try:
+                    parsed[text_key] = parse_query(item.subject, qc.query, item.options, fmt=qc.format)
+                except Exception as e:
+                    parsed[text_key] = (None, [f"Parse error: {e}"])
+            expr_or_data, _ = parsed[text_key]
+            key = canonical_key(item.subject, item.mode, item.options, expr_or_data)
+            # Items differing only in presentation share the cache entry, not the response
+            shared = flight_key(key, item.options)
+            groups.setdefault(shared, []).append(i)
+            jobs.setdefault(shared, (item, expr_or_data, key))
+    
+    def solve_job(key: str) -> SolveResponse:
+        item, expr_or_data, cache_key = jobs[key]
+        with tracing("solve") as root:
+            try:
+                resp = solve_parsed(item, expr_or_data, key=cache_key)
+            except Exception as e:
+                resp = SolveResponse(ok=False, errors=[f"Solver error: {e}"])
+        resp.profile = finish_trace(root, item, resp)
+        return resp
+    
+    await run_in_threadpool(prepare)
+    workers = asyncio.Semaphore(max(1, min(len(jobs), settings.BATCH_CONCURRENCY or solver_pool.size)))
+    
+    async def run(key: str) -> Tuple[str, SolveResponse]:
+        async with workers:
+            if admission is None:
+                return key, await run_in_threadpool(solve_job, key)
+            try:
+                async with admission.slot(jobs[key][0].mode):
+                    return key, await run_in_threadpool(solve_job, key)
+            except AdmissionRejected as e:
+                rejected[key] = e
+                return key, SolveResponse(ok=False, errors=[e.detail])
+    
+    def finish(i: int, resp: SolveResponse) -> SolveResponse:
+        out = resp.model_copy(deep=True)
+        out.warnings.extend(parsed[text_keys[i]][1])
+        out.elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        return out
+    
+    if stream:
+        async def events():
+            for i, resp in enumerate(results):
+                if resp is not None:
+                    yield json.dumps({"index": i, "result": resp.model_dump()}) + "\n"
+            tasks = [asyncio.ensure_future(run(key)) for key in jobs]
+            try:
+                for done in asyncio.as_completed(tasks):
+                    key, resp = await done
+                    for i in groups[key]:
+                        line = {"index": i, "result": finish(i, resp).model_dump()}
+                        if key in rejected:
+                            line.update(status=rejected[key].status_code, retry_after=rejected[key].retry_after)
+                        yield json.dumps(line) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+    
+    solved = dict(await asyncio.gather(*(run(key) for key in jobs)))
+    for key, indices in groups.items():
+        for i in indices:
+            results[i] = finish(i, solved[key])
+    
+    body = BatchSolveResponse(results=results, unique=len(jobs))
+    if rejected:
+        # 503 (queue wait expired) outranks 429 (queue full); retry once the slowest lane drains
+        status = max(e.status_code for e in rejected.values())
+        retry_after = max(e.retry_after for e in rejected.values())
+        return JSONResponse(body.model_dump(mode="json"), status_code=status,
+                            headers={"Retry-After": str(retry_after)})
+    return body
+
+@app.post("/api/solve/stream")
+async def solve_stream(req: SolveRequest, format: Literal["sse", "ndjson"] = "sse"):
+    """
+    Solve with steps delivered as they are produced.
+    
+    Emits one `step` event per logged step followed by a final `result`
+    event carrying `ok`, `result_latex`, `warnings`, `errors` and
+    `elapsed_ms`. Server-sent events by default, NDJSON with `format=ndjson`.
+    
+    The solve holds a slot in its mode's admission class until it finishes;
+    a saturated class answers 429 or 503 with `Retry-After` before the
+    stream starts.
+    """
+    if len(req.query) > settings.MAX_INPUT_SIZE:
+        raise HTTPException(status_code=413, detail="Input too large")
+    req, qc = classify(req)
+    
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue()
+    cancel = threading.Event()
+    
+    def emit(event: Optional[Tuple[str, Dict[str, Any]]]) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, event)
     
-    # Add timing and warnings
-    resp.elapsed_ms = int((time.time() - t0) * 1000)
+    def on_step(step: Step) -> None:
+        emit(("step", step.model_dump()))
+    
+    def run() -> None:
+        with tracing("solve") as root:
+            try:
+                resp = lookup_precomputed(req, qc)
+                if resp is not None:
+                    for step in resp.steps:
+                        on_step(step)
+                else:
+                    with span("parse", format=qc.format):
+                        expr_or_data, parse_warnings = parse_query(req.subject, qc.query, req.options, fmt=qc.format)
+                    resp = solve_parsed(req, expr_or_data, on_step=on_step, cancel=cancel)
+                    resp.warnings.extend(parse_warnings)
+            except Exception as e:
+                resp = SolveResponse(ok=False, errors=[f"Solver error: {e}"])
+        resp.elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        resp.profile = finish_trace(root, req, resp)
+        emit(("result", resp.model_dump(exclude={"steps"})))
+        emit(None)
+    
+    def encode(kind: str, data: Dict[str, Any]) -> str:
+        if format == "ndjson":
+            return json.dumps({"type": kind, **data}) + "\n"
+        return f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+    
+    release = None
+    if admission is not None:
+        try:
+            release = await admission.acquire(req.mode)
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail,
+                                headers={"Retry-After": str(e.retry_after)})
+    # Started here rather than in the generator, which never runs if the client is
+    # already gone; the slot is released when the solve ends, not when the stream does
+    task = asyncio.ensure_future(run_in_threadpool(run))
+    if release is not None:
+        task.add_done_callback(lambda _: release())
+    
+    async def stream():
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield encode(*event)
+        finally:
+            cancel.set()  # no-op once the solve has finished
+    
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/sample", response_model=SampleResponse)
+async def sample(req: SampleRequest, request: Request):
+    """
+    Evaluate an expression, or the final result of a solve, over
+    [x_min, x_max] for plotting.
+    
+    The expression is compiled once with lambdify and cached by its
+    canonical form. Samples start on a uniform grid of `points` intervals
+    and are refined only where the curve bends, jumps or leaves its domain;
+    jumps left at the finest spacing come back in `breaks`. `encoding`
+    picks plain JSON arrays, integer deltas ("delta") or base64 floats.
+    """
+    t0 = time.perf_counter()
+    
+    if (req.query is None) == (req.solve is None):
+        raise HTTPException(status_code=422, detail="Give exactly one of query or solve")
+    if not (math.isfinite(req.x_min) and math.isfinite(req.x_max) and req.x_min < req.x_max):
+        raise HTTPException(status_code=422, detail="x_min and x_max must be finite with x_min < x_max")
+    source = req.query if req.query is not None else req.solve.query
+    if len(source) > settings.MAX_INPUT_SIZE:
+        raise HTTPException(status_code=413, detail="Input too large")
+    
+    with tracing("sample") as root:
+        if req.solve is not None:
+            # Solved like /api/solve (cache, coalescing, admission); its last result is sampled
+            with span("classify"):
+                solve_req, qc = classify(req.solve)
+            # Ask for the result itself; its LaTeX alone does not round-trip
+            solve_req.options = {**solve_req.options, "result_srepr": True}
+            solved = lookup_precomputed(solve_req, qc)
+            if solved is not None:
+                payload = solved.model_dump(mode="json")
+            else:
+                expr_or_data, parse_warnings, key = await run_in_threadpool(parse_request, solve_req, qc)
+                args = (solve_req, expr_or_data, parse_warnings, key)
+                if admission is None or (flights is not None and flights.in_flight(flight_key(key, solve_req.options))):
+                    _, payload = await solve_coalesced(request, *args)
+                else:
+                    try:
+                        async with admission.slot(solve_req.mode):
+                            _, payload = await solve_coalesced(request, *args)
+                    except AdmissionRejected as e:
+                        raise HTTPException(status_code=e.status_code, detail=e.detail,
+                                            headers={"Retry-After": str(e.retry_after)})
+            resp = await run_in_threadpool(sample_solution, req, payload)
+        else:
+            with span("classify"):
+                try:
+                    qc = classify_query(req.subject, req.query)
+                except InvalidQuery as e:
+                    raise HTTPException(status_code=422, detail=str(e))
+            resp = await run_in_threadpool(sample_query, req, qc.query, qc.format)
+    
+    resp.elapsed_ms = int((time.perf_counter() - t0) * 1000)
+    if settings.METRICS_ENABLED:
+        span_metrics.record(root, "sample", "ok" if resp.ok else "error")
+    return resp
+
+def sample_solution(req: SampleRequest, solved: Dict[str, Any]) -> SampleResponse:
+    """Sample the result of a serialized solve response (see options.result_srepr)."""
+    from sympy import sympify
+    
+    if not solved["ok"]:
+        return SampleResponse(ok=False, errors=solved["errors"] or ["Solve failed"], warnings=solved["warnings"])
+    if solved.get("result_srepr") is None:
+        return SampleResponse(ok=False, errors=["Solve produced no expression to sample"])
+    with span("parse", format="srepr"):
+        expr = sympify(solved["result_srepr"])
+    return sample_expression(req, expr, [])
+
+def sample_query(req: SampleRequest, query: str, fmt: str) -> SampleResponse:
+    """Blocking part of /api/sample for a query: parse, then sample."""
+    with span("parse", format=fmt):
+        expr, warnings = parse_query(req.subject, query, {}, fmt=fmt)
+    return sample_expression(req, expr, warnings)
+
+def sample_expression(req: SampleRequest, expr: Any, warnings: List[str]) -> SampleResponse:
+    """Compile (cached) and sample a parsed expression."""
+    from sympy import Symbol, latex
+    
+    x = Symbol(req.var)
+    try:
+        expr = plottable(expr, x, req.params)
+    except (ValueError, AttributeError) as e:
+        return SampleResponse(ok=False, errors=[f"Cannot sample: {e}"], warnings=warnings)
+    
+    fn, cached = compiled_functions.get(expr, x)
+    max_points = min(req.max_points or settings.SAMPLE_MAX_POINTS, settings.SAMPLE_MAX_POINTS)
+    points = max(2, min(req.points, max_points - 1))
+    with span("evaluate") as s:
+        samples = adaptive_sample(fn, req.x_min, req.x_max, points, max_points, refine=req.refine)
+        if s is not None:
+            s.meta["points"] = int(samples.x.size)
+    with span("encode"):
+        data = encode(samples, req.x_min, req.encoding, req.digits)
+    return SampleResponse(
+        ok=True,
+        expr_latex=latex(expr),
+        encoding=req.encoding,
+        count=int(samples.x.size),
+        data=data,
+        breaks=samples.breaks,
+        cached=cached,
+        warnings=warnings
+    )
+
+def parse_request(req: SolveRequest, qc: QueryClass) -> Tuple[Any, List[str], str]:
+    """Parse a classified request; returns (expr_or_data, warnings, canonical key)."""
+    with span("parse", format=qc.format):
+        expr_or_data, parse_warnings = parse_query(req.subject, qc.query, req.options, fmt=qc.format)
+    return expr_or_data, parse_warnings, canonical_key(req.subject, req.mode, req.options, expr_or_data)
+
+def solve_query(
+    req: SolveRequest,
+    expr_or_data: Any,
+    parse_warnings: List[str],
+    key: str,
+    cancel: Optional[threading.Event] = None
+) -> Tuple[SolveResponse, Dict[str, Any]]:
+    """Blocking part of /api/solve: solve and serialize a parsed request."""
+    resp = solve_parsed(req, expr_or_data, cancel=cancel, key=key)
+    return serialize_response(resp, parse_warnings)
+
+def serialize_response(resp: SolveResponse, parse_warnings: List[str]) -> Tuple[SolveResponse, Dict[str, Any]]:
     resp.warnings.extend(parse_warnings)
     
+    # Renders any LaTeX not yet produced by the worker or the cache
+    with span("serialize"):
+        payload = resp.model_dump(mode="json")
+    return resp, payload
+
+async def solve_coalesced(
+    request: Request,
+    req: SolveRequest,
+    expr_or_data: Any,
+    parse_warnings: List[str],
+    key: str
+) -> Tuple[SolveResponse, Dict[str, Any]]:
+    """
+    solve_query for async endpoints. The single-flight key is claimed here in
+    the event loop, so requests joining an identical solve await its result
+    without holding a threadpool thread; only the leader takes one.
+    """
+    if flights is None:
+        return await run_until_disconnected(request, solve_query, req, expr_or_data, parse_warnings, key)
+    
+    shared = flight_key(key, req.options)
+    cancel = threading.Event()
+    flight, leader = flights.begin(shared, cancel)
+    if not leader:
+        with span("coalesce") as s:
+            if s is not None:
+                s.meta["shared"] = True
+            resp = await flights.wait_async(flight, cancel, request.is_disconnected)
+        return await run_in_threadpool(serialize_response, resp, parse_warnings)
+    
+    def lead(cancel: threading.Event) -> Tuple[SolveResponse, Dict[str, Any]]:
+        with span("coalesce") as s:
+            if s is not None:
+                s.meta["shared"] = False
+            resp = flights.lead(shared, flight, lambda flag: solve_parsed(
+                req, expr_or_data, cancel=flag, key=key, coalesce=False))
+        return serialize_response(resp, parse_warnings)
+    
+    try:
+        return await run_until_disconnected(request, lead, cancel=cancel)
+    except BaseException as e:
+        # Cancelled before lead() ran: do not leave followers waiting
+        flights.abort(shared, flight, e)
+        raise
+
+async def run_until_disconnected(
+    request: Request,
+    fn: Callable[..., Any],
+    *args: Any,
+    cancel: Optional[threading.Event] = None
+) -> Any:
+    """
+    Run blocking `fn(*args, cancel=event)` in the threadpool, setting the event
+    if the client disconnects first. Returns once `fn` has wound down so any
+    admission slot is held for as long as the work actually runs.
+    """
+    cancel = cancel or threading.Event()
+    task = asyncio.ensure_future(run_in_threadpool(fn, *args, cancel=cancel))
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=settings.DISCONNECT_POLL_SECONDS)
+            if not task.done() and await request.is_disconnected():
+                cancel.set()
+                break
+        return await task
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+def classify(req: SolveRequest) -> Tuple[SolveRequest, QueryClass]:
+    """Classify the query, rejecting malformed input with 422 and resolving mode="auto"."""
+    try:
+        qc = classify_query(req.subject, req.query, req.mode)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return req.model_copy(update={"mode": qc.mode}), qc
+
+def lookup_precomputed(req: SolveRequest, qc: QueryClass) -> Optional[SolveResponse]:
+    """Serve a classified request from the precomputed store, without parsing."""
+    if precomputed is None or not precomputed.available:
+        return None
+    with span("precomputed") as s:
+        resp = precomputed.get(request_key(req.subject, req.mode, req.options, qc.format, qc.query))
+        if s is not None:
+            s.meta["hit"] = resp is not None
     return resp
 
+def finish_trace(root: Span, req: SolveRequest, resp: SolveResponse) -> Optional[Dict[str, Any]]:
+    """Fold a finished request trace into /metrics; return it when options.profile asked for it."""
+    if settings.METRICS_ENABLED:
+        outcome = "timeout" if resp.timed_out else ("ok" if resp.ok else "error")
+        span_metrics.record(root, req.mode, outcome)
+    return root.to_dict() if req.options.get("profile") else None
+
+def solve_parsed(
+    req: SolveRequest,
+    expr_or_data: Any,
+    on_step: Optional[Callable[[Step], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    key: Optional[str] = None,
+    coalesce: bool = True
+) -> SolveResponse:
+    """
+    Solve an already-parsed request, going through the result cache and
+    joining an identical solve that is already running (unless the caller
+    already leads the single flight for `key`).
+    """
+    if key is None and (settings.RESULT_CACHE_ENABLED or flights is not None):
+        key = canonical_key(req.subject, req.mode, req.options, expr_or_data)
+    
+    # Serve repeated problems from the result cache
+    resp = None
+    if settings.RESULT_CACHE_ENABLED:
+        with span("cache") as s:
+            resp = result_cache.get(key, req.options)
+            if s is not None:
+                s.meta["hit"] = resp is not None
+        if resp is not None:
+            replay_steps(resp, on_step)
+            return resp
+    
+    # Route to appropriate solver
+    def compute(flag: Any) -> SolveResponse:
+        resp = execute(req.subject, expr_or_data, req.mode, req.options, on_step=on_step, cancel=flag)
+        if settings.RESULT_CACHE_ENABLED and resp.ok:
+            with span("cache.put"):
+                result_cache.put(key, resp, req.options)
+        return resp
+    
+    if flights is None or not coalesce:
+        return compute(cancel)
+    with span("coalesce") as s:
+        resp, shared = flights.do(flight_key(key, req.options), compute, cancel)
+        if s is not None:
+            s.meta["shared"] = shared
+    if shared:
+        replay_steps(resp, on_step)
+    return resp
+
+def replay_steps(resp: SolveResponse, on_step: Optional[Callable[[Step], None]]) -> None:
+    """Feed the steps of a finished solve to a streaming callback."""
+    if on_step is not None:
+        for step in resp.steps:
+            on_step(step)
+
+def execute(
+    subject: str,
+    expr,
+    mode: str,
+    options: dict,
+    on_step: Optional[Callable[[Step], None]] = None,
+    cancel: Optional[threading.Event] = None
+) -> SolveResponse:
+    """Run a dispatch call in the solver pool, or inline when the pool is off."""
+    if solver_pool.started:
+        try:
+            with span("pool"):
+                return solver_pool.submit(subject, expr, mode, options, on_step=on_step, cancel=cancel)
+        except pickle.PicklingError:
+            pass  # unpicklable input never reached a worker: solve it in-process
+    if cancel is not None and cancel.is_set():
+        return cancelled_response()
+    with stream_steps(on_step), step_latex(options.get("step_latex", True)):
+        return run_dispatch(dispatch, subject, expr, mode, options)
+
 @app.get("/")
 def root():
     """API root endpoint."""
@@ -75,3 +702,5 @@ def root():
         "docs": "/docs",
         "health": "/health"
     }
+
+IMPORT_MS = round((time.perf_counter() - _import_started) * 1000, 1)
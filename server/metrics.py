@@ -0,0 +1,109 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from server.solvers.utils.trace import Span, walk
+
+# Upper bounds in seconds; solver stages range from microseconds (cached steps) to the pool timeout
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+class SpanMetrics:
+    """Prometheus-style histograms of span durations, labelled by stage and mode."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._hists: Dict[Tuple[str, str], _Histogram] = {}
+        self.requests: Dict[Tuple[str, str], int] = {}
+        # (stage, mode) -> [attempts, hits] for stages that report meta["hit"]
+        self.hits: Dict[Tuple[str, str], List[int]] = {}
+
+    def observe(self, stage: str, mode: str, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self._hists.get((stage, mode))
+            if h is None:
+                h = self._hists[(stage, mode)] = _Histogram(len(self.buckets))
+            h.counts[i] += 1
+            h.sum += seconds
+            h.count += 1
+
+    def record(self, root: Span, mode: str, outcome: str) -> None:
+        """Fold a finished request trace into the histograms."""
+        for s in walk(root):
+            self.observe(s.name, mode, s.ms / 1000)
+            if "hit" in s.meta:
+                with self._lock:
+                    counts = self.hits.setdefault((s.name, mode), [0, 0])
+                    counts[0] += 1
+                    counts[1] += bool(s.meta["hit"])
+        with self._lock:
+            self.requests[(mode, outcome)] = self.requests.get((mode, outcome), 0) + 1
+
+    def hit_rates(self) -> Dict[str, Dict[str, float]]:
+        """Attempts, hits and hit rate per stage, summed over modes."""
+        totals: Dict[str, List[int]] = {}
+        with self._lock:
+            for (stage, _), (attempts, hits) in self.hits.items():
+                t = totals.setdefault(stage, [0, 0])
+                t[0] += attempts
+                t[1] += hits
+        return {
+            stage: {"attempts": a, "hits": h, "hit_rate": round(h / a, 4) if a else 0.0}
+            for stage, (a, h) in sorted(totals.items())
+        }
+
+    def render(self, extra: Optional[List[str]] = None) -> str:
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP sigmalearn_stage_seconds Time spent in each solve stage.",
+            "# TYPE sigmalearn_stage_seconds histogram",
+        ]
+        with self._lock:
+            hists = sorted(self._hists.items())
+            requests = sorted(self.requests.items())
+            hits = sorted(self.hits.items())
+            for (stage, mode), h in hists:
+                labels = f'stage="{stage}",mode="{mode}"'
+                cumulative = 0
+                for bound, n in zip(self.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'sigmalearn_stage_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'sigmalearn_stage_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"sigmalearn_stage_seconds_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"sigmalearn_stage_seconds_count{{{labels}}} {h.count}")
+        lines.append("# HELP sigmalearn_requests_total Solve requests by mode and outcome.")
+        lines.append("# TYPE sigmalearn_requests_total counter")
+        for (mode, outcome), n in requests:
+            lines.append(f'sigmalearn_requests_total{{mode="{mode}",outcome="{outcome}"}} {n}')
+        if hits:
+            lines.append("# HELP sigmalearn_stage_attempts_total Attempts of stages that can hit or miss (cache lookups, integration strategies).")
+            lines.append("# TYPE sigmalearn_stage_attempts_total counter")
+            for (stage, mode), (attempts, _) in hits:
+                lines.append(f'sigmalearn_stage_attempts_total{{stage="{stage}",mode="{mode}"}} {attempts}')
+            lines.append("# HELP sigmalearn_stage_hits_total Attempts that produced the stage's result.")
+            lines.append("# TYPE sigmalearn_stage_hits_total counter")
+            for (stage, mode), (_, n) in hits:
+                lines.append(f'sigmalearn_stage_hits_total{{stage="{stage}",mode="{mode}"}} {n}')
+        lines.extend(extra or [])
+        return "\n".join(lines) + "\n"
+
+def gauge(name: str, help_text: str, values: Dict[str, float]) -> List[str]:
+    """Exposition lines for an unlabelled-by-stage gauge such as cache or pool stats."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for key, value in sorted(values.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f'{name}{{stat="{key}"}} {value}')
+    return lines
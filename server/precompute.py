@@ -0,0 +1,223 @@
+"""
+Offline solver for the curated examples shipped with the client.
+
+    python -m server.precompute [--db PATH] [--force]
+
+Every example in client/src/lib/examples.ts and every "Try this in the
+solver" query in client/src/lib/content.ts is solved through the normal
+dispatchers and written to a SQLite store keyed by the classified request.
+The API serves those entries without parsing or touching SymPy. Entries
+whose key is already present are kept, so a content update only re-solves
+what changed; keys no longer in the corpus are pruned.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.cache import normalize_options
+from server.config import settings
+from server.schemas import SolveRequest, SolveResponse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES_TS = os.path.join(ROOT, "client", "src", "lib", "examples.ts")
+CONTENT_TS = os.path.join(ROOT, "client", "src", "lib", "content.ts")
+
+TOPIC_SUBJECTS = {
+    "linear-algebra": "la",
+    "calculus-1": "calc1",
+    "calculus-2": "calc2",
+    "discrete-math": "discrete",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    key TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    query TEXT NOT NULL,
+    response TEXT NOT NULL,
+    solved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v TEXT NOT NULL
+);
+"""
+
+def request_key(subject: str, mode: str, options: Optional[Dict[str, Any]], fmt: str, query: str) -> str:
+    """Store key for a classified request (mode already resolved, query normalized)."""
+    payload = "\x1f".join([subject, mode, normalize_options(options), fmt, query])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def solver_version() -> str:
+    """Entries are rebuilt when the API or SymPy version changes."""
+    try:
+        import sympy
+        sympy_version = sympy.__version__
+    except ImportError:
+        sympy_version = "none"
+    return f"{settings.API_VERSION}/sympy-{sympy_version}"
+
+class PrecomputedStore:
+    """Read-only view of the precomputed solution store."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def get(self, key: str) -> Optional[SolveResponse]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return SolveResponse.model_validate_json(row[0])
+
+    def stats(self) -> Dict[str, Any]:
+        if self._conn is None:
+            return {"available": False}
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        return {"available": True, "entries": entries, "hits": self.hits, "misses": self.misses}
+
+def _unescape_ts(text: str) -> str:
+    return text.replace("\\`", "`").replace("\\\\", "\\")
+
+_TS_STRING = r'"((?:[^"\\]|\\.)*)"'
+
+def _ts_options(literal: str) -> Dict[str, Any]:
+    """Flat `{ key: "text" | number | true | false }` object literal as a dict."""
+    options: Dict[str, Any] = {}
+    for name, text, value in re.findall(r"(\w+):\s*(?:" + _TS_STRING + r"|([^,\s}]+))", literal):
+        options[name] = _unescape_ts(text) if value == "" else json.loads(value)
+    return options
+
+def load_examples(path: str = EXAMPLES_TS) -> List[SolveRequest]:
+    """Curated examples from examples.ts, grouped under their subject keys."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    requests: List[SolveRequest] = []
+    blocks = re.split(r"^\s{2}(la|calc1|calc2|discrete):\s*\[", source, flags=re.M)
+    for subject, body in zip(blocks[1::2], blocks[2::2]):
+        for entry in re.finditer(r"\{((?:[^{}]|\{[^{}]*\})*)\}", body):
+            options = re.search(r"\boptions:\s*\{([^{}]*)\}", entry.group(1))
+            rest = entry.group(1)[:options.start()] + entry.group(1)[options.end():] if options else entry.group(1)
+            fields = dict(re.findall(r"(\w+):\s*" + _TS_STRING, rest))
+            if "query" in fields:
+                requests.append(SolveRequest(
+                    subject=subject,
+                    query=_unescape_ts(fields["query"]),
+                    mode=fields.get("mode", "auto"),
+                    options=_ts_options(options.group(1)) if options else {},
+                ))
+    return requests
+
+def load_topic_queries(path: str = CONTENT_TS) -> List[SolveRequest]:
+    """Queries suggested inside topic pages, solved with mode="auto" like the topic view does."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    requests: List[SolveRequest] = []
+    for topic in re.finditer(r'^\s{2}"([\w-]+)/[\w-]+":\s*`(.*?)(?<!\\)`,?\s*$', source, flags=re.M | re.S):
+        subject = TOPIC_SUBJECTS.get(topic.group(1))
+        if subject is None:
+            continue
+        for query in re.findall(r"solver with the query:\s*\\`(.*?)\\`", topic.group(2)):
+            requests.append(SolveRequest(subject=subject, query=_unescape_ts(query), mode="auto"))
+    return requests
+
+def solve_offline(req: SolveRequest) -> Tuple[str, SolveRequest, SolveResponse]:
+    """Classify, parse and dispatch exactly like /api/solve, without the pool or caches."""
+    from server.solvers import dispatch
+    from server.solvers.utils.classify import classify_query
+    from server.solvers.utils.parse import parse_query
+
+    qc = classify_query(req.subject, req.query, req.mode)
+    resolved = req.model_copy(update={"mode": qc.mode})
+    key = request_key(req.subject, qc.mode, req.options, qc.format, qc.query)
+    expr_or_data, parse_warnings = parse_query(req.subject, qc.query, req.options, fmt=qc.format)
+    resp = dispatch(req.subject, expr_or_data, qc.mode, req.options)
+    resp.warnings.extend(parse_warnings)
+    return key, resolved, resp
+
+def build(db_path: str, requests: List[SolveRequest], force: bool = False) -> Dict[str, int]:
+    """Solve new or changed requests into the store and prune stale entries."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+
+    version = solver_version()
+    row = conn.execute("SELECT v FROM meta WHERE k = 'solver_version'").fetchone()
+    if force or row is None or row[0] != version:
+        conn.execute("DELETE FROM solutions")
+        conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('solver_version', ?)", (version,))
+
+    from server.solvers.utils.classify import classify_query
+
+    existing = {k for (k,) in conn.execute("SELECT key FROM solutions")}
+    wanted = set()
+    counts = {"solved": 0, "unchanged": 0, "failed": 0, "pruned": 0}
+    for req in requests:
+        qc = classify_query(req.subject, req.query, req.mode)
+        key = request_key(req.subject, qc.mode, req.options, qc.format, qc.query)
+        if key in wanted:
+            continue
+        wanted.add(key)
+        if key in existing:
+            counts["unchanged"] += 1
+            continue
+        t0 = time.perf_counter()
+        _, resolved, resp = solve_offline(req)
+        if not resp.ok:
+            counts["failed"] += 1
+            print(f"  failed  {req.subject}/{resolved.mode}: {req.query!r} {resp.errors}")
+            continue
+        conn.execute(
+            "INSERT OR REPLACE INTO solutions (key, subject, mode, query, response, solved_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, req.subject, resolved.mode, qc.query, resp.model_dump_json(exclude={"elapsed_ms"}), time.time()),
+        )
+        counts["solved"] += 1
+        print(f"  solved  {req.subject}/{resolved.mode}: {req.query!r} ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+    for key in existing - wanted:
+        conn.execute("DELETE FROM solutions WHERE key = ?", (key,))
+        counts["pruned"] += 1
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return counts
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute solutions for the curated client examples")
+    parser.add_argument("--db", default=settings.PRECOMPUTED_DB, help="SQLite store to write")
+    parser.add_argument("--force", action="store_true", help="re-solve every entry")
+    args = parser.parse_args(argv)
+
+    from server.solvers.utils.budget import enable_interrupts
+
+    # Like a pool worker, this process only solves, so budgets may interrupt its main thread
+    enable_interrupts()
+    requests = load_examples() + load_topic_queries()
+    print(f"Precomputing {len(requests)} requests into {args.db}")
+    counts = build(args.db, requests, force=args.force)
+    print(", ".join(f"{k}: {v}" for k, v in counts.items()))
+
+if __name__ == "__main__":
+    main()
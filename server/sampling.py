@@ -0,0 +1,272 @@
+import base64
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from server.cache import canonical_expr
+from server.solvers.utils.trace import span
+
+# Halvings of the initial grid spacing that adaptive refinement may apply
+MAX_ROUNDS = 10
+
+# Interval tests, relative to the robust y-span of the samples: a midpoint
+# further than BEND_TOL off its chord is curved, a step larger than JUMP_TOL
+# is a candidate discontinuity
+BEND_TOL = 1e-3
+JUMP_TOL = 0.05
+
+def _name_key(name: str) -> str:
+    # C_{1}, C_1 and C1 all name the same integration constant
+    return name.replace("_", "").replace("{", "").replace("}", "")
+
+def plottable(expr: Any, var: Any, params: Dict[str, float]) -> Any:
+    """
+    Reduce a parsed query or solver result to a real function of `var`: the
+    right-hand side of y(x) = ..., without O(...) terms, with `params`
+    substituted for constants such as C1. Raises ValueError otherwise.
+    """
+    from sympy import E, Eq, Expr, pi
+    from sympy.core.function import AppliedUndef
+
+    if isinstance(expr, Eq):
+        expr = expr.rhs if expr.lhs.has(var) and not expr.rhs.has(AppliedUndef) else expr.lhs - expr.rhs
+    if not isinstance(expr, Expr):
+        raise ValueError(f"Cannot plot a {type(expr).__name__}")
+    expr = expr.removeO().replace(lambda e: isinstance(e, AppliedUndef) and e.func.__name__ == "O", lambda e: 0)
+    values = {_name_key(k): v for k, v in params.items()}
+    subs = {s: values[_name_key(s.name)] for s in expr.free_symbols if _name_key(s.name) in values}
+    # The LaTeX parser reads e and \pi as plain symbols
+    constants = {"e": E, "pi": pi}
+    subs.update({s: constants[s.name] for s in expr.free_symbols
+                 if s.name in constants and s not in subs and s != var})
+    expr = expr.subs(subs)
+    missing = sorted(str(s) for s in expr.free_symbols if s != var)
+    if missing:
+        raise ValueError(f"Give values for {', '.join(missing)} in params")
+    if expr.has(AppliedUndef):
+        raise ValueError("Expression contains an unknown function")
+    return expr
+
+def _vectorize(fn: Callable) -> Callable:
+    """Array-in, float-array-out wrapper: non-real and non-finite values become NaN."""
+    import numpy as np
+
+    def evaluate(xs):
+        with np.errstate(all="ignore"):
+            ys = np.asarray(fn(xs))
+        ys = np.broadcast_to(ys, xs.shape)
+        if np.iscomplexobj(ys):
+            real = np.abs(ys.imag) <= 1e-12 * (np.abs(ys.real) + 1e-300)
+            ys = np.where(real, ys.real, np.nan)
+        ys = np.asarray(ys, dtype=float)
+        return np.where(np.isfinite(ys), ys, np.nan)
+    return evaluate
+
+def compile_function(expr: Any, var: Any) -> Callable:
+    """
+    `expr` as a vectorized NumPy function of `var`. Functions NumPy has no
+    counterpart for (Si, zeta, ...) fall back to mpmath, one point at a time.
+    """
+    import numpy as np
+    from sympy import lambdify
+
+    probe = np.array([0.5, 1.5])
+    try:
+        fn = _vectorize(lambdify(var, expr, "numpy"))
+        fn(probe)
+        return fn
+    except (NameError, TypeError, AttributeError):
+        pass
+    scalar = lambdify(var, expr, "mpmath")
+
+    def pointwise(x):
+        try:
+            return complex(scalar(float(x)))
+        except (ArithmeticError, ValueError, TypeError):
+            return complex("nan")
+    ufunc = np.frompyfunc(pointwise, 1, 1)
+    return _vectorize(lambda xs: np.asarray(ufunc(xs), dtype=complex))
+
+class CompiledCache:
+    """Thread-safe LRU of compiled sampling functions keyed by canonical expression."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Callable]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, expr: Any, var: Any) -> Tuple[Callable, bool]:
+        """(function, cached) for expr in var, compiling on a miss."""
+        key = f"{var}\x1f{canonical_expr(expr)}"
+        with self._lock:
+            fn = self._entries.get(key)
+            if fn is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fn, True
+            self.misses += 1
+        with span("compile"):
+            fn = compile_function(expr, var)
+        with self._lock:
+            self._entries[key] = fn
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fn, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class Samples(NamedTuple):
+    k: Any  # integer positions: x = x_min + k * unit
+    x: Any
+    y: Any  # NaN where the function is undefined or non-real
+    unit: float
+    breaks: List[float]
+
+def _span(ys) -> float:
+    """Robust y-range (2nd to 98th percentile) so poles do not flatten everything else."""
+    import numpy as np
+    finite = ys[np.isfinite(ys)]
+    if finite.size < 2:
+        return 1.0
+    lo, hi = np.percentile(finite, [2, 98])
+    return float(hi - lo) or max(1.0, float(abs(hi)))
+
+def adaptive_sample(
+    fn: Callable,
+    x_min: float,
+    x_max: float,
+    points: int,
+    max_points: int,
+    refine: bool = True
+) -> Samples:
+    """
+    Sample fn on a uniform grid of `points` intervals, then repeatedly halve
+    the intervals that bend, jump or cross a domain edge until none do or
+    `max_points` is reached. Flat and straight stretches keep the initial
+    spacing. Positions are integers k on a grid of step
+    (x_max - x_min) / (points * 2^(MAX_ROUNDS + 1)) so they delta-encode
+    exactly. Jumps that survive refinement are reported in `breaks` and get
+    a NaN sample so plots leave a gap.
+    """
+    import numpy as np
+
+    scale = 2 ** (MAX_ROUNDS + 1)
+    unit = (x_max - x_min) / (points * scale)
+    ks = np.arange(points + 1, dtype=np.int64) * scale
+    ys = fn(x_min + ks * unit)
+
+    for _ in range(MAX_ROUNDS if refine else 0):
+        budget = max_points - ks.size
+        if budget <= 0:
+            break
+        width = np.diff(ks)
+        span_y = _span(ys)
+        lo, hi = ys[:-1], ys[1:]
+        score = np.zeros(width.size)
+        # Domain edges: one end defined, the other not
+        score[np.isnan(lo) != np.isnan(hi)] = np.inf
+        with np.errstate(invalid="ignore"):
+            score = np.fmax(score, np.abs(hi - lo) / span_y / JUMP_TOL)
+            # Bend: distance of each interior sample from the chord of its neighbours
+            xs = ks.astype(float)
+            chord = ys[:-2] + (ys[2:] - ys[:-2]) * (xs[1:-1] - xs[:-2]) / (xs[2:] - xs[:-2])
+            bend = np.abs(ys[1:-1] - chord) / span_y / BEND_TOL
+        bend = np.nan_to_num(bend)
+        score[:-1] = np.fmax(score[:-1], bend)
+        score[1:] = np.fmax(score[1:], bend)
+        candidates = np.nonzero((score > 1) & (width >= 4))[0]
+        if candidates.size == 0:
+            break
+        if candidates.size > budget:
+            candidates = candidates[np.argsort(-score[candidates], kind="stable")[:budget]]
+            candidates.sort()
+        mids = (ks[candidates] + ks[candidates + 1]) // 2
+        ys = np.insert(ys, candidates + 1, fn(x_min + mids * unit))
+        ks = np.insert(ks, candidates + 1, mids)
+
+    jumps = _discontinuities(ks, ys) if refine else []
+    breaks = [float(x_min + (ks[i] + ks[i + 1]) / 2 * unit) for i in jumps]
+    if len(jumps):
+        mids = (ks[jumps] + ks[jumps + 1]) // 2
+        ys = np.insert(ys, jumps + 1, np.nan)
+        ks = np.insert(ks, jumps + 1, mids)
+    return Samples(ks, x_min + ks * unit, ys, unit, breaks)
+
+def _discontinuities(ks, ys) -> Any:
+    """
+    Intervals at the finest spacing whose step is still large and stands out
+    from its neighbours: much larger than both, which are small (a step), or off the robust
+    y-range at both ends and against the direction both neighbours move in
+    (a pole). Steep stretches next to a pole and unresolved oscillation have
+    large steps too, but neither property.
+    """
+    import numpy as np
+
+    span_y = _span(ys)
+    dy = np.diff(ys)
+    with np.errstate(invalid="ignore"):
+        large = (np.diff(ks) <= 2) & (np.abs(dy) > JUMP_TOL * span_y)
+    if not large.any():
+        return np.zeros(0, dtype=np.int64)
+    padded = np.concatenate(([0.0], dy, [0.0]))
+    left, right = padded[:-2], padded[2:]
+    with np.errstate(invalid="ignore"):
+        neighbours = np.fmax(np.abs(left), np.abs(right))
+        step = (np.abs(dy) > 2 * neighbours) & (neighbours <= JUMP_TOL * span_y)
+        pole = ((np.sign(left) == np.sign(right)) & (np.sign(left) == -np.sign(dy))
+                & (np.fmin(np.abs(ys[:-1]), np.abs(ys[1:])) > span_y))
+    # NaN neighbours already leave a gap
+    return np.nonzero(large & (step | pole) & np.isfinite(left) & np.isfinite(right))[0]
+
+def encode(samples: Samples, x_min: float, encoding: str, digits: int) -> Dict[str, Any]:
+    """
+    "json": plain x/y lists (null for undefined points).
+    "delta": integer deltas of the grid positions and of y quantized to
+    `digits` significant digits of its span, null for undefined points.
+    "binary": base64 little-endian float64 x and float32 y.
+    """
+    import math
+    import numpy as np
+
+    ks, xs, ys = samples.k, samples.x, samples.y
+    if encoding == "binary":
+        return {
+            "x_dtype": "<f8",
+            "y_dtype": "<f4",
+            "x": base64.b64encode(xs.astype("<f8").tobytes()).decode("ascii"),
+            "y": base64.b64encode(ys.astype("<f4").tobytes()).decode("ascii"),
+        }
+    if encoding == "delta":
+        span_y = _span(ys)
+        step = 10.0 ** (math.floor(math.log10(span_y)) - digits + 1)
+        y_deltas: List[Optional[int]] = []
+        last = 0
+        for y in ys.tolist():
+            if math.isnan(y):
+                y_deltas.append(None)
+                continue
+            q = round(y / step)
+            y_deltas.append(q - last)
+            last = q
+        return {
+            "x_start": x_min,
+            "x_step": samples.unit,
+            "x_deltas": np.diff(ks, prepend=0).tolist(),
+            "y_step": step,
+            "y_deltas": y_deltas,
+        }
+    return {
+        "x": xs.tolist(),
+        "y": [None if math.isnan(y) else y for y in ys.tolist()],
+    }
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, field_serializer
 from typing import List, Optional, Literal, Dict, Any
 
 Subject = Literal["la", "calc1", "calc2", "discrete"]
@@ -26,6 +26,25 @@ class Step(BaseModel):
     after_latex: Optional[str] = None
     note: Optional[str] = None
     meta: Dict[str, Any] = Field(default_factory=dict)
+    
+    # Unrendered SymPy objects; LaTeX is produced lazily on serialization
+    _before: Any = PrivateAttr(default=None)
+    _after: Any = PrivateAttr(default=None)
+    _latex: Any = PrivateAttr(default=None)
+    
+    def attach_exprs(self, before: Any, after: Any, renderer: Any) -> None:
+        """Keep the step's expressions for rendering through `renderer.render`."""
+        self._before = before
+        self._after = after
+        self._latex = renderer
+    
+    @field_serializer("before_latex", "after_latex")
+    def _render_latex(self, value: Optional[str], info):
+        if value is None and self._latex is not None:
+            obj = self._before if info.field_name == "before_latex" else self._after
+            if obj is not None:
+                return self._latex.render(obj)
+        return value
 
 class SolveRequest(BaseModel):
     subject: Subject
@@ -40,6 +59,42 @@ class SolveResponse(BaseModel):
     warnings: List[str] = Field(default_factory=list)
     errors: List[str] = Field(default_factory=list)
     elapsed_ms: Optional[int] = None
+    timed_out: bool = False
+    profile: Optional[Dict[str, Any]] = None  # span tree, when options.profile is set
+    result_srepr: Optional[str] = None  # srepr of the result, when options.result_srepr is set
+
+class SampleRequest(BaseModel):
+    query: Optional[str] = None  # expression to sample, plain text or LaTeX
+    solve: Optional[SolveRequest] = None  # or: sample the final result of this solve
+    subject: Subject = "calc1"
+    var: str = "x"
+    x_min: float = -10.0
+    x_max: float = 10.0
+    points: int = Field(default=200, ge=2)  # initial uniform intervals
+    max_points: Optional[int] = None  # refinement budget; Settings.SAMPLE_MAX_POINTS by default
+    refine: bool = True
+    params: Dict[str, float] = Field(default_factory=dict)  # values for constants such as C1
+    encoding: Literal["json", "delta", "binary"] = "delta"
+    digits: int = Field(default=6, ge=1, le=15)  # significant digits kept by the delta encoding
+
+class SampleResponse(BaseModel):
+    ok: bool
+    expr_latex: Optional[str] = None
+    encoding: str = "delta"
+    count: int = 0
+    data: Dict[str, Any] = Field(default_factory=dict)
+    breaks: List[float] = Field(default_factory=list)  # x of detected discontinuities
+    cached: bool = False  # compiled function came from the cache
+    warnings: List[str] = Field(default_factory=list)
+    errors: List[str] = Field(default_factory=list)
+    elapsed_ms: Optional[int] = None
+
+class BatchSolveRequest(BaseModel):
+    items: List[SolveRequest]
+
+class BatchSolveResponse(BaseModel):
+    results: List[SolveResponse] = Field(default_factory=list)
+    unique: int = 0
 
 class OcrResponse(BaseModel):
     ok: bool
@@ -50,3 +105,13 @@ class HealthResponse(BaseModel):
     status: str
     ocr: bool
     java: bool
+    cache: Optional[Dict[str, Any]] = None
+    pool: Optional[Dict[str, Any]] = None
+    parse: Optional[Dict[str, Any]] = None
+    precomputed: Optional[Dict[str, Any]] = None
+    admission: Optional[Dict[str, Any]] = None
+    coalesce: Optional[Dict[str, Any]] = None
+    intern: Optional[Dict[str, Any]] = None
+    stages: Optional[Dict[str, Any]] = None
+    sample: Optional[Dict[str, Any]] = None
+    warmup: Optional[Dict[str, Any]] = None
@@ -1,3 +1,16 @@
+from typing import Any, Dict
+
+from server.schemas import SolveResponse
 from . import algebra, calculus, linear_algebra, discrete
 
-__all__ = ["algebra", "calculus", "linear_algebra", "discrete"]
+__all__ = ["algebra", "calculus", "linear_algebra", "discrete", "dispatch"]
+
+def dispatch(subject: str, expr: Any, mode: str, options: Dict) -> SolveResponse:
+    """Route a parsed query to the solver module for its subject."""
+    if subject == "la":
+        return linear_algebra.dispatch(expr, mode, options)
+    elif subject in ("calc1", "calc2"):
+        return calculus.dispatch(expr, mode, options)
+    elif subject == "discrete":
+        return discrete.dispatch(expr, mode, options)
+    return algebra.dispatch(expr, mode, options)
@@ -1,4 +1,5 @@
 from server.schemas import SolveResponse
+from server.solvers.utils.simplify import budgeted_simplify
 from server.solvers.utils.steps import StepLogger
 from typing import Any, Dict
 
@@ -15,7 +16,7 @@ def solve_algebra(expr: Any, options: Dict) -> SolveResponse:
     errors: list[str] = []
     
     try:
-        from sympy import Eq, symbols, solve, expand, factor, simplify, sympify
+        from sympy import Eq, symbols, solve, expand, factor, sympify
         
         # Handle string input
         if isinstance(expr, str):
@@ -56,10 +57,10 @@ def solve_algebra(expr: Any, options: Dict) -> SolveResponse:
             log.add("Factor", before, after)
             before = after
         
-        after = simplify(before)
-        if after != before:
-            log.add("Simplify", before, after)
-            before = after
+        after, meta = budgeted_simplify(before, options.get("simplify_budget_ms"))
+        # Logged even when nothing changed: meta records which passes ran out of budget
+        log.add("Simplify", before, after, note=None if after != before else "No simpler form found", meta=meta)
+        before = after
         
         return SolveResponse(
             ok=True,
@@ -1,6 +1,16 @@
+from server.config import settings
 from server.schemas import SolveResponse
+from server.solvers.utils.budget import BudgetExceeded, can_interrupt, deadline_passed, time_budget
+from server.solvers.utils.differentiate import DiffEngine
+from server.solvers.utils.integration import IntegrationEngine, continuous_on, evaluate_at
+from server.solvers.utils.numeric import (
+    Estimate, describe, disagrees, limit_estimate, numeric_mode, partial_sums, quad_estimate,
+    taylor_coefficients, to_sympy
+)
+from server.solvers.utils.simplify import budgeted_simplify
 from server.solvers.utils.steps import StepLogger
-from typing import Any, Dict
+from server.solvers.utils.trace import span
+from typing import Any, Callable, Dict, List, Optional
 
 def dispatch(expr: Any, mode: str, options: Dict) -> SolveResponse:
     """Dispatch calculus solver based on mode."""
@@ -16,24 +26,43 @@ def dispatch(expr: Any, mode: str, options: Dict) -> SolveResponse:
         return do_ode(expr, options)
     return SolveResponse(ok=False, errors=[f"Unsupported mode: {mode}"])
 
-def detect_diff_rule(expr: Any, var: Any) -> str:
-    """Detect which differentiation rule to apply."""
-    try:
-        from sympy import Mul, Pow, Add
-        
-        if expr.is_Mul:
-            return "Product Rule"
-        if expr.is_Pow and expr.base.has(var) and expr.exp.is_Number:
-            return "Power Rule"
-        if expr.is_Add:
-            return "Sum Rule"
-        if expr.func.__name__ in ("sin", "cos", "exp", "log", "tan"):
-            if expr.args[0] != var:
-                return "Chain Rule"
-            return f"{expr.func.__name__} derivative"
-        return "Differentiation"
-    except Exception:
-        return "Differentiation"
+NUMERIC_UNAVAILABLE = "Expression cannot be evaluated numerically (free symbols or non-real bounds); using symbolic evaluation"
+
+def numeric_first(
+    mode: str,
+    estimate_fn: Callable[[], Optional[Estimate]],
+    before: Any,
+    log: StepLogger
+) -> Optional[Estimate]:
+    """Compute and log the numeric estimate, unless the request asked for symbolic only."""
+    if mode == "symbolic":
+        return None
+    with span("numeric") as s:
+        estimate = estimate_fn()
+        if s is not None:
+            s.meta["converged"] = estimate is not None and estimate.converged
+    if estimate is not None:
+        log.add("Numeric estimate", before, to_sympy(estimate), note=describe(estimate), meta=estimate.meta())
+    return estimate
+
+def symbolic_budget(estimate: Optional[Estimate]) -> Optional[float]:
+    """Seconds left to the symbolic attempt: bounded only once a converged estimate exists."""
+    if estimate is None or not estimate.converged:
+        return None
+    return settings.NUMERIC_SYMBOLIC_BUDGET_MS / 1000
+
+# With a converged estimate in hand, an attempt that cannot be cut off is not worth starting
+UNBOUNDED_SYMBOLIC = "Symbolic evaluation cannot be time-limited here; result is the numeric estimate"
+
+def numeric_response(log: StepLogger, warnings: List[str], estimate: Estimate, reason: str) -> SolveResponse:
+    """Answer with the already logged numeric estimate."""
+    warnings.append(reason)
+    if estimate.diverged:
+        warnings.append("The integral appears to diverge; the numeric estimate is not its value")
+    elif not estimate.converged:
+        warnings.append(f"Numeric estimate did not converge (estimated error {estimate.error:.1e}); "
+                        "the limit or integral may not exist")
+    return SolveResponse(ok=True, result_latex=None, steps=log.get_steps(), warnings=warnings)
 
 def do_derivative(expr: Any, options: Dict) -> SolveResponse:
     """Compute derivative with steps."""
@@ -42,27 +71,25 @@ def do_derivative(expr: Any, options: Dict) -> SolveResponse:
     errors: list[str] = []
     
     try:
-        from sympy import symbols, diff, simplify
+        from sympy import symbols
         
         var_name = options.get("var", "x")
         x = symbols(var_name)
         
         log.add("Initial expression", None, expr)
         
-        rule = detect_diff_rule(expr, x)
-        log.add(f"{rule}: prepare", expr, None)
+        engine = DiffEngine(x, log)
+        result = engine.differentiate(expr)
+        if engine.cut_off:
+            warnings.append(f"Step limit ({settings.MAX_STEPS}) reached; remaining subexpressions were differentiated without steps")
+        log.add(f"Combine: d/d{var_name}", expr, result,
+                note=f"{engine.rules_applied} rule applications, {engine.memo_hits} repeated subexpressions reused")
         
-        result = diff(expr, x)
-        log.add(f"Apply d/d{var_name}", expr, result)
-        
-        # Try to simplify the result
-        try:
-            simplified = simplify(result)
-            if simplified != result:
-                log.add("Simplify", result, simplified)
-                result = simplified
-        except Exception:
-            pass
+        # Simplify within the request's budget
+        simplified, meta = budgeted_simplify(result, options.get("simplify_budget_ms"))
+        # Logged even when nothing changed: meta records which passes ran out of budget
+        log.add("Simplify", result, simplified, note=None if simplified != result else "No simpler form found", meta=meta)
+        result = simplified
         
         return SolveResponse(
             ok=True,
@@ -82,7 +109,7 @@ def do_integral(expr: Any, options: Dict) -> SolveResponse:
     errors: list[str] = []
     
     try:
-        from sympy import symbols, integrate, simplify, Add
+        from sympy import symbols, sympify, integrate, Integral
         
         var_name = options.get("var", "x")
         x = symbols(var_name)
@@ -90,30 +117,80 @@ def do_integral(expr: Any, options: Dict) -> SolveResponse:
         lower = options.get("lower", None)
         upper = options.get("upper", None)
         
+        # LaTeX input such as \int_0^1 x dx arrives as an unevaluated Integral
+        if isinstance(expr, Integral) and len(expr.limits) == 1:
+            limits = expr.limits[0]
+            x = limits[0]
+            var_name = str(x)
+            if len(limits) == 3:
+                definite, lower, upper = True, limits[1], limits[2]
+            expr = expr.function
+        
         log.add("Initial expression", None, expr)
         
         if definite and lower is not None and upper is not None:
+            lower, upper = sympify(lower), sympify(upper)
             log.add("Set up definite integral", expr, None, note=f"∫[{lower}, {upper}] ... d{var_name}")
-            result = integrate(expr, (x, lower, upper))
-            log.add(f"Evaluate from {lower} to {upper}", expr, result)
+            mode = numeric_mode(options, warnings)
+            estimate = numeric_first(mode, lambda: quad_estimate(expr, x, lower, upper),
+                                     Integral(expr, (x, lower, upper)), log)
+            if mode == "numeric":
+                if estimate is not None:
+                    return numeric_response(log, warnings, estimate, "Result is a numeric estimate")
+                warnings.append(NUMERIC_UNAVAILABLE)
+            
+            budget = symbolic_budget(estimate)
+            if budget is not None and not can_interrupt():
+                return numeric_response(log, warnings, estimate, UNBOUNDED_SYMBOLIC)
+            engine = IntegrationEngine(x, log, budget_ms=budget * 1000 if budget else None)
+            result = None
+            # F(b) - F(a) holds only when the integrand has no singularity on [a, b]
+            if continuous_on(expr, x, lower, upper):
+                antiderivative = engine.integrate(expr)
+                if antiderivative is not None:
+                    result = (evaluate_at(antiderivative, x, upper, "-")
+                              - evaluate_at(antiderivative, x, lower, "+")).doit()
+                    log.add("Fundamental Theorem of Calculus", antiderivative, result,
+                            note=f"F({upper}) - F({lower})")
+            if result is None:
+                try:
+                    with time_budget(max(engine.remaining_ms(), 1.0) / 1000):
+                        result = integrate(expr, (x, lower, upper))
+                except BudgetExceeded:
+                    if deadline_passed():
+                        raise
+                    if estimate is not None:
+                        return numeric_response(log, warnings, estimate,
+                                                f"Symbolic integration cut off after {engine.budget_ms:g} ms; "
+                                                "result is the numeric estimate")
+                    errors.append(f"Definite integral not found within {engine.budget_ms:g} ms")
+                    return SolveResponse(ok=False, steps=log.get_steps(), errors=errors, warnings=warnings)
+                if result.has(Integral) and estimate is not None:
+                    return numeric_response(log, warnings, estimate,
+                                            "No closed form found; result is the numeric estimate")
+                log.add(f"Evaluate from {lower} to {upper}", expr, result)
+            if estimate is not None and disagrees(result, estimate):
+                warnings.append("Symbolic result disagrees with the numeric estimate")
         else:
             log.add("Set up indefinite integral", expr, None, note=f"∫ ... d{var_name}")
             
-            # Check if it's a sum
-            if isinstance(expr, Add):
-                log.add("Apply sum rule", expr, None, note="∫(f + g) = ∫f + ∫g")
-            
-            result = integrate(expr, x)
-            log.add("Integrate", expr, result)
-            
-            # Try to simplify
-            try:
-                simplified = simplify(result)
-                if simplified != result:
-                    log.add("Simplify", result, simplified)
-                    result = simplified
-            except Exception:
-                pass
+            engine = IntegrationEngine(x, log)
+            result = engine.integrate(expr)
+            if result is not None:
+                log.add(f"Combine: ∫ d{var_name}", Integral(expr, x), result,
+                        note=f"Found by the {engine.stage} stage")
+                
+                # Simplify within the request's budget
+                simplified, meta = budgeted_simplify(result, options.get("simplify_budget_ms"))
+                log.add("Simplify", result, simplified,
+                        note=None if simplified != result else "No simpler form found", meta=meta)
+                result = simplified
+            else:
+                result = Integral(expr, x)
+                if engine.timed_out:
+                    warnings.append(f"Integration budget of {settings.INTEGRAL_BUDGET_MS:g} ms exhausted")
+                warnings.append("No closed-form antiderivative found")
+                log.add("Integrate", expr, result, note="No closed form found")
         
         return SolveResponse(
             ok=True,
@@ -133,20 +210,48 @@ def do_limit(expr: Any, options: Dict) -> SolveResponse:
     errors: list[str] = []
     
     try:
-        from sympy import symbols, limit, oo
+        from sympy import symbols, sympify, limit, oo, Limit
         
         var_name = options.get("var", "x")
         x = symbols(var_name)
         point = options.get("point", 0)
         
+        # LaTeX input such as \lim_{x \to 0} arrives as an unevaluated Limit
+        if isinstance(expr, Limit):
+            expr, x, point = expr.args[0], expr.args[1], expr.args[2]
+            var_name = str(x)
+        
         # Handle infinity
         if str(point).lower() in ("inf", "infinity", "oo"):
             point = oo
         
+        point = sympify(point)
         log.add(f"Limit as {var_name} → {point}", expr, None)
         
-        result = limit(expr, x, point)
+        mode = numeric_mode(options, warnings)
+        estimate = numeric_first(mode, lambda: limit_estimate(expr, x, point), Limit(expr, x, point), log)
+        if mode == "numeric":
+            if estimate is not None:
+                return numeric_response(log, warnings, estimate, "Result is a numeric estimate")
+            warnings.append(NUMERIC_UNAVAILABLE)
+        
+        budget = symbolic_budget(estimate)
+        if budget is not None and not can_interrupt():
+            return numeric_response(log, warnings, estimate, UNBOUNDED_SYMBOLIC)
+        try:
+            with time_budget(budget):
+                result = limit(expr, x, point)
+        except BudgetExceeded:
+            if deadline_passed():
+                raise
+            return numeric_response(log, warnings, estimate,
+                                    f"Symbolic evaluation cut off after {settings.NUMERIC_SYMBOLIC_BUDGET_MS:g} ms; "
+                                    "result is the numeric estimate")
+        if result.has(Limit) and estimate is not None:
+            return numeric_response(log, warnings, estimate, "No closed form found; result is the numeric estimate")
         log.add("Evaluate limit", expr, result)
+        if estimate is not None and disagrees(result, estimate):
+            warnings.append("Symbolic result disagrees with the numeric estimate")
         
         return SolveResponse(
             ok=True,
@@ -166,17 +271,66 @@ def do_series(expr: Any, options: Dict) -> SolveResponse:
     errors: list[str] = []
     
     try:
-        from sympy import symbols, series
+        from sympy import symbols, sympify, series, Add, Dummy, Float, O
         
         var_name = options.get("var", "x")
         x = symbols(var_name)
-        point = options.get("point", 0)
-        n = options.get("n", 6)
+        point = sympify(options.get("point", 0))
+        n = int(options.get("n", 6))
         
         log.add(f"Taylor series centered at {var_name}={point}", expr, None)
         
-        result = series(expr, x, point, n)
-        log.add(f"Expand to order {n}", expr, result)
+        mode = numeric_mode(options, warnings)
+        coeffs = None
+        if mode != "symbolic":
+            with span("numeric"):
+                coeffs = taylor_coefficients(expr, x, point, n)
+            if coeffs is not None:
+                approx = Add(*[Float(float(c), 15) * (x - point) ** k for k, c in enumerate(coeffs)])
+                log.add("Numeric Taylor coefficients", expr, approx + O((x - point) ** n, (x, point)),
+                        note=f"Numerical differentiation at {settings.NUMERIC_DPS} digits",
+                        meta={"engine": "numeric", "coefficients": [float(c) for c in coeffs]})
+            elif mode == "numeric":
+                warnings.append(NUMERIC_UNAVAILABLE)
+        
+        if coeffs is not None and mode != "numeric" and not can_interrupt():
+            warnings.append("Symbolic expansion cannot be time-limited here; coefficients are numeric")
+        elif mode != "numeric" or coeffs is None:
+            try:
+                with time_budget(settings.NUMERIC_SYMBOLIC_BUDGET_MS / 1000 if coeffs is not None else None):
+                    result = series(expr, x, point, n)
+            except BudgetExceeded:
+                if deadline_passed():
+                    raise
+                warnings.append(f"Symbolic expansion cut off after {settings.NUMERIC_SYMBOLIC_BUDGET_MS:g} ms; "
+                                "coefficients are numeric")
+            else:
+                log.add(f"Expand to order {n}", expr, result)
+                # Exact coefficients of (x - point)^k, when the result is a plain power series
+                t = Dummy("t")
+                shifted = result.removeO().subs(x, t + point).expand()
+                exact = [shifted.coeff(t, k) for k in range(n)]
+                if all(c.is_number for c in exact) and Add(*[c * t ** k for k, c in enumerate(exact)]) == shifted:
+                    coeffs = exact
+                else:
+                    coeffs = None
+        
+        at = options.get("at")
+        if at is not None:
+            points = [float(sympify(v)) for v in (at if isinstance(at, (list, tuple)) else [at])]
+            if len(points) > settings.NUMERIC_MAX_POINTS:
+                warnings.append(f"Evaluating partial sums at the first {settings.NUMERIC_MAX_POINTS} points only")
+                points = points[:settings.NUMERIC_MAX_POINTS]
+            if coeffs is None or not point.is_real:
+                warnings.append("Partial sums need a power series with numeric coefficients at a finite point")
+            else:
+                with span("partial_sums"):
+                    sums = partial_sums(coeffs, point, points, expr, x)
+                last = sums["partial_sums"][0][-1]
+                note = f"S_{n}({points[0]:g}) = {last:.12g}"
+                if "errors" in sums:
+                    note += f", |f - S_{n}| = {sums['errors'][0][-1]:.1e}"
+                log.add("Partial sums", None, None, note=note, meta={"engine": "numeric", **sums})
         
         return SolveResponse(
             ok=True,
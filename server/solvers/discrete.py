@@ -1,6 +1,13 @@
+from server.config import settings
 from server.schemas import SolveResponse
 from server.solvers.utils.steps import StepLogger
-from typing import Any, Dict
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import ast
+import math
+import re
+import threading
 
 def dispatch(expr: Any, mode: str, options: Dict) -> SolveResponse:
     """Dispatch discrete math solver based on mode."""
@@ -8,27 +15,89 @@ def dispatch(expr: Any, mode: str, options: Dict) -> SolveResponse:
         return simplify_logic(expr, options)
     elif mode == "combinatorics":
         return do_combinatorics(expr, options)
+    elif mode == "recurrence":
+        return do_recurrence(expr, options)
     return SolveResponse(ok=False, errors=[f"Unsupported mode: {mode}"])
 
 def simplify_logic(expr: Any, options: Dict) -> SolveResponse:
-    """Simplify logical expressions."""
+    """
+    Simplify logical expressions with a bitset truth table and a reduced
+    ordered BDD: classify the formula, then minimize it to an irredundant
+    DNF or CNF (options.form picks one; the shorter is used otherwise).
+    """
     log = StepLogger()
     warnings: list[str] = []
     errors: list[str] = []
     
     try:
-        from sympy.logic import simplify_logic as sympy_simplify
-        from sympy import symbols
-        from sympy.logic.boolalg import And, Or, Not
+        from sympy import false, true
+        from sympy.logic.boolalg import Boolean
+        from server.solvers.utils.boolean import BDD, TruthTable, literal_count, variables_of
         
-        log.add("Initial expression", None, expr)
+        if not isinstance(expr, Boolean):
+            raise ValueError("Expected a formula such as (A & B) | ~C")
+        names = variables_of(expr)
+        n = len(names)
+        if n > settings.LOGIC_MAX_VARS:
+            raise ValueError(f"At most {settings.LOGIC_MAX_VARS} variables are supported, got {n}")
         
-        simplified = sympy_simplify(expr)
-        log.add("Apply logical identities", expr, simplified)
+        log.add("Initial expression", None, expr, note=f"{n} variable{'s' if n != 1 else ''}: {', '.join(map(str, names))}")
+        
+        bdd = BDD(names)
+        root = bdd.build(expr)
+        satisfying = bdd.sat_count(root)
+        
+        if n <= settings.LOGIC_TRUTH_TABLE_MAX_VARS:
+            tt = TruthTable(names)
+            table = tt.evaluate(expr)
+            meta = {"variables": [str(v) for v in names]}
+            if n <= settings.LOGIC_TABLE_DISPLAY_VARS:
+                meta["values"] = tt.bits(table)
+            log.add("Truth table", None, None,
+                    note=f"{tt.count(table)} of {tt.rows} rows are true", meta=meta)
+        
+        log.add("Binary decision diagram", None, None,
+                note=f"Reduced ordered BDD with {bdd.size(root)} nodes (order {' < '.join(map(str, names))})")
+        
+        if root == 1:
+            log.add("Tautology", expr, true, note="The BDD is the constant 1: true under every assignment")
+            result = true
+        elif root == 0:
+            log.add("Contradiction", expr, false, note="The BDD is the constant 0: no assignment satisfies it")
+            result = false
+        else:
+            example = bdd.any_sat(root)
+            log.add("Satisfiable", None, None,
+                    note=f"{satisfying} of {1 << n} assignments; e.g. "
+                         + ", ".join(f"{k} = {int(v)}" for k, v in example.items()))
+            
+            form = options.get("form")
+            dnf_cubes, _ = bdd.isop(root, root)
+            cnf_cubes, _ = bdd.isop(bdd.neg(root), bdd.neg(root))
+            candidates = []
+            for name, cubes, to_expr in (("dnf", dnf_cubes, bdd.to_dnf), ("cnf", cnf_cubes, bdd.to_cnf)):
+                if form not in (None, name):
+                    continue
+                if len(cubes) > settings.LOGIC_MAX_CUBES:
+                    warnings.append(f"{name.upper()} has {len(cubes)} terms; not expanded")
+                    continue
+                normal = to_expr(cubes)
+                rule, unit = ("Disjunctive normal form", "term") if name == "dnf" else ("Conjunctive normal form", "clause")
+                log.add(rule, expr, normal,
+                        note=f"{len(cubes)} {unit}{'s' if len(cubes) != 1 else ''}, {literal_count(cubes)} literals (irredundant cover from the BDD)")
+                candidates.append((literal_count(cubes), normal))
+            
+            if candidates:
+                result = min(candidates, key=lambda c: c[0])[1]
+                if bdd.build(result) != root:
+                    raise ValueError("Minimized form is not equivalent to the input")
+                log.add("Simplified", expr, result, note="Equivalent to the input: both build the same BDD")
+            else:
+                result = expr
         
         return SolveResponse(
             ok=True,
-            result_latex=None,
+            result_latex=log.latex.render(result),
             steps=log.get_steps(),
             warnings=warnings
         )
@@ -37,55 +106,447 @@ def simplify_logic(expr: Any, options: Dict) -> SolveResponse:
         errors.append(f"Logic simplification error: {str(e)}")
         return SolveResponse(ok=False, steps=log.get_steps(), errors=errors, warnings=warnings)
 
+
+class CombinatoricsError(ValueError):
+    """Input the combinatorics engine refuses to evaluate."""
+
+class BigInteger:
+    """
+    Display form of an integer too long to print in full: digit count plus
+    leading and trailing digits. Rendered through the LaTeX printer hook.
+    """
+    __slots__ = ("sign", "digits", "leading", "trailing")
+    
+    def __init__(self, value: int, keep: int = 12):
+        self.sign = "-" if value < 0 else ""
+        value = abs(value)
+        self.digits = decimal_digits(value)
+        self.leading = str(value // 10 ** (self.digits - keep))
+        self.trailing = str(value % 10 ** keep).zfill(keep)
+    
+    def __str__(self) -> str:
+        return f"{self.sign}{self.leading}…{self.trailing} ({self.digits} digits)"
+    
+    def _latex(self, printer) -> str:
+        return (
+            f"{self.sign}{self.leading[0]}.{self.leading[1:]}\\ldots \\times 10^{{{self.digits - 1}}}"
+            f"\\quad (\\text{{{self.digits} digits, ending }}{self.trailing})"
+        )
+
+def decimal_digits(value: int) -> int:
+    """Number of decimal digits of |value| without converting it to a string."""
+    value = abs(value)
+    if value < 10:
+        return 1
+    est = int((value.bit_length() - 1) * math.log10(2)) + 1
+    return est + 1 if value >= 10 ** est else est
+
+def format_integer(value: int, max_digits: int) -> Any:
+    """SymPy Integer for printable values, BigInteger for astronomically large ones."""
+    from sympy import Integer
+    
+    if decimal_digits(value) <= max_digits:
+        return Integer(value)
+    return BigInteger(value)
+
+def _log2_factorial(n: int) -> float:
+    return math.lgamma(n + 1) / math.log(2)
+
+def _log2_binomial(n: int, k: int) -> float:
+    return _log2_factorial(n) - _log2_factorial(k) - _log2_factorial(n - k)
+
+def _derangement_map(lo: int, hi: int) -> Tuple[int, int]:
+    """
+    Compose D(k) = k·D(k-1) + (-1)^k for k in [lo, hi) by binary splitting,
+    returning (A, B) such that D(hi-1) = A·D(lo-1) + B.
+    """
+    if hi - lo == 1:
+        return lo, -1 if lo % 2 else 1
+    mid = (lo + hi) // 2
+    a1, b1 = _derangement_map(lo, mid)
+    a2, b2 = _derangement_map(mid, hi)
+    return a2 * a1, a2 * b1 + b2
+
+class _Table:
+    """Integer sequence extended on demand by its recurrence and kept for reuse."""
+    
+    def __init__(self, seed: List[int], step: Callable[[List[int]], int]):
+        self.values = list(seed)
+        self.step = step
+        self._lock = threading.Lock()
+    
+    def get(self, n: int) -> int:
+        if n >= len(self.values):
+            with self._lock:
+                while len(self.values) <= n:
+                    self.values.append(self.step(self.values))
+        return self.values[n]
+
+def _catalan_step(c: List[int]) -> int:
+    n = len(c) - 1
+    return c[n] * 2 * (2 * n + 1) // (n + 2)
+
+# Bell triangle: each row starts with the last entry of the previous row
+_bell_row: List[int] = [1]
+
+def _bell_step(b: List[int]) -> int:
+    global _bell_row
+    row = [_bell_row[-1]]
+    for x in _bell_row:
+        row.append(row[-1] + x)
+    _bell_row = row
+    return row[0]
+
+_CATALAN = _Table([1], _catalan_step)
+_BELL = _Table([1], _bell_step)
+
+STIRLING_CACHED_ROWS = 256
+
+@lru_cache(maxsize=2 * STIRLING_CACHED_ROWS)
+def _stirling_row(kind: int, n: int) -> Tuple[int, ...]:
+    """Row n (≤ STIRLING_CACHED_ROWS) of the unsigned Stirling numbers of the first or second kind."""
+    if n == 0:
+        return (1,)
+    return _next_stirling_row(kind, _stirling_row(kind, n - 1))
+
+def _next_stirling_row(kind: int, prev: Tuple[int, ...]) -> Tuple[int, ...]:
+    n = len(prev)
+    row = [0] * (n + 1)
+    for k in range(1, n + 1):
+        right = prev[k] if k < n else 0
+        row[k] = prev[k - 1] + ((n - 1) if kind == 1 else k) * right
+    return tuple(row)
+
+def stirling(kind: int, n: int, k: int) -> int:
+    if n <= STIRLING_CACHED_ROWS:
+        return _stirling_row(kind, n)[k]
+    # Rows past the cached range are rolled forward without being stored
+    row = _stirling_row(kind, STIRLING_CACHED_ROWS)
+    for _ in range(STIRLING_CACHED_ROWS, n):
+        row = _next_stirling_row(kind, row)
+    return row[k]
+
+def _is_prime(m: int) -> bool:
+    from sympy import isprime
+    return bool(isprime(m))
+
+def _lucas(n: int, k: int, p: int) -> int:
+    """C(n, k) mod prime p via Lucas' theorem."""
+    value = 1
+    while k:
+        ni, ki = n % p, k % p
+        if ki > ni:
+            return 0
+        value = value * _small_binomial_mod(ni, ki, p) % p
+        n, k = n // p, k // p
+    return value
+
+def _small_binomial_mod(n: int, k: int, p: int) -> int:
+    """C(n, k) mod prime p for n < p, as a falling product times an inverse."""
+    k = min(k, n - k)
+    if k > settings.COMBINATORICS_MAX_LOOP:
+        raise CombinatoricsError(f"C({n}, {k}) mod {p} needs too many steps")
+    num = den = 1
+    for i in range(k):
+        num = num * (n - i) % p
+        den = den * (i + 1) % p
+    return num * pow(den, -1, p) % p
+
+def _primes_upto(n: int) -> List[int]:
+    sieve = bytearray([1]) * (n + 1)
+    sieve[:2] = b"\0\0"
+    for i in range(2, math.isqrt(n) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, n + 1, i)))
+    return [i for i, flag in enumerate(sieve) if flag]
+
+def _legendre(n: int, p: int) -> int:
+    """Exponent of p in n!."""
+    e = 0
+    while n:
+        n //= p
+        e += n
+    return e
+
+def _binomial_by_primes(n: int, k: int, m: Optional[int]) -> int:
+    """
+    C(n, k) as the product of p^e over primes p ≤ n, e from Legendre's
+    formula. Nothing is divided, so it works for composite m, and the exact
+    product is multiplied pairwise instead of the quadratic math.comb loop.
+    """
+    factors = []
+    for p in _primes_upto(n):
+        e = _legendre(n, p) - _legendre(k, p) - _legendre(n - k, p)
+        if e:
+            factors.append(pow(p, e, m) if m else p ** e)
+    if m:
+        value = 1
+        for f in factors:
+            value = value * f % m
+        return value
+    while len(factors) > 1:
+        factors = [factors[i] * factors[i + 1] if i + 1 < len(factors) else factors[i]
+                   for i in range(0, len(factors), 2)]
+    return factors[0] if factors else 1
+
+# Below this k, math.comb's k-term product beats sieving up to n
+_COMB_DIRECT_K = 1000
+
+class CombinatoricsEvaluator:
+    """
+    Exact integer evaluator for combinatorial expressions such as
+    `C(100,3)*P(20,5) + 5!`. Only integer literals, arithmetic and the
+    functions in FUNCTIONS are accepted. With `mod` every value is reduced
+    modulo m, and functions use modular algorithms where they exist.
+    """
+    
+    FUNCTIONS = {
+        "C": "Combination", "binom": "Combination",
+        "P": "Permutation",
+        "fact": "Factorial", "factorial": "Factorial",
+        "multinomial": "Multinomial",
+        "S": "Stirling number (2nd kind)", "stirling2": "Stirling number (2nd kind)",
+        "s": "Stirling number (1st kind)", "stirling1": "Stirling number (1st kind)",
+        "catalan": "Catalan number", "Cat": "Catalan number",
+        "bell": "Bell number", "B": "Bell number",
+        "D": "Derangements", "derangements": "Derangements", "subfactorial": "Derangements",
+    }
+    UNARY = ("Factorial", "Catalan number", "Bell number", "Derangements")
+    
+    def __init__(
+        self,
+        mod: Optional[int] = None,
+        max_bits: int = 1_000_000,
+        on_call: Optional[Callable[[str, str, int], None]] = None
+    ):
+        self.mod = mod
+        self.max_bits = max_bits
+        self.on_call = on_call
+        self.prime_mod = bool(mod) and _is_prime(mod)
+    
+    def evaluate(self, text: str) -> int:
+        try:
+            tree = ast.parse(preprocess_combinatorics(text), mode="eval")
+        except SyntaxError as e:
+            raise CombinatoricsError(f"Could not read expression: {e.msg}")
+        return self._eval(tree.body, self.mod)
+    
+    def _guard(self, log2_size: float, what: str) -> None:
+        """Refuse exact values whose size would exceed max_bits."""
+        if log2_size > self.max_bits:
+            hint = "" if self.mod else "; pass options.mod to work modulo m"
+            raise CombinatoricsError(
+                f"{what} has about {int(log2_size * math.log10(2)) + 1} digits, beyond the "
+                f"{int(self.max_bits * math.log10(2))}-digit limit{hint}"
+            )
+    
+    def _eval(self, node: ast.AST, m: Optional[int]) -> int:
+        def reduce(value: int) -> int:
+            return value % m if m else value
+        
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return reduce(node.value)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = self._eval(node.operand, m)
+            return reduce(-value if isinstance(node.op, ast.USub) else value)
+        if isinstance(node, ast.BinOp):
+            return self._binop(node, m)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            name = node.func.id
+            if name not in self.FUNCTIONS:
+                raise CombinatoricsError(f"Unknown function '{name}'")
+            # Arguments are counts, so they are always evaluated exactly
+            args = [self._eval(a, None) for a in node.args]
+            value = self._call(self.FUNCTIONS[name], name, args, m)
+            if self.on_call is not None:
+                self.on_call(self.FUNCTIONS[name], f"{name}({', '.join(map(str, args))})", value)
+            return value
+        raise CombinatoricsError(f"Unsupported syntax in expression: {type(node).__name__}")
+    
+    def _binop(self, node: ast.BinOp, m: Optional[int]) -> int:
+        op = node.op
+        if isinstance(op, ast.Mod):
+            # x % b is only defined on the exact x, and b may not be reduced either
+            a, b = self._eval(node.left, None), self._eval(node.right, None)
+            if b == 0:
+                raise CombinatoricsError("Modulo by zero")
+            return a % b % m if m else a % b
+        # An exponent is a count, like a function argument: never reduce it mod m
+        a, b = self._eval(node.left, m), self._eval(node.right, None if isinstance(op, ast.Pow) else m)
+        if isinstance(op, ast.Add):
+            return (a + b) % m if m else a + b
+        if isinstance(op, ast.Sub):
+            return (a - b) % m if m else a - b
+        if isinstance(op, ast.Mult):
+            if m:
+                return a * b % m
+            self._guard(a.bit_length() + b.bit_length(), "Product")
+            return a * b
+        if isinstance(op, ast.Pow):
+            if b < 0:
+                raise CombinatoricsError("Negative exponents do not give integers")
+            if m:
+                return pow(a, b, m)
+            self._guard(b * a.bit_length(), "Power")
+            return a ** b
+        if isinstance(op, (ast.Div, ast.FloorDiv)):
+            if b == 0:
+                raise CombinatoricsError("Division by zero")
+            if m:
+                try:
+                    return a * pow(b, -1, m) % m
+                except ValueError:
+                    raise CombinatoricsError(f"{b} has no inverse modulo {m}")
+            if isinstance(op, ast.Div) and a % b:
+                raise CombinatoricsError(f"{a} is not divisible by {b}")
+            return a // b
+        raise CombinatoricsError(f"Unsupported operator {type(op).__name__}")
+    
+    def _call(self, label: str, name: str, args: List[int], m: Optional[int]) -> int:
+        if any(a < 0 for a in args):
+            raise CombinatoricsError(f"{name} needs non-negative integer arguments")
+        
+        if label == "Multinomial":
+            if not args:
+                raise CombinatoricsError("multinomial needs at least one argument")
+            # Product of binomials C(k1+…+ki, ki) avoids the full factorials
+            value, running = 1, 0
+            for k in args:
+                running += k
+                part = self._binomial(running, k, m)
+                value = value * part % m if m else value * part
+            return value
+        
+        arity = 1 if label in self.UNARY else 2
+        if len(args) != arity:
+            raise CombinatoricsError(f"{name} takes {arity} argument{'s' if arity > 1 else ''}")
+        n, k = args[0], (args[1] if arity == 2 else 0)
+        
+        if label == "Combination":
+            return self._binomial(n, k, m)
+        if label == "Permutation":
+            if k > n:
+                return 0
+            if m and k <= settings.COMBINATORICS_MAX_LOOP:
+                return _falling_mod(n, k, m)
+            self._guard(_log2_factorial(n) - _log2_factorial(n - k), "Permutation")
+            # math.perm multiplies the falling factorial directly, never forming n!
+            value = math.perm(n, k)
+            return value % m if m else value
+        if label == "Factorial":
+            if m and n >= m:
+                return 0
+            if m and n <= settings.COMBINATORICS_MAX_LOOP:
+                return _falling_mod(n, n, m)
+            self._guard(_log2_factorial(n), "Factorial")
+            value = math.factorial(n)
+            return value % m if m else value
+        if label == "Catalan number":
+            if m and self.prime_mod:
+                return (self._binomial(2 * n, n, m) - self._binomial(2 * n, n + 1, m)) % m
+            self._guard(2 * n, "Catalan number")
+            value = _CATALAN.get(n) if n <= settings.COMBINATORICS_TABLE_MAX_N else self._exact_binomial(2 * n, n) // (n + 1)
+            return value % m if m else value
+        if label == "Derangements":
+            if m and n <= settings.COMBINATORICS_MAX_LOOP:
+                value = 1
+                for i in range(1, n + 1):
+                    value = (i * value + (-1 if i % 2 else 1)) % m
+                return value
+            self._guard(_log2_factorial(n), "Derangements")
+            if n == 0:
+                value = 1
+            else:
+                a, b = _derangement_map(1, n + 1)
+                value = a + b
+            return value % m if m else value
+        
+        # Bell and Stirling numbers come from cached recurrence tables
+        if n > settings.COMBINATORICS_TABLE_MAX_N:
+            raise CombinatoricsError(f"{label} is limited to n ≤ {settings.COMBINATORICS_TABLE_MAX_N}")
+        if label == "Bell number":
+            value = _BELL.get(n)
+        else:
+            value = stirling(1 if "1st" in label else 2, n, k) if k <= n else 0
+        return value % m if m else value
+    
+    def _binomial(self, n: int, k: int, m: Optional[int]) -> int:
+        if k > n:
+            return 0
+        k = min(k, n - k)
+        if m and self.prime_mod:
+            if n >= m:
+                return _lucas(n, k, m)
+            if k <= settings.COMBINATORICS_MAX_LOOP:
+                return _small_binomial_mod(n, k, m)
+        if m and k > _COMB_DIRECT_K and n <= settings.COMBINATORICS_MAX_LOOP:
+            return _binomial_by_primes(n, k, m)
+        self._guard(_log2_binomial(n, k), "Combination")
+        value = self._exact_binomial(n, k)
+        return value % m if m else value
+    
+    @staticmethod
+    def _exact_binomial(n: int, k: int) -> int:
+        k = min(k, n - k)
+        if k <= _COMB_DIRECT_K or n > settings.COMBINATORICS_MAX_LOOP:
+            return math.comb(n, k)
+        return _binomial_by_primes(n, k, None)
+
+def _falling_mod(n: int, k: int, m: int) -> int:
+    """n·(n-1)·…·(n-k+1) mod m."""
+    value = 1
+    for i in range(n - k + 1, n + 1):
+        value = value * i % m
+        if not value:
+            break
+    return value
+
+_FACTORIAL_POSTFIX = re.compile(r"(\d+|\w+\([^()]*\)|\([^()]*\))\s*!(?!=)")
+
+def preprocess_combinatorics(text: str) -> str:
+    """Rewrite `^` as `**` and postfix `n!` / `(expr)!` as fact(...)."""
+    q = text.replace("^", "**")
+    while True:
+        new = _FACTORIAL_POSTFIX.sub(r"fact(\1)", q)
+        if new == q:
+            return q
+        q = new
+
 def do_combinatorics(expr: Any, options: Dict) -> SolveResponse:
-    """Compute combinatorics (factorials, permutations, combinations)."""
+    """
+    Evaluate combinatorial expressions exactly: C, P, factorials, multinomials,
+    Stirling, Catalan and Bell numbers, derangements, combined with + - * / ^.
+    options.mod reduces the result modulo m; values longer than
+    options.max_digits are reported by digit count instead of in full.
+    """
     log = StepLogger()
     warnings: list[str] = []
     errors: list[str] = []
     
     try:
-        from sympy import factorial, binomial, sympify
-        
-        query_str = str(expr)
-        log.add("Parse query", None, expr)
-        
-        # Try to detect pattern like C(n,r) or P(n,r)
-        import re
-        comb_match = re.search(r'C\((\d+),\s*(\d+)\)', query_str)
-        perm_match = re.search(r'P\((\d+),\s*(\d+)\)', query_str)
-        
-        if comb_match:
-            n, r = int(comb_match.group(1)), int(comb_match.group(2))
-            result = binomial(n, r)
-            log.add(f"Combination C({n},{r})", None, result,
-                    note=f"n!/(r!(n-r)!) = {n}!/({r}!{n-r}!)")
-            return SolveResponse(
-                ok=True,
-                result_latex=None,
-                steps=log.get_steps(),
-                warnings=warnings
-            )
+        query = expr if isinstance(expr, str) else str(expr)
+        mod = options.get("mod")
+        if mod is not None:
+            mod = int(mod)
+            if mod < 2:
+                raise CombinatoricsError("options.mod must be an integer ≥ 2")
+        max_digits = int(options.get("max_digits", settings.COMBINATORICS_DISPLAY_DIGITS))
+        suffix = f" (mod {mod})" if mod else ""
         
-        if perm_match:
-            n, r = int(perm_match.group(1)), int(perm_match.group(2))
-            from sympy import factorial
-            result = factorial(n) // factorial(n - r)
-            log.add(f"Permutation P({n},{r})", None, result,
-                    note=f"n!/(n-r)! = {n}!/{n-r}!")
-            return SolveResponse(
-                ok=True,
-                result_latex=None,
-                steps=log.get_steps(),
-                warnings=warnings
-            )
+        log.add("Parse query", None, None, note=query)
+        
+        def on_call(label: str, call: str, value: int) -> None:
+            log.add(label, None, format_integer(value, max_digits), note=call + suffix)
         
-        # Fallback: just evaluate
-        result = sympify(expr)
-        log.add("Evaluate", expr, result)
+        evaluator = CombinatoricsEvaluator(mod, settings.COMBINATORICS_MAX_BITS, on_call)
+        value = evaluator.evaluate(query)
+        
+        shown = format_integer(value, max_digits)
+        log.add("Result", None, shown, note=f"mod {mod}" if mod else f"{decimal_digits(value)} digits")
         
         return SolveResponse(
             ok=True,
-            result_latex=None,
+            result_latex=log.latex.render(shown),
             steps=log.get_steps(),
             warnings=warnings
         )
@@ -93,3 +554,416 @@ def do_combinatorics(expr: Any, options: Dict) -> SolveResponse:
     except Exception as e:
         errors.append(f"Combinatorics error: {str(e)}")
         return SolveResponse(ok=False, steps=log.get_steps(), errors=errors, warnings=warnings)
+
+_SUBSCRIPT_BRACED = re.compile(r"(?<![A-Za-z])([A-Za-z])_\{([^{}]*)\}")
+_SUBSCRIPT = re.compile(r"(?<![A-Za-z])([A-Za-z])_([A-Za-z0-9]+)")
+
+class Recurrence(NamedTuple):
+    f: Any                     # undefined function, e.g. a
+    n: Any                     # index symbol
+    equation: Any              # Eq(f(n), rhs) with the highest shift at f(n)
+    rhs: Any                   # f(n) in terms of f(n-1) … f(n-order) and n
+    order: int
+    initial: Dict[int, Any]    # index -> value
+    coeffs: Optional[List[Any]]                  # c_1 … c_order when linear with constant coefficients
+    forcing: Optional[Dict[Tuple[Any, int], Any]]  # g(n) as {(base c, power j): weight of n^j·c^n}
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        elif ch in ",;" and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+def parse_recurrence(text: str) -> Recurrence:
+    """
+    Read "a(n) = a(n-1) + a(n-2), a(0) = 0, a(1) = 1" (or a_n / a_{n-1}
+    subscripts) into a Recurrence normalized so the highest term is f(n).
+    """
+    from sympy import Eq, Function, Integer, Poly, Symbol, solve
+    from sympy.core.function import AppliedUndef
+    from sympy.parsing.sympy_parser import (
+        parse_expr, standard_transformations, implicit_multiplication, convert_xor
+    )
+    
+    q = _SUBSCRIPT_BRACED.sub(r"\1(\2)", text)
+    q = _SUBSCRIPT.sub(r"\1(\2)", q)
+    n = Symbol("n", integer=True)
+    transformations = standard_transformations + (implicit_multiplication, convert_xor)
+    
+    names = set(re.findall(r"\b([A-Za-z])\s*\(", q))
+    local = {name: Function(name) for name in names}
+    local["n"] = n
+    
+    equations = []
+    for part in _split_top_level(q):
+        if part.count("=") != 1:
+            raise ValueError(f"Expected an equation, got '{part}'")
+        lhs, rhs = part.split("=")
+        equations.append((parse_expr(lhs, local_dict=local, transformations=transformations),
+                          parse_expr(rhs, local_dict=local, transformations=transformations)))
+    
+    relation = [eq for eq in equations if any(a.has(n) for a in (eq[0] - eq[1]).atoms(AppliedUndef))]
+    if len(relation) != 1:
+        raise ValueError("Expected exactly one recurrence relation in n, e.g. a(n) = a(n-1) + a(n-2)")
+    lhs, rhs = relation[0]
+    terms = (lhs - rhs).atoms(AppliedUndef)
+    funcs = {t.func for t in terms}
+    if len(funcs) != 1:
+        raise ValueError("The recurrence must involve a single sequence")
+    f = funcs.pop()
+    
+    shifts = set()
+    for t in terms:
+        shift = t.args[0] - n
+        if len(t.args) != 1 or not shift.is_Integer:
+            raise ValueError(f"Terms must look like {f}(n - k); got {t}")
+        shifts.add(int(shift))
+    top, order = max(shifts), max(shifts) - min(shifts)
+    if order == 0:
+        raise ValueError("The relation must refer to earlier terms")
+    
+    expr = (lhs - rhs).subs(n, n - top)
+    solved = solve(expr, f(n))
+    if len(solved) != 1:
+        raise ValueError(f"Could not solve the relation for {f}(n)")
+    rhs = solved[0]
+    
+    initial: Dict[int, Any] = {}
+    for l, r in equations:
+        if (l, r) == relation[0]:
+            continue
+        if not (isinstance(l, AppliedUndef) and l.func == f and l.args[0].is_Integer and not r.free_symbols):
+            raise ValueError(f"Initial conditions must look like {f}(0) = 1")
+        initial[int(l.args[0])] = r
+    
+    # Linear with constant coefficients: rhs = Σ c_i f(n-i) + g(n)
+    coeffs = forcing = None
+    ys = [f(n - i) for i in range(1, order + 1)]
+    try:
+        poly = Poly(rhs, *ys)
+    except Exception:
+        poly = None
+    if poly is not None and poly.total_degree() <= 1:
+        cs = [poly.coeff_monomial(y) for y in ys]
+        g = poly.coeff_monomial(1)
+        if all(not c.has(n) and c.is_Rational for c in cs):
+            coeffs = cs
+            forcing = _exp_poly_terms(g, n)
+    
+    return Recurrence(f, n, Eq(f(n), rhs), rhs, order, initial, coeffs, forcing)
+
+def _exp_poly_terms(g: Any, n: Any) -> Optional[Dict[Tuple[Any, int], Any]]:
+    """Decompose g(n) into rational multiples of n^j·c^n, or None if it has another shape."""
+    from sympy import Add, Integer, Mul, Pow
+    
+    terms: Dict[Tuple[Any, int], Any] = {}
+    for term in Add.make_args(g.expand()):
+        if term == 0:
+            continue
+        weight, dep = term.as_independent(n, as_Add=False)
+        base, power = Integer(1), 0
+        for factor in Mul.make_args(dep):
+            if factor == 1:
+                continue
+            if factor == n:
+                power += 1
+            elif isinstance(factor, Pow) and factor.base == n and factor.exp.is_Integer and factor.exp > 0:
+                power += int(factor.exp)
+            elif isinstance(factor, Pow) and factor.base.is_Rational and (factor.exp - n).is_Integer:
+                base *= factor.base
+                weight *= factor.base ** (factor.exp - n)
+            else:
+                return None
+        if not weight.is_Rational:
+            return None
+        terms[(base, power)] = terms.get((base, power), 0) + weight
+    return terms
+
+def characteristic_steps(rec: Recurrence, log: StepLogger) -> None:
+    """Log the characteristic equation, its roots and the general homogeneous solution."""
+    from sympy import Eq, Poly, Symbol, roots, symbols, Add
+    
+    r = Symbol("r")
+    d = rec.order
+    char = r ** d - sum(c * r ** (d - i) for i, c in enumerate(rec.coeffs, start=1))
+    log.add("Characteristic equation", rec.equation, Eq(char, 0),
+            note=f"Substitute {rec.f}(n) = r^n and divide by r^(n-{d})")
+    
+    found = roots(Poly(char, r))
+    if sum(found.values()) < d:
+        log.add("Characteristic roots", None, None, note="Roots are not expressible in radicals")
+        return
+    log.add("Characteristic roots", None, None,
+            note=", ".join(f"r = {root}" + (f" (multiplicity {m})" if m > 1 else "") for root, m in found.items()))
+    
+    consts = iter(symbols(f"C0:{d}"))
+    parts = []
+    for root, m in found.items():
+        for j in range(m):
+            parts.append(next(consts) * rec.n ** j * root ** rec.n)
+    homogeneous = Add(*parts)
+    log.add("Homogeneous solution", None, Eq(rec.f(rec.n), homogeneous),
+            note="Each root r of multiplicity m contributes C·n^j·r^n for j < m")
+
+def closed_form(rec: Recurrence, log: StepLogger, warnings: List[str]) -> Any:
+    """Closed form through rsolve under a time budget; None when SymPy cannot find one."""
+    from sympy import Eq, Poly, rsolve
+    from server.solvers.utils.budget import BudgetExceeded, time_budget
+    
+    try:
+        linear = Poly(rec.rhs, *[rec.f(rec.n - i) for i in range(1, rec.order + 1)]).total_degree() <= 1
+    except Exception:
+        linear = False
+    if not linear:
+        warnings.append("Closed forms are only sought for linear recurrences")
+        return None
+    
+    budget = settings.RECURRENCE_RSOLVE_BUDGET_MS / 1000
+    try:
+        with time_budget(budget):
+            general = rsolve(rec.rhs - rec.f(rec.n), rec.f(rec.n))
+            if general is not None and rec.forcing:
+                particular = general.subs({s: 0 for s in general.free_symbols if s.name.startswith("C")})
+                log.add("Particular solution", None, particular, note="Solution of the full relation with all constants zero")
+            solution = general
+            if general is not None and len(rec.initial) >= rec.order:
+                solution = rsolve(rec.rhs - rec.f(rec.n), rec.f(rec.n), {rec.f(k): v for k, v in rec.initial.items()})
+                log.add("Apply initial conditions", general, Eq(rec.f(rec.n), solution),
+                        note=", ".join(f"{rec.f}({k}) = {v}" for k, v in sorted(rec.initial.items())))
+            elif general is not None:
+                log.add("General solution", None, Eq(rec.f(rec.n), general))
+    except BudgetExceeded:
+        warnings.append(f"Closed form search stopped after {budget:g}s")
+        return None
+    except Exception as e:
+        warnings.append(f"rsolve failed: {e}")
+        return None
+    if solution is None:
+        warnings.append("SymPy found no closed form for this recurrence")
+    return solution
+
+def _start_window(rec: Recurrence) -> Tuple[int, List[Any]]:
+    """First index computed by the relation and the `order` values before it (latest first)."""
+    if len(rec.initial) < rec.order:
+        raise ValueError(f"An order-{rec.order} recurrence needs {rec.order} initial values to evaluate terms")
+    start = max(rec.initial) + 1
+    needed = range(start - 1, start - rec.order - 1, -1)
+    if any(k not in rec.initial for k in needed):
+        raise ValueError(f"Initial values must be {rec.order} consecutive terms")
+    return start, [rec.initial[k] for k in needed]
+
+def _to_exact(x: Any) -> Any:
+    from fractions import Fraction
+    if x.is_Integer:
+        return int(x)
+    if x.is_Rational:
+        return Fraction(int(x.p), int(x.q))
+    raise ValueError(f"Term evaluation needs rational values, got {x}")
+
+def _reduce(x: Any, m: Optional[int]) -> Any:
+    if not m:
+        return x
+    from fractions import Fraction
+    if isinstance(x, Fraction):
+        try:
+            return x.numerator * pow(x.denominator, -1, m) % m
+        except ValueError:
+            raise ValueError(f"{x.denominator} has no inverse modulo {m}")
+    return x % m
+
+def _mat_mul(A: List[List[Any]], B: List[List[Any]], m: Optional[int]) -> List[List[Any]]:
+    cols = list(zip(*B))
+    out = []
+    for row in A:
+        out.append([_reduce(sum(a * b for a, b in zip(row, col) if a and b), m) for col in cols])
+    return out
+
+def _mat_pow(M: List[List[Any]], e: int, m: Optional[int]) -> Tuple[List[List[Any]], int]:
+    """M^e by repeated squaring; also returns the number of matrix products."""
+    size = len(M)
+    result = [[int(i == j) for j in range(size)] for i in range(size)]
+    products = 0
+    while e:
+        if e & 1:
+            result = _mat_mul(result, M, m)
+            products += 1
+        e >>= 1
+        if e:
+            M = _mat_mul(M, M, m)
+            products += 1
+    return result, products
+
+def companion_matrix(rec: Recurrence) -> Tuple[List[List[Any]], List[Tuple[Any, int]]]:
+    """
+    Transition matrix for the state [f(n-1) … f(n-d), n^j·c^n …]: one step
+    produces f(n) and advances every forcing term from n to n+1.
+    """
+    d = rec.order
+    basis: List[Tuple[Any, int]] = []
+    for (c, j) in rec.forcing:
+        for i in range(j + 1):
+            if (c, i) not in basis:
+                basis.append((c, i))
+    basis.sort(key=lambda b: (str(b[0]), b[1]))
+    size = d + len(basis)
+    M = [[0] * size for _ in range(size)]
+    M[0][:d] = [_to_exact(c) for c in rec.coeffs]
+    for k, b in enumerate(basis):
+        M[0][d + k] = _to_exact(rec.forcing[b]) if b in rec.forcing else 0
+    for i in range(1, d):
+        M[i][i - 1] = 1
+    # (n+1)^j·c^(n+1) = c·Σ_i C(j,i)·n^i·c^n
+    for k, (c, j) in enumerate(basis):
+        for i in range(j + 1):
+            M[d + k][d + basis.index((c, i))] = _to_exact(c) * math.comb(j, i)
+    return M, basis
+
+def nth_term_matrix(rec: Recurrence, N: int, m: Optional[int], log: StepLogger) -> Any:
+    from sympy import Matrix, Poly, Symbol
+    
+    start, window = _start_window(rec)
+    if N < start:
+        return _reduce(_to_exact(rec.initial[N]), m) if N in rec.initial else None
+    M, basis = companion_matrix(rec)
+    
+    if not m:
+        # Refuse exact terms that would not fit in memory
+        r = Symbol("r")
+        char = r ** rec.order - sum(c * r ** (rec.order - i) for i, c in enumerate(rec.coeffs, start=1))
+        growth = max([abs(complex(z)) for z in Poly(char, r).nroots()] + [abs(float(c)) for c, _ in basis] + [1.0])
+        bits = N * math.log2(growth) + 64 * len(M)
+        if bits > settings.COMBINATORICS_MAX_BITS:
+            raise ValueError(
+                f"{rec.f}({N}) has about {int(bits * math.log10(2))} digits; pass options.mod to work modulo m"
+            )
+    
+    log.add("Companion matrix", None, Matrix(M),
+            note=f"State [{', '.join([f'{rec.f}(n-{i})' for i in range(1, rec.order + 1)] + [f'n^{j}·{c}^n' for c, j in basis])}] advances one index per product")
+    
+    state = [_reduce(_to_exact(v), m) for v in window]
+    state += [_reduce(_to_exact(c ** start * start ** j), m) for c, j in basis]
+    P, products = _mat_pow([[_reduce(x, m) for x in row] for row in M], N - start + 1, m)
+    value = _reduce(sum(a * b for a, b in zip(P[0], state)), m)
+    log.add("Matrix power", None, None,
+            note=f"M^{N - start + 1} by repeated squaring: {products} matrix products instead of {N - start + 1} steps")
+    return value
+
+# (srepr of rhs, first index of the initial window, its values, modulus) -> (last index computed, window ending there)
+_iteration_cache: "OrderedDict[Tuple[str, int, Tuple[Any, ...], Optional[int]], Tuple[int, List[Any]]]" = OrderedDict()
+_iteration_lock = threading.Lock()
+
+def nth_term_iterative(rec: Recurrence, N: int, m: Optional[int], log: StepLogger) -> Any:
+    """Evaluate f(N) by iterating the relation, resuming from the furthest term computed before."""
+    from fractions import Fraction
+    from sympy import Dummy, lambdify, srepr
+    from sympy.printing.pycode import PythonCodePrinter
+    
+    class _ExactPrinter(PythonCodePrinter):
+        def _print_Rational(self, expr):
+            return f"Fraction({expr.p}, {expr.q})"
+        def _print_Half(self, expr):
+            return "Fraction(1, 2)"
+    
+    start, window = _start_window(rec)
+    if N < start:
+        return _reduce(_to_exact(rec.initial[N]), m) if N in rec.initial else None
+    if N - start > settings.RECURRENCE_MAX_ITERATIONS:
+        raise ValueError(f"Iterating to {rec.f}({N}) needs more than {settings.RECURRENCE_MAX_ITERATIONS} steps")
+    
+    ys = [rec.f(rec.n - i) for i in range(1, rec.order + 1)]
+    dummies = [Dummy(f"y{i}") for i in range(1, rec.order + 1)]
+    step = lambdify([rec.n] + dummies, rec.rhs.subs(dict(zip(ys, dummies))),
+                    modules=[{"Fraction": Fraction}, "math"], printer=_ExactPrinter)
+    
+    # The same relation and values started at another index is a different sequence
+    key = (srepr(rec.rhs), start, tuple(window), m)
+    index, values = start - 1, [_reduce(_to_exact(v), m) for v in window]
+    with _iteration_lock:
+        cached = _iteration_cache.get(key)
+        if cached is not None and cached[0] <= N:
+            index, values = cached[0], list(cached[1])
+            _iteration_cache.move_to_end(key)
+    resumed = index
+    
+    while index < N:
+        index += 1
+        value = step(index, *values)
+        if isinstance(value, float):
+            raise ValueError("The relation does not produce exact values")
+        values = [_reduce(value, m)] + values[:-1]
+    
+    with _iteration_lock:
+        _iteration_cache[key] = (index, values)
+        while len(_iteration_cache) > 64:
+            _iteration_cache.popitem(last=False)
+    log.add("Iterate the relation", None, None,
+            note=f"{N - resumed} steps from {rec.f}({resumed})" + (" (resumed from an earlier evaluation)" if resumed >= start else ""))
+    return values[0]
+
+def do_recurrence(expr: Any, options: Dict) -> SolveResponse:
+    """
+    Solve recurrence relations: closed form via rsolve with characteristic
+    equation steps, plus fast evaluation of a single term (options.term),
+    optionally modulo options.mod.
+    """
+    from sympy import Eq, Rational, nsimplify
+    
+    log = StepLogger()
+    warnings: list[str] = []
+    errors: list[str] = []
+    
+    try:
+        rec = parse_recurrence(expr if isinstance(expr, str) else str(expr))
+        mod = options.get("mod")
+        mod = int(mod) if mod is not None else None
+        if mod is not None and mod < 2:
+            raise ValueError("options.mod must be an integer ≥ 2")
+        term = options.get("term")
+        max_digits = int(options.get("max_digits", settings.COMBINATORICS_DISPLAY_DIGITS))
+        
+        kind = "linear, constant coefficients" if rec.coeffs is not None else "general"
+        if rec.coeffs is not None:
+            kind += ", homogeneous" if not rec.forcing else ", non-homogeneous"
+        log.add("Recurrence", None, rec.equation, note=f"Order {rec.order} ({kind})")
+        
+        if rec.coeffs is not None:
+            characteristic_steps(rec, log)
+        solution = closed_form(rec, log, warnings) if options.get("closed_form", True) else None
+        
+        if term is None and len(rec.initial) >= rec.order:
+            start, _ = _start_window(rec)
+            shown = [nth_term_iterative(rec, k, mod, StepLogger(0)) for k in range(min(rec.initial), start + 8)]
+            log.add("First terms", None, None, note=", ".join(str(v) for v in shown))
+        
+        result = solution
+        if term is not None:
+            N = int(term)
+            if rec.coeffs is not None and rec.forcing is not None:
+                value = nth_term_matrix(rec, N, mod, log)
+            else:
+                value = nth_term_iterative(rec, N, mod, log)
+            if value is None:
+                raise ValueError(f"{rec.f}({N}) comes before the initial conditions")
+            if not isinstance(value, int) and value.denominator == 1:
+                value = value.numerator
+            shown = format_integer(value, max_digits) if isinstance(value, int) else Rational(value.numerator, value.denominator)
+            log.add(f"Term {rec.f}({N})", None, shown, note=f"mod {mod}" if mod else None)
+            result = shown
+        
+        return SolveResponse(
+            ok=True,
+            result_latex=log.latex.render(result),
+            steps=log.get_steps(),
+            warnings=warnings
+        )
+    
+    except Exception as e:
+        errors.append(f"Recurrence error: {str(e)}")
+        return SolveResponse(ok=False, steps=log.get_steps(), errors=errors, warnings=warnings)
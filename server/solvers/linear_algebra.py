@@ -1,6 +1,8 @@
+from server.config import settings
 from server.schemas import SolveResponse
+from server.solvers.utils.latex import LatexMemo
 from server.solvers.utils.steps import StepLogger
-from typing import Any, Dict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 def dispatch(expr: Any, mode: str, options: Dict) -> SolveResponse:
     """Dispatch linear algebra solver based on mode."""
@@ -14,6 +16,349 @@ def dispatch(expr: Any, mode: str, options: Dict) -> SolveResponse:
         return do_nullspace(expr, options)
     return SolveResponse(ok=False, errors=[f"Unsupported mode: {mode}"])
 
+NUMERIC_WARNING = "Computed in floating point (float64); entries are approximate"
+
+def _digits(options: Dict) -> int:
+    return int(options.get("digits", 6))
+
+def matrix_kind(M: Any) -> str:
+    """Classify entries as 'rational', 'float' (numeric, some inexact) or 'symbolic'."""
+    kind = "rational"
+    for entry in M:
+        if entry.is_Rational:
+            continue
+        if entry.free_symbols or not entry.is_number:
+            return "symbolic"
+        kind = "float"
+    return kind
+
+def choose_engine(M: Any, options: Dict, warnings: List[str], mode: str = "rref") -> str:
+    """
+    Resolve options['engine'] ('exact' | 'numeric' | 'auto') for a matrix.
+    Auto goes numeric for inexact entries, and for eigenproblems larger than
+    Settings.LA_NUMERIC_AUTO_SIZE. Rational matrices otherwise stay on the
+    exact domain engine; symbolic entries always stay exact.
+    """
+    engine = options.get("engine", "auto")
+    if engine not in ("exact", "numeric", "auto"):
+        warnings.append(f"Unknown engine '{engine}', using auto")
+        engine = "auto"
+    
+    kind = matrix_kind(M)
+    if engine == "numeric" and kind == "symbolic":
+        warnings.append("Matrix has symbolic entries; using exact engine")
+        return "exact"
+    if engine == "auto":
+        if kind == "symbolic":
+            return "exact"
+        large = max(M.shape) > settings.LA_NUMERIC_AUTO_SIZE
+        if kind == "float" or (mode == "eigen" and large):
+            engine = "numeric"
+        else:
+            return "exact"
+    
+    if engine == "numeric":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            warnings.append("NumPy not installed; using exact engine")
+            return "exact"
+    return engine
+
+def _integer_rows(M: Any) -> Tuple[Any, Any]:
+    """
+    Scale each row of a rational matrix by the LCM of its denominators.
+    Returns (ZZ DomainMatrix, product of the scale factors).
+    """
+    from sympy import ilcm
+    from sympy.polys.matrices import DomainMatrix
+    from sympy.polys.domains import ZZ
+    
+    dM = DomainMatrix.from_Matrix(M)
+    if dM.domain == ZZ:
+        return dM, 1
+    rows = dM.to_list()
+    scale = 1
+    int_rows = []
+    for row in rows:
+        lcm = 1
+        for q in row:
+            lcm = ilcm(lcm, int(q.denominator))
+        scale *= lcm
+        int_rows.append([ZZ(int(q.numerator) * (lcm // int(q.denominator))) for q in row])
+    return DomainMatrix(int_rows, dM.shape, ZZ), scale
+
+def domain_rref(M: Any) -> Tuple[Any, Tuple[int, ...]]:
+    """Fraction-free RREF of a rational matrix over ZZ, normalized over QQ."""
+    from sympy.polys.domains import QQ
+    
+    zM, _ = _integer_rows(M)  # row scaling leaves the RREF unchanged
+    R, den, pivots = zM.rref_den()
+    return (R.to_field() * QQ(1, int(den))).to_Matrix(), tuple(pivots)
+
+def domain_det(M: Any) -> Any:
+    """Bareiss fraction-free determinant of a rational matrix."""
+    from sympy import Rational
+    
+    zM, scale = _integer_rows(M)
+    return Rational(int(zM.det()), scale)
+
+def domain_nullspace(M: Any) -> List[Any]:
+    """Nullspace basis built from the domain RREF, in Matrix.nullspace order and scaling."""
+    from sympy import Matrix
+    
+    reduced, pivots = domain_rref(M)
+    free_vars = [i for i in range(M.cols) if i not in pivots]
+    basis = []
+    for free_var in free_vars:
+        vec = [M.zero] * M.cols
+        vec[free_var] = M.one
+        for piv_row, piv_col in enumerate(pivots):
+            vec[piv_col] -= reduced[piv_row, free_var]
+        basis.append(Matrix(M.cols, 1, vec))
+    return basis
+
+def _to_numpy(M: Any):
+    import numpy as np
+    
+    try:
+        return np.array(M.tolist(), dtype=float)
+    except TypeError:
+        return np.array(M.evalf().tolist(), dtype=complex)
+
+def _from_numpy(arr: Any, digits: int) -> "NumericMatrix":
+    import numpy as np
+    
+    # Round-off noise such as 1e-17 is reported as an exact zero
+    arr = np.where(np.abs(arr) <= 1e-12 * max(1.0, float(np.abs(arr).max(initial=0.0))), 0, arr)
+    if np.iscomplexobj(arr) and not arr.imag.any():
+        arr = arr.real
+    return NumericMatrix(arr, digits)
+
+class NumericMatrix:
+    """
+    A float or complex array shown to `digits` significant digits. LaTeX and
+    text are formatted straight from the array; a SymPy Matrix of Floats is
+    only built by to_matrix (evalf over a Matrix of complex entries costs
+    seconds at 50x50).
+    """
+    __slots__ = ("array", "digits")
+    
+    def __init__(self, array: Any, digits: int):
+        self.array = array
+        self.digits = digits
+    
+    def _real(self, x: float, latex: bool) -> str:
+        mantissa, _, exponent = f"{x:.{self.digits}g}".partition("e")
+        if x == x and abs(x) != float("inf") and "." not in mantissa:
+            mantissa += ".0"  # printed like a SymPy Float
+        if not exponent:
+            return mantissa
+        if latex:
+            return f"{mantissa} \\cdot 10^{{{int(exponent)}}}"
+        return f"{mantissa}e{exponent}"
+    
+    def _entry(self, z: Any, latex: bool) -> str:
+        if not isinstance(z, complex):
+            return self._real(float(z), latex)
+        if z.imag == 0:
+            return self._real(z.real, latex)
+        unit = " i" if latex else "*I"
+        imag = f"{self._real(abs(z.imag), latex)}{unit}"
+        if z.real == 0:
+            return ("-" if z.imag < 0 else "") + imag
+        return f"{self._real(z.real, latex)} {'-' if z.imag < 0 else '+'} {imag}"
+    
+    def to_matrix(self) -> Any:
+        from sympy import Float, I, Matrix
+        
+        def entry(z: Any) -> Any:
+            if isinstance(z, complex):
+                return Float(z.real, self.digits) + I * Float(z.imag, self.digits)
+            return Float(float(z), self.digits)
+        rows, cols = self.array.shape
+        return Matrix(rows, cols, [entry(z) for z in self.array.tolist() for z in z])
+    
+    def _latex(self, printer) -> str:
+        cols = self.array.shape[1]
+        body = "\\\\".join(" & ".join(self._entry(z, True) for z in row) for row in self.array.tolist())
+        # Same environments as SymPy's matrix printer
+        if cols <= 10:
+            return f"\\left[\\begin{{matrix}}{body}\\end{{matrix}}\\right]"
+        return f"\\left[\\begin{{array}}{{{'c' * cols}}}{body}\\end{{array}}\\right]"
+    
+    def _sympyrepr(self, printer) -> str:
+        return printer._print(self.to_matrix())
+    
+    def __str__(self) -> str:
+        return "Matrix([" + ", ".join(
+            "[" + ", ".join(self._entry(z, False) for z in row) + "]" for row in self.array.tolist()
+        ) + "])"
+
+def _tolerance(A: Any) -> float:
+    import numpy as np
+    
+    if A.size == 0:
+        return 0.0
+    return max(A.shape) * np.finfo(float).eps * max(1.0, float(np.abs(A).max()))
+
+def numeric_rref(A: Any) -> Tuple[Any, Tuple[int, ...]]:
+    """Gauss-Jordan elimination with partial pivoting on a float array."""
+    import numpy as np
+    
+    A = A.copy()
+    rows, cols = A.shape
+    tol = _tolerance(A)
+    pivots = []
+    r = 0
+    for c in range(cols):
+        if r >= rows:
+            break
+        p = r + int(np.argmax(np.abs(A[r:, c])))
+        if abs(A[p, c]) <= tol:
+            A[r:, c] = 0
+            continue
+        if p != r:
+            A[[r, p]] = A[[p, r]]
+        A[r] = A[r] / A[r, c]
+        others = np.arange(rows) != r
+        A[others] -= np.outer(A[others, c], A[r])
+        A[np.abs(A) <= tol] = 0
+        pivots.append(c)
+        r += 1
+    return A, tuple(pivots)
+
+def numeric_nullspace(A: Any) -> Any:
+    """Orthonormal nullspace basis (as columns) from the SVD."""
+    import numpy as np
+    
+    _, sv, vh = np.linalg.svd(A)
+    tol = _tolerance(A) * max(1.0, float(sv[0]) if sv.size else 1.0)
+    rank = int((sv > tol).sum())
+    return vh[rank:].conj().T
+
+def numeric_eigen(A: Any) -> Tuple[Any, Any]:
+    """Eigenvalues and eigenvectors, using the symmetric solver when it applies."""
+    import numpy as np
+    
+    if np.allclose(A, A.conj().T):
+        return np.linalg.eigh(A)
+    vals, vecs = np.linalg.eig(A)
+    if np.allclose(vals.imag, 0):
+        vals, vecs = vals.real, vecs.real
+    return vals, vecs
+
+def _ascending(z: Any) -> Tuple[float, float]:
+    """Sort key for eigenvalues: real then imaginary part, ignoring round-off in the last digits."""
+    z = complex(z)
+    return float(f"{z.real:.12g}"), float(f"{z.imag:.12g}")
+
+def _group_eigenvalues(vals: Any, digits: int) -> Dict[Any, int]:
+    """Collapse numerically equal eigenvalues into value: multiplicity."""
+    from sympy import sympify
+    
+    grouped: Dict[Any, int] = {}
+    for v in sorted(vals, key=_ascending):
+        key = sympify(complex(v) if isinstance(v, complex) else float(v)).evalf(digits)
+        grouped[key] = grouped.get(key, 0) + 1
+    return grouped
+
+class RowOp(NamedTuple):
+    """One elementary row operation and the rows it changed (0-based)."""
+    kind: str  # "swap" | "scale" | "add"
+    target: int
+    source: Optional[int]
+    factor: Any
+    delta: Dict[int, Tuple[Any, ...]]
+
+def rref_trace(M: Any) -> Tuple[Any, Tuple[int, ...], List[RowOp], Any]:
+    """
+    Gauss-Jordan elimination over the matrix's field domain in a single pass,
+    logging every swap/scale/add together with only the rows it changed.
+    Returns (rref, pivots, ops, domain).
+    """
+    from sympy.polys.matrices import DomainMatrix
+    
+    dM = DomainMatrix.from_Matrix(M).to_field()
+    K = dM.domain
+    rows = [list(row) for row in dM.to_list()]
+    n_rows, n_cols = dM.shape
+    ops: List[RowOp] = []
+    pivots: List[int] = []
+    r = 0
+    for c in range(n_cols):
+        if r >= n_rows:
+            break
+        p = next((i for i in range(r, n_rows) if not K.is_zero(rows[i][c])), None)
+        if p is None:
+            continue
+        if p != r:
+            rows[r], rows[p] = rows[p], rows[r]
+            ops.append(RowOp("swap", r, p, None, {r: tuple(rows[r]), p: tuple(rows[p])}))
+        pivot = rows[r][c]
+        if not K.is_one(pivot):
+            inv = K.one / pivot
+            rows[r] = [inv * a for a in rows[r]]
+            ops.append(RowOp("scale", r, None, inv, {r: tuple(rows[r])}))
+        for i in range(n_rows):
+            if i == r or K.is_zero(rows[i][c]):
+                continue
+            f = rows[i][c]
+            rows[i] = [a - f * b for a, b in zip(rows[i], rows[r])]
+            ops.append(RowOp("add", i, r, -f, {i: tuple(rows[i])}))
+        pivots.append(c)
+        r += 1
+    rref = DomainMatrix(rows, dM.shape, K).to_Matrix()
+    return rref, tuple(pivots), ops, K
+
+class MatrixSnapshot:
+    """
+    Matrix state after a row operation. Rows are shared with the previous
+    snapshot unless the operation changed them; printing goes row by row
+    through the request's LatexMemo, so an unchanged row is rendered once
+    for the whole trace and no Matrix is built.
+    """
+    __slots__ = ("rows", "memo")
+    
+    def __init__(self, rows: Tuple[Tuple[Any, ...], ...], memo: Optional[LatexMemo] = None):
+        self.rows = rows
+        self.memo = memo
+    
+    def to_matrix(self) -> Any:
+        from sympy import Matrix
+        return Matrix([list(row) for row in self.rows])
+    
+    def _latex(self, printer) -> str:
+        if self.memo is None:
+            return printer._print(self.to_matrix())
+        cols = len(self.rows[0]) if self.rows else 0
+        body = "\\\\".join(self.memo.matrix_row(row) for row in self.rows)
+        # Same environments as SymPy's matrix printer
+        if cols <= 10:
+            return f"\\left[\\begin{{matrix}}{body}\\end{{matrix}}\\right]"
+        return f"\\left[\\begin{{array}}{{{'c' * cols}}}{body}\\end{{array}}\\right]"
+
+def describe_row_op(op: RowOp, K: Any) -> str:
+    """Human-readable label such as 'R3 → R3 - 2·R1' (1-based rows)."""
+    from sympy import sstr
+    
+    t = op.target + 1
+    if op.kind == "swap":
+        return f"R{t} ↔ R{op.source + 1}"
+    f = K.to_sympy(op.factor)
+    
+    def coeff(x: Any) -> str:
+        if x == 1:
+            return ""
+        text = sstr(x)
+        return f"{text}·" if x.is_Integer or x.is_Symbol else f"({text})·"
+    
+    if op.kind == "scale":
+        return f"R{t} → {coeff(f)}R{t}"
+    if f.could_extract_minus_sign():
+        return f"R{t} → R{t} - {coeff(-f)}R{op.source + 1}"
+    return f"R{t} → R{t} + {coeff(f)}R{op.source + 1}"
+
 def do_rref(expr: Any, options: Dict) -> SolveResponse:
     """Compute Reduced Row Echelon Form."""
     log = StepLogger()
@@ -29,11 +374,31 @@ def do_rref(expr: Any, options: Dict) -> SolveResponse:
         
         log.add("Initial matrix", None, expr)
         
+        if choose_engine(expr, options, warnings, "rref") == "numeric":
+            rref_array, pivot_cols = numeric_rref(_to_numpy(expr))
+            log.add("Compute RREF (partial pivoting)", expr, _from_numpy(rref_array, _digits(options)),
+                    note=f"Pivot columns: {pivot_cols}", meta={"engine": "numeric"})
+            warnings.append(NUMERIC_WARNING)
+            return SolveResponse(
+                ok=True,
+                result_latex=None,
+                steps=log.get_steps(),
+                warnings=warnings
+            )
+        
+        if options.get("trace"):
+            return _rref_with_trace(expr, log, warnings)
+        
         # Get RREF
-        rref_matrix, pivot_cols = expr.rref()
+        if matrix_kind(expr) == "rational":
+            rref_matrix, pivot_cols = domain_rref(expr)
+            meta = {"engine": "exact", "domain": "ZZ (fraction-free)"}
+        else:
+            rref_matrix, pivot_cols = expr.rref()
+            meta = {}
         
         log.add("Compute RREF", expr, rref_matrix, 
-                note=f"Pivot columns: {pivot_cols}")
+                note=f"Pivot columns: {pivot_cols}", meta=meta)
         
         return SolveResponse(
             ok=True,
@@ -46,6 +411,62 @@ def do_rref(expr: Any, options: Dict) -> SolveResponse:
         errors.append(f"RREF error: {str(e)}")
         return SolveResponse(ok=False, steps=log.get_steps(), errors=errors, warnings=warnings)
 
+def _pivot_groups(ops: List[RowOp]) -> List[List[RowOp]]:
+    """Split the trace into the ops of each pivot: a swap or scale of the pivot row, then its eliminations."""
+    groups: List[List[RowOp]] = []
+    pivot_row = None
+    for op in ops:
+        row = op.source if op.kind == "add" else op.target
+        if row != pivot_row:
+            groups.append([])
+            pivot_row = row
+        groups[-1].append(op)
+    return groups
+
+def _rref_with_trace(M: Any, log: StepLogger, warnings: List[str]) -> SolveResponse:
+    """
+    Log each elementary row operation, rendering snapshots up to
+    Settings.MAX_STEPS. Matrices larger than Settings.LA_TRACE_COALESCE_SIZE
+    in either dimension get one step per pivot instead.
+    """
+    rref_matrix, pivot_cols, ops, K = rref_trace(M)
+    log.max_steps = settings.MAX_STEPS
+    
+    coalesce = max(M.shape) > settings.LA_TRACE_COALESCE_SIZE
+    groups = _pivot_groups(ops) if coalesce else [[op] for op in ops]
+    # Leave room for the final summary step
+    budget = max(0, settings.MAX_STEPS - len(log.steps) - 1)
+    state = [tuple(M.row(i)) for i in range(M.rows)]
+    for group in groups[:budget]:
+        changed = set()
+        for op in group:
+            for i, row in op.delta.items():
+                state[i] = tuple(K.to_sympy(a) for a in row)
+                changed.add(i + 1)
+        snapshot = MatrixSnapshot(tuple(state), log.latex)
+        if coalesce:
+            first = group[0]
+            pivot_row = (first.source if first.kind == "add" else first.target) + 1
+            log.add(f"Pivot on R{pivot_row}", None, snapshot,
+                    note="; ".join(describe_row_op(op, K) for op in group),
+                    meta={"ops": [op.kind for op in group], "rows": sorted(changed)})
+        else:
+            op = group[0]
+            log.add(describe_row_op(op, K), None, snapshot, meta={"op": op.kind, "rows": sorted(changed)})
+    if len(groups) > budget:
+        unit = "pivot steps" if coalesce else "row operations"
+        warnings.append(f"Showing {budget} of {len(groups)} {unit}")
+    
+    log.add("Reduced row echelon form", M, rref_matrix,
+            note=f"Pivot columns: {pivot_cols}", meta={"row_operations": len(ops)})
+    
+    return SolveResponse(
+        ok=True,
+        result_latex=None,
+        steps=log.get_steps(),
+        warnings=warnings
+    )
+
 def do_eigenvalues(expr: Any, options: Dict) -> SolveResponse:
     """Compute eigenvalues and eigenvectors."""
     log = StepLogger()
@@ -65,6 +486,25 @@ def do_eigenvalues(expr: Any, options: Dict) -> SolveResponse:
         
         log.add("Initial matrix", None, expr)
         
+        if choose_engine(expr, options, warnings, "eigen") == "numeric":
+            digits = _digits(options)
+            vals, vecs = numeric_eigen(_to_numpy(expr))
+            eigenvals = _group_eigenvalues(vals, digits)
+            log.add("Compute eigenvalues (QR algorithm)", expr, eigenvals,
+                    note="eigenvalue: multiplicity", meta={"engine": "numeric"})
+            # One matrix of eigenvectors rather than a step per column
+            order = sorted(range(len(vals)), key=lambda i: _ascending(vals[i]))
+            log.add("Eigenvector matrix", None, _from_numpy(vecs[:, order], digits),
+                    note="Column j is an eigenvector for the j-th eigenvalue in ascending order",
+                    meta={"engine": "numeric"})
+            warnings.append(NUMERIC_WARNING)
+            return SolveResponse(
+                ok=True,
+                result_latex=str(eigenvals),
+                steps=log.get_steps(),
+                warnings=warnings
+            )
+        
         # Compute eigenvalues
         eigenvals = expr.eigenvals()
         log.add("Compute eigenvalues", expr, dict(eigenvals),
@@ -105,8 +545,28 @@ def do_determinant(expr: Any, options: Dict) -> SolveResponse:
         
         log.add("Initial matrix", None, expr)
         
-        det = expr.det()
-        log.add("Compute determinant", expr, det)
+        if choose_engine(expr, options, warnings, "det") == "numeric":
+            import numpy as np
+            from sympy import sympify
+            
+            det = np.linalg.det(_to_numpy(expr))
+            log.add("Compute determinant (LU factorization)", expr, sympify(det).evalf(_digits(options)),
+                    meta={"engine": "numeric"})
+            warnings.append(NUMERIC_WARNING)
+            return SolveResponse(
+                ok=True,
+                result_latex=None,
+                steps=log.get_steps(),
+                warnings=warnings
+            )
+        
+        if matrix_kind(expr) == "rational":
+            det = domain_det(expr)
+            log.add("Compute determinant", expr, det,
+                    meta={"engine": "exact", "method": "bareiss"})
+        else:
+            det = expr.det()
+            log.add("Compute determinant", expr, det)
         
         return SolveResponse(
             ok=True,
@@ -134,9 +594,28 @@ def do_nullspace(expr: Any, options: Dict) -> SolveResponse:
         
         log.add("Initial matrix", None, expr)
         
-        nullspace = expr.nullspace()
+        if choose_engine(expr, options, warnings, "nullspace") == "numeric":
+            basis = numeric_nullspace(_to_numpy(expr))
+            digits = _digits(options)
+            nullspace = [_from_numpy(basis[:, i:i + 1], digits) for i in range(basis.shape[1])]
+            log.add("Compute nullspace (SVD)", expr, nullspace,
+                    note=f"Dimension: {len(nullspace)}", meta={"engine": "numeric"})
+            warnings.append(NUMERIC_WARNING)
+            return SolveResponse(
+                ok=True,
+                result_latex=None,
+                steps=log.get_steps(),
+                warnings=warnings
+            )
+        
+        if matrix_kind(expr) == "rational":
+            nullspace = domain_nullspace(expr)
+            meta = {"engine": "exact", "domain": "ZZ (fraction-free)"}
+        else:
+            nullspace = expr.nullspace()
+            meta = {}
         log.add("Compute nullspace", expr, nullspace,
-                note=f"Dimension: {len(nullspace)}")
+                note=f"Dimension: {len(nullspace)}", meta=meta)
         
         return SolveResponse(
             ok=True,
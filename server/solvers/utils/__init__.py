@@ -1,5 +1,7 @@
-from .steps import StepLogger
+from .steps import StepLogger, stream_steps
 from .parse import parse_query
-from .latex import to_latex
+from .classify import classify_query, InvalidQuery
+from .latex import to_latex, step_latex
+from .trace import span, tracing
 
-__all__ = ["StepLogger", "parse_query", "to_latex"]
+__all__ = ["StepLogger", "stream_steps", "parse_query", "to_latex", "step_latex", "classify_query", "InvalidQuery", "span", "tracing"]
@@ -0,0 +1,284 @@
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+# A cube is a conjunction of literals: ((variable index, polarity), ...)
+Cube = Tuple[Tuple[int, bool], ...]
+
+def variables_of(expr: Any) -> List[Any]:
+    """Boolean variables of a SymPy formula in natural order (x2 before x10), used for tables and BDDs."""
+    def natural(s: Any) -> List[Any]:
+        return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", s.name)]
+    return sorted(expr.free_symbols, key=natural)
+
+def _unary(e: Any) -> None:
+    # Not(p, q) can be built unevaluated; reading args[0] would drop q
+    if len(e.args) != 1:
+        raise ValueError(f"Not takes one argument, got {len(e.args)}")
+
+class TruthTable:
+    """
+    Truth table packed into one integer: bit r is the formula's value on row r,
+    where row r assigns variable j the bit (r >> (n - 1 - j)) & 1. Connectives
+    become single bitwise operations over all 2^n rows at once.
+    """
+
+    def __init__(self, names: List[Any]):
+        self.names = names
+        self.n = len(names)
+        self.rows = 1 << self.n
+        self.full = (1 << self.rows) - 1
+        self._vars = [self._column(self.n - 1 - j) for j in range(self.n)]
+
+    def _column(self, bit: int) -> int:
+        # 2^bit zeros then 2^bit ones, repeated across every row
+        width = 1 << bit
+        period = width << 1
+        unit = ((1 << width) - 1) << width
+        return unit * (self.full // ((1 << period) - 1))
+
+    def evaluate(self, expr: Any) -> int:
+        from sympy.logic import boolalg as b
+
+        index = {name: j for j, name in enumerate(self.names)}
+        full = self.full
+
+        def ev(e: Any) -> int:
+            if e is b.true:
+                return full
+            if e is b.false:
+                return 0
+            if e.is_Symbol:
+                return self._vars[index[e]]
+            args = [ev(a) for a in e.args]
+            if isinstance(e, b.Not):
+                _unary(e)
+                return full ^ args[0]
+            if isinstance(e, (b.And, b.Nand)):
+                out = full
+                for a in args:
+                    out &= a
+                return out if isinstance(e, b.And) else full ^ out
+            if isinstance(e, (b.Or, b.Nor)):
+                out = 0
+                for a in args:
+                    out |= a
+                return out if isinstance(e, b.Or) else full ^ out
+            if isinstance(e, (b.Xor, b.Xnor)):
+                out = 0
+                for a in args:
+                    out ^= a
+                return out if isinstance(e, b.Xor) else full ^ out
+            if isinstance(e, b.Implies):
+                return (full ^ args[0]) | args[1]
+            if isinstance(e, b.Equivalent):
+                out = full
+                for a in args[1:]:
+                    out &= full ^ (args[0] ^ a)
+                return out
+            if isinstance(e, b.ITE):
+                return (args[0] & args[1]) | ((full ^ args[0]) & args[2])
+            raise ValueError(f"Unsupported connective: {type(e).__name__}")
+
+        return ev(expr)
+
+    def count(self, table: int) -> int:
+        return table.bit_count()
+
+    def bits(self, table: int) -> str:
+        """Values in row order as a string of 0s and 1s."""
+        return format(table, f"0{self.rows}b")[::-1]
+
+class BDD:
+    """
+    Reduced ordered binary decision diagram manager. Nodes are integers: 0 and 1
+    are the terminals, every other node is (level, low, high) hash-consed in a
+    unique table, so two formulas are equivalent exactly when they build the
+    same node.
+    """
+
+    def __init__(self, names: List[Any]):
+        self.names = names
+        self.n = len(names)
+        self._nodes: List[Tuple[int, int, int]] = [(self.n, 0, 0), (self.n, 1, 1)]
+        self._unique: Dict[Tuple[int, int, int], int] = {}
+        self._ite: Dict[Tuple[int, int, int], int] = {}
+
+    def level(self, u: int) -> int:
+        return self._nodes[u][0]
+
+    def node(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self._unique.get(key)
+        if u is None:
+            u = self._unique[key] = len(self._nodes)
+            self._nodes.append(key)
+        return u
+
+    def var(self, j: int) -> int:
+        return self.node(j, 0, 1)
+
+    def _cofactors(self, u: int, level: int) -> Tuple[int, int]:
+        lv, low, high = self._nodes[u]
+        return (low, high) if lv == level else (u, u)
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        """If-then-else, the single operation every connective is built from."""
+        if f == 1:
+            return g
+        if f == 0:
+            return h
+        if g == h:
+            return g
+        if g == 1 and h == 0:
+            return f
+        key = (f, g, h)
+        r = self._ite.get(key)
+        if r is not None:
+            return r
+        top = min(self.level(f), self.level(g), self.level(h))
+        f0, f1 = self._cofactors(f, top)
+        g0, g1 = self._cofactors(g, top)
+        h0, h1 = self._cofactors(h, top)
+        r = self.node(top, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self._ite[key] = r
+        return r
+
+    def neg(self, f: int) -> int:
+        return self.ite(f, 0, 1)
+
+    def conj(self, f: int, g: int) -> int:
+        return self.ite(f, g, 0)
+
+    def disj(self, f: int, g: int) -> int:
+        return self.ite(f, 1, g)
+
+    def xor(self, f: int, g: int) -> int:
+        return self.ite(f, self.neg(g), g)
+
+    def build(self, expr: Any) -> int:
+        from sympy.logic import boolalg as b
+
+        index = {name: j for j, name in enumerate(self.names)}
+        memo: Dict[Any, int] = {}
+
+        def bd(e: Any) -> int:
+            if e in memo:
+                return memo[e]
+            if e is b.true:
+                return 1
+            if e is b.false:
+                return 0
+            if e.is_Symbol:
+                return self.var(index[e])
+            args = [bd(a) for a in e.args]
+            if isinstance(e, b.Not):
+                _unary(e)
+                r = self.neg(args[0])
+            elif isinstance(e, (b.And, b.Nand)):
+                r = 1
+                for a in args:
+                    r = self.conj(r, a)
+                r = r if isinstance(e, b.And) else self.neg(r)
+            elif isinstance(e, (b.Or, b.Nor)):
+                r = 0
+                for a in args:
+                    r = self.disj(r, a)
+                r = r if isinstance(e, b.Or) else self.neg(r)
+            elif isinstance(e, (b.Xor, b.Xnor)):
+                r = 0
+                for a in args:
+                    r = self.xor(r, a)
+                r = r if isinstance(e, b.Xor) else self.neg(r)
+            elif isinstance(e, b.Implies):
+                r = self.ite(args[0], args[1], 1)
+            elif isinstance(e, b.Equivalent):
+                r = 1
+                for a in args[1:]:
+                    r = self.conj(r, self.neg(self.xor(args[0], a)))
+            elif isinstance(e, b.ITE):
+                r = self.ite(*args)
+            else:
+                raise ValueError(f"Unsupported connective: {type(e).__name__}")
+            memo[e] = r
+            return r
+
+        return bd(expr)
+
+    def size(self, f: int) -> int:
+        """Internal nodes reachable from f."""
+        seen, stack = set(), [f]
+        while stack:
+            u = stack.pop()
+            if u > 1 and u not in seen:
+                seen.add(u)
+                stack.extend(self._nodes[u][1:])
+        return len(seen)
+
+    def sat_count(self, f: int) -> int:
+        memo: Dict[int, int] = {0: 0, 1: 1}
+
+        def count(u: int) -> int:
+            # Satisfying assignments of the variables at or below u's level
+            if u in memo:
+                return memo[u]
+            lv, low, high = self._nodes[u]
+            memo[u] = (count(low) << (self.level(low) - lv - 1)) + (count(high) << (self.level(high) - lv - 1))
+            return memo[u]
+
+        return count(f) << self.level(f)
+
+    def any_sat(self, f: int) -> Optional[Dict[Any, bool]]:
+        """One satisfying assignment of the variables on the path, or None."""
+        if f == 0:
+            return None
+        out: Dict[Any, bool] = {}
+        while f > 1:
+            lv, low, high = self._nodes[f]
+            value = low == 0
+            out[self.names[lv]] = value
+            f = high if value else low
+        return out
+
+    def isop(self, lower: int, upper: int) -> Tuple[List[Cube], int]:
+        """
+        Minato-Morreale irredundant sum of products for any function between
+        `lower` and `upper`. Returns the cubes and the BDD of the cover.
+        """
+        memo: Dict[Tuple[int, int], Tuple[List[Cube], int]] = {}
+
+        def go(L: int, U: int) -> Tuple[List[Cube], int]:
+            if L == 0:
+                return [], 0
+            if U == 1:
+                return [()], 1
+            key = (L, U)
+            if key in memo:
+                return memo[key]
+            top = min(self.level(L), self.level(U))
+            L0, L1 = self._cofactors(L, top)
+            U0, U1 = self._cofactors(U, top)
+            c0, f0 = go(self.conj(L0, self.neg(U1)), U0)
+            c1, f1 = go(self.conj(L1, self.neg(U0)), U1)
+            rest = self.disj(self.conj(L0, self.neg(f0)), self.conj(L1, self.neg(f1)))
+            cs, fs = go(rest, self.conj(U0, U1))
+            cubes = [((top, False),) + c for c in c0] + [((top, True),) + c for c in c1] + cs
+            x = self.var(top)
+            f = self.disj(self.disj(self.conj(self.neg(x), f0), self.conj(x, f1)), fs)
+            memo[key] = (cubes, f)
+            return memo[key]
+
+        return go(lower, upper)
+
+    def to_dnf(self, cubes: List[Cube]) -> Any:
+        from sympy import And, Not, Or
+        return Or(*[And(*[self.names[j] if pos else Not(self.names[j]) for j, pos in c]) for c in cubes])
+
+    def to_cnf(self, cubes: List[Cube]) -> Any:
+        """CNF from an ISOP cover of the negation: each cube becomes a negated clause."""
+        from sympy import And, Not, Or
+        return And(*[Or(*[Not(self.names[j]) if pos else self.names[j] for j, pos in c]) for c in cubes])
+
+def literal_count(cubes: List[Cube]) -> int:
+    return sum(len(c) for c in cubes)
@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from typing import List, Optional
+import signal
+import threading
+import time
+
+class BudgetExceeded(BaseException):
+    """
+    Raised inside a time_budget block when its wall-clock budget runs out.
+    Derives from BaseException so SymPy's internal `except Exception`
+    handlers cannot swallow it; callers catch it explicitly.
+    """
+
+_local = threading.local()
+
+def _deadlines() -> List[float]:
+    stack = getattr(_local, "deadlines", None)
+    if stack is None:
+        stack = _local.deadlines = []
+    return stack
+
+def deadline_passed() -> bool:
+    """
+    True once an enclosing time_budget on this thread has run out. Handlers
+    for an inner budget re-raise when it is, so they cannot swallow the
+    expiry of an outer one.
+    """
+    stack = _deadlines()
+    return bool(stack) and time.monotonic() >= min(stack)
+
+def _use_alarm() -> bool:
+    # SIGALRM only fires in the main thread (pool workers)
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+_interrupts = False
+
+def enable_interrupts() -> None:
+    """
+    Let time_budget interrupt blocks in this process's main thread. Only
+    processes that exist to run solves (pool workers, the benchmark runner,
+    the precompute CLI) call this; in the server process a SIGALRM or
+    injected exception could land in the event loop or inside a held lock.
+    """
+    global _interrupts
+    _interrupts = True
+
+def can_interrupt() -> bool:
+    """Whether time_budget can interrupt a block running in this thread."""
+    return _interrupts and _use_alarm()
+
+@contextmanager
+def _alarm(seconds: float):
+    def _expire(signum, frame):
+        raise BudgetExceeded(f"Time budget of {seconds:g}s exceeded")
+
+    start = time.monotonic()
+    outer_remaining, _ = signal.getitimer(signal.ITIMER_REAL)
+    if outer_remaining and outer_remaining <= seconds:
+        # A timer armed outside time_budget expires first; let it fire
+        yield
+        return
+
+    previous = signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if outer_remaining:
+            # Re-arm the enclosing budget with whatever it has left
+            signal.setitimer(signal.ITIMER_REAL, max(1e-3, outer_remaining - (time.monotonic() - start)))
+
+@contextmanager
+def time_budget(seconds: Optional[float]):
+    """
+    Interrupt the block with BudgetExceeded after `seconds` through SIGALRM,
+    where can_interrupt allows it. Elsewhere the budget is cooperative: the
+    deadline is visible to deadline_passed checks inside the block, and a
+    block that overran it raises BudgetExceeded on exit. Nested budgets keep
+    the tighter deadline, and an enclosing budget that ran out inside the
+    block is re-raised on exit even if the block swallowed it.
+    """
+    stack = _deadlines()
+    deadline = time.monotonic() + seconds if seconds and seconds > 0 else None
+    if deadline is None or (stack and min(stack) <= deadline):
+        # Unbounded, or an enclosing budget expires first; let it fire
+        yield
+    else:
+        stack.append(deadline)
+        try:
+            if can_interrupt():
+                with _alarm(seconds):
+                    yield
+            else:
+                yield
+                if time.monotonic() >= deadline:
+                    raise BudgetExceeded(f"Time budget of {seconds:g}s exceeded")
+        finally:
+            stack.pop()
+    if deadline_passed():
+        raise BudgetExceeded("Enclosing time budget exceeded")
@@ -0,0 +1,189 @@
+from typing import List, NamedTuple
+import re
+
+class InvalidQuery(ValueError):
+    """Raised for input that can be rejected before any SymPy work."""
+
+class QueryClass(NamedTuple):
+    format: str  # "matrix" | "latex" | "equation" | "logic" | "combinatorics" | "recurrence" | "plain"
+    mode: str    # requested mode, or the inferred one when the request said "auto"
+    query: str   # whitespace-normalized text to hand to the parser
+
+MATRIX_MODES = ("rref", "eigen", "det", "nullspace")
+
+_EXTRA_CHARS = set("+-*/^()[]{}.,=<>!&|~_\\':;% ") | set("¬∧∨⊕·×÷≤≥≠∞√∫∑")
+_OPEN = {"(": ")", "[": "]", "{": "}"}
+_CLOSE = {v: k for k, v in _OPEN.items()}
+
+_LATEX_CMD = re.compile(r"\\[A-Za-z]+")
+_LATEX_GROUP = re.compile(r"[\^_]\{")  # x^{2}, x_{1}: braces that the plain parser reads as sets
+_COMBINATORICS = re.compile(
+    r"\b(?:C|P|binom|multinomial|S|s|stirling[12]|catalan|Cat|bell|B|D|derangements|subfactorial|factorial)\s*\("
+    r"|[\d)]\s*!(?!=)"
+)
+_INTEGER_ARITHMETIC = re.compile(r"[\d\s+\-*/^%()]+")
+_RECURRENCE = re.compile(r"\b[A-Za-z]\s*(?:\(\s*n\s*-\s*\d+\s*\)|_\{?\s*n\s*-\s*\d+\s*\}?)")
+_ODE = re.compile(r"[A-Za-z]\s*'|\bDerivative\s*\(|\bd[A-Za-z]\s*/\s*d[A-Za-z]\b")
+_LOGIC = re.compile(r"&&|\|\||[&|~^¬∧∨⊕]|!(?!=)|<?[-=]>|\b(?:AND|OR|NOT|XOR|xor)\b")
+_EQUATION = re.compile(r"(?<![<>=!])=(?!=)")
+
+_LOGIC_REWRITES = [
+    (re.compile(r"&&|∧|\bAND\b"), "&"),
+    (re.compile(r"\|\||∨|\bOR\b"), "|"),
+    (re.compile(r"!(?!=)|¬|\bNOT\b"), "~"),
+    (re.compile(r"⊕|\b(?:XOR|xor)\b"), "^"),
+]
+_ARROW = re.compile(r"<[-=]>|[-=]>")
+
+def _check_brackets(q: str) -> None:
+    stack = []
+    for ch in q:
+        if ch in _OPEN:
+            stack.append(ch)
+        elif ch in _CLOSE:
+            if not stack or stack[-1] != _CLOSE[ch]:
+                raise InvalidQuery(f"Unbalanced bracket '{ch}'")
+            stack.pop()
+    if stack:
+        raise InvalidQuery(f"Unclosed bracket '{stack[-1]}'")
+
+def _check_matrix(q: str) -> None:
+    """Reject ragged or empty list-of-rows literals by counting top-level entries."""
+    inner = q.strip()[1:-1].strip()
+    if not inner:
+        raise InvalidQuery("Matrix literal is empty")
+    if not inner.startswith("["):
+        return  # a single row vector
+    widths = []
+    depth = 0
+    entries = 0
+    for ch in inner:
+        if ch == "[":
+            depth += 1
+            if depth == 1:
+                entries = 1
+        elif ch == "]":
+            if depth == 1:
+                widths.append(entries)
+            depth -= 1
+        elif ch == "," and depth == 1:
+            entries += 1
+    if len(set(widths)) > 1:
+        raise InvalidQuery(f"Matrix rows have different lengths: {widths}")
+
+def _split_arrows(q: str, arrow: str) -> List[str]:
+    """Split at `arrow` ("->" or "<->", either spelling) outside every bracket."""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(q):
+        ch = q[i]
+        if ch in _OPEN:
+            depth += 1
+        elif ch in _CLOSE:
+            depth -= 1
+        elif depth == 0:
+            m = _ARROW.match(q, i)
+            if m and (m.group() in ("<->", "<=>")) == (arrow == "<->"):
+                parts.append(q[start:i].strip())
+                start = i = m.end()
+                continue
+            if m:
+                i = m.end()
+                continue
+        i += 1
+    parts.append(q[start:].strip())
+    return parts
+
+def _rewrite_arrows(q: str) -> str:
+    """
+    Rewrite `p -> q` as Implies(p, q) and `p <-> q` as Equivalent(p, q),
+    binding looser than every other connective (Python's >> would not).
+    """
+    out, i = [], 0
+    while i < len(q):
+        if q[i] == "(":
+            depth, j = 1, i + 1
+            while depth:
+                depth += {"(": 1, ")": -1}.get(q[j], 0)
+                j += 1
+            out.append(f"({_rewrite_arrows(q[i + 1:j - 1])})")
+            i = j
+        else:
+            out.append(q[i])
+            i += 1
+    q = "".join(out)
+    sides = _split_arrows(q, "<->")
+    if len(sides) > 1:
+        return f"Equivalent({', '.join(_rewrite_arrows(s) for s in sides)})"
+    terms = _split_arrows(q, "->")
+    result = terms[-1]
+    for term in reversed(terms[:-1]):
+        result = f"Implies({term}, {result})"
+    return result
+
+def _infer_mode(subject: str, fmt: str, q: str) -> str:
+    if subject == "la":
+        return "rref"
+    if subject in ("calc1", "calc2"):
+        if "\\int" in q:
+            return "integral"
+        if "\\lim" in q:
+            return "limit"
+        if _ODE.search(q):
+            return "ode"
+        return "derivative"
+    if subject == "discrete":
+        if fmt in ("combinatorics", "recurrence"):
+            return fmt
+        return "logic"
+    return "algebra"
+
+def classify_query(subject: str, query: str, mode: str = "auto") -> QueryClass:
+    """
+    Decide the input format (and the mode, for "auto") from the raw text,
+    rejecting malformed input before any parser runs.
+    """
+    q = " ".join(query.split())
+    if q.startswith("$") and q.endswith("$"):
+        q = q.strip("$").strip()
+    if not q:
+        raise InvalidQuery("Query is empty")
+
+    bad = sorted({ch for ch in q if not (ch.isalnum() or ch in _EXTRA_CHARS)})
+    if bad:
+        raise InvalidQuery(f"Unsupported characters: {' '.join(bad)}")
+    if "__" in q:
+        raise InvalidQuery("Double underscores are not allowed")
+    _check_brackets(q)
+    if q[-1] in "+-*/^=,&" or q[0] in "*/^=,&":
+        raise InvalidQuery("Expression starts or ends with an operator")
+
+    if q.startswith("[") and q.endswith("]") and (subject == "la" or q.startswith("[[")):
+        _check_matrix(q)
+        fmt = "matrix"
+    elif _LATEX_CMD.search(q):
+        fmt = "latex"
+    elif subject == "discrete" and (mode == "recurrence" or _RECURRENCE.search(q)):
+        fmt = "recurrence"
+    elif _LATEX_GROUP.search(q):
+        fmt = "latex"
+    elif subject == "discrete" and (
+        mode == "combinatorics" or _COMBINATORICS.search(q) or _INTEGER_ARITHMETIC.fullmatch(q)
+    ):
+        fmt = "combinatorics"
+    elif subject == "discrete" and _LOGIC.search(q):
+        fmt = "logic"
+        for pattern, repl in _LOGIC_REWRITES:
+            q = pattern.sub(repl, q)
+        if _ARROW.search(q):
+            q = _rewrite_arrows(q)
+    elif _EQUATION.search(q):
+        fmt = "equation"
+    else:
+        fmt = "plain"
+
+    if mode == "auto":
+        mode = _infer_mode(subject, fmt, q)
+    if mode in MATRIX_MODES and fmt not in ("matrix", "latex"):
+        raise InvalidQuery(f"Mode '{mode}' expects a matrix such as [[1,2],[3,4]]")
+
+    return QueryClass(format=fmt, mode=mode, query=q)
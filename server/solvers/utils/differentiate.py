@@ -0,0 +1,184 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.config import settings
+from .steps import StepLogger
+from .trace import span
+
+# Steps kept free after the rule walk for the result and simplification
+_RESERVED_STEPS = 3
+
+class DiffEngine:
+    """
+    Recursive differentiation by rules (sum, constant multiple, product,
+    quotient, power, exponential, chain) that logs one step per rule
+    application, nested by depth in `meta`. Each distinct subexpression is
+    differentiated once per request, and whether it depends on the variable
+    is worked out once per node, bottom-up, so the work is linear in the
+    size of the expression DAG. Once the step budget (Settings.MAX_STEPS)
+    is spent, the remaining subtrees are handed to sympy.diff without steps.
+    """
+
+    def __init__(self, var: Any, log: StepLogger, max_steps: Optional[int] = None):
+        self.x = var
+        self.log = log
+        self.max_steps = (settings.MAX_STEPS if max_steps is None else max_steps) - _RESERVED_STEPS
+        # subexpression -> (derivative, index of the step that derived it)
+        self._memo: Dict[Any, Tuple[Any, Optional[int]]] = {}
+        # subexpression -> whether it contains the variable
+        self._deps: Dict[Any, bool] = {}
+        self.rules_applied = 0
+        self.memo_hits = 0
+        self.cut_off = False
+
+    def differentiate(self, expr: Any) -> Any:
+        with span("differentiate") as s:
+            result = self._d(expr, 0)
+            if s is not None:
+                s.meta.update(rules=self.rules_applied, memo_hits=self.memo_hits, cut_off=self.cut_off)
+        return result
+
+    # -- helpers ---------------------------------------------------------
+
+    def _depends(self, expr: Any) -> bool:
+        """expr.has(x), memoized per node so a whole walk stays linear."""
+        deps = self._deps
+        stack = [expr]
+        while stack:
+            e = stack[-1]
+            if e in deps:
+                stack.pop()
+                continue
+            pending = [a for a in e.args if a not in deps]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            deps[e] = e == self.x or any(deps[a] for a in e.args)
+        return deps[expr]
+
+    def _shown(self, u: Any) -> Any:
+        """d/dx u as displayed inside a rule: evaluated for leaves, unevaluated otherwise."""
+        from sympy import Derivative, S
+        if u == self.x:
+            return S.One
+        if not self._depends(u):
+            return S.Zero
+        return Derivative(u, self.x)
+
+    def _budget_left(self) -> bool:
+        return len(self.log.steps) < self.max_steps
+
+    def _step(self, rule: str, expr: Any, after: Any, depth: int, note: Optional[str] = None) -> Optional[int]:
+        from sympy import Derivative
+        if not self._budget_left():
+            return None
+        self.log.add(rule, Derivative(expr, self.x), after, note=note, meta={"depth": depth})
+        return self.log.steps[-1].index
+
+    # -- rules -----------------------------------------------------------
+
+    def _d(self, expr: Any, depth: int) -> Any:
+        from sympy import S
+        x = self.x
+        if expr == x:
+            return S.One
+        if not self._depends(expr):
+            return S.Zero
+        hit = self._memo.get(expr)
+        if hit is not None:
+            self.memo_hits += 1
+            if hit[1] is not None:
+                self._step("Repeated subexpression", expr, hit[0], depth, note=f"Already differentiated in step {hit[1]}")
+            return hit[0]
+        if not self._budget_left():
+            # Cut off: no more steps, finish this subtree directly
+            from sympy import diff
+            self.cut_off = True
+            result = diff(expr, x)
+            self._memo[expr] = (result, None)
+            return result
+
+        self.rules_applied += 1
+        result, index = self._apply(expr, depth)
+        self._memo[expr] = (result, index)
+        return result
+
+    def _apply(self, expr: Any, depth: int) -> Tuple[Any, Optional[int]]:
+        from sympy import Add, Derivative, Dummy, Mul, Pow, diff, log
+        from sympy.core.function import AppliedUndef, Function
+
+        x = self.x
+
+        if expr.is_Add:
+            index = self._step("Sum Rule", expr, Add(*[self._shown(a) for a in expr.args]), depth,
+                               note="(f + g)' = f' + g'")
+            return Add(*[self._d(a, depth + 1) for a in expr.args]), index
+
+        if expr.is_Mul:
+            # as_independent would call has() on every factor again
+            coeff = Mul(*[f for f in expr.args if f.is_commutative and not self._depends(f)])
+            rest = Mul(*[f for f in expr.args if not f.is_commutative or self._depends(f)])
+            if coeff != 1:
+                index = self._step("Constant Multiple Rule", expr, coeff * self._shown(rest), depth,
+                                   note="(c·f)' = c·f'")
+                return coeff * self._d(rest, depth + 1), index
+
+            num, den = [], []
+            for factor in expr.args:
+                if factor.is_Pow and factor.exp.is_negative and factor.exp.is_Rational and self._depends(factor.base):
+                    den.append(Pow(factor.base, -factor.exp))
+                else:
+                    num.append(factor)
+            if den and num:
+                u, v = Mul(*num), Mul(*den)
+                index = self._step("Quotient Rule", expr, (self._shown(u) * v - u * self._shown(v)) / v ** 2, depth,
+                                   note="(u/v)' = (u'v - uv') / v²")
+                du, dv = self._d(u, depth + 1), self._d(v, depth + 1)
+                return (du * v - u * dv) / v ** 2, index
+
+            factors = expr.args
+            index = self._step(
+                "Product Rule", expr,
+                Add(*[Mul(*factors[:i], self._shown(f), *factors[i + 1:]) for i, f in enumerate(factors)]),
+                depth, note="(uv)' = u'v + uv'")
+            derivs = [self._d(f, depth + 1) for f in factors]
+            return Add(*[Mul(*factors[:i], d, *factors[i + 1:]) for i, d in enumerate(derivs) if d != 0]), index
+
+        if expr.is_Pow:
+            base, exp = expr.base, expr.exp
+            if not self._depends(exp):
+                outer = exp * base ** (exp - 1)
+                if base == x:
+                    return outer, self._step("Power Rule", expr, outer, depth, note="(xⁿ)' = n·xⁿ⁻¹")
+                index = self._step("Chain Rule", expr, outer * self._shown(base), depth,
+                                   note="(uⁿ)' = n·uⁿ⁻¹·u'")
+                return outer * self._d(base, depth + 1), index
+            if not self._depends(base):
+                if exp == x:
+                    result = expr * log(base)
+                    return result, self._step("Exponential Rule", expr, result, depth, note="(aˣ)' = aˣ·ln a")
+                index = self._step("Chain Rule", expr, expr * log(base) * self._shown(exp), depth,
+                                   note="(aᵘ)' = aᵘ·ln a·u'")
+                return expr * log(base) * self._d(exp, depth + 1), index
+            index = self._step("Logarithmic Differentiation", expr,
+                               expr * (self._shown(exp) * log(base) + exp * self._shown(base) / base), depth,
+                               note="(uᵛ)' = uᵛ·(v'·ln u + v·u'/u)")
+            du, dv = self._d(base, depth + 1), self._d(exp, depth + 1)
+            return expr * (dv * log(base) + exp * du / base), index
+
+        if isinstance(expr, Function) and len(expr.args) == 1 and not isinstance(expr, AppliedUndef):
+            u = expr.args[0]
+            t = Dummy("t")
+            outer = expr.func(t).diff(t)
+            if not outer.has(Derivative):
+                outer = outer.subs(t, u)
+                name = expr.func.__name__
+                if u == x:
+                    return outer, self._step(f"Derivative of {name}", expr, outer, depth)
+                index = self._step("Chain Rule", expr, outer * self._shown(u), depth,
+                                   note=f"{name}(u)' = {name}'(u)·u'")
+                return outer * self._d(u, depth + 1), index
+
+        # Anything without a rule here (multi-argument functions, abs, piecewise, ...)
+        result = diff(expr, x)
+        return result, self._step("Differentiate", expr, result, depth)
@@ -0,0 +1,354 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import time
+
+from server.config import settings
+from .budget import BudgetExceeded, deadline_passed, time_budget
+from .steps import StepLogger
+from .trace import span
+
+# Order in which an integrand is tried; later stages are slower and more general
+STAGES = ("table", "linearity", "substitution", "parts", "manual", "integrate")
+
+# Recursion limit for the heuristic stages (u-substitution inside by-parts inside ...)
+_MAX_DEPTH = 6
+
+# A step waiting to be logged: (rule, before, after, note, meta)
+Pending = Tuple[str, Any, Any, Optional[str], Dict[str, Any]]
+
+def _linear(u: Any, x: Any) -> Optional[Tuple[Any, Any]]:
+    """(a, b) when u == a*x + b with a != 0, else None."""
+    if u == x:
+        from sympy import S
+        return S.One, S.Zero
+    a = u.diff(x)
+    if a == 0 or a.has(x):
+        return None
+    return a, (u - a * x).expand()
+
+# -- standard forms ------------------------------------------------------
+# Each entry takes (integrand, x) and returns (antiderivative, formula) or None.
+
+def _pow_form(f, x):
+    from sympy import log
+    base, n = f.base, f.exp
+    if not n.has(x):
+        lin = _linear(base, x)
+        if lin is not None:
+            a, _ = lin
+            if n == -1:
+                return log(base) / a, "∫ 1/u du = ln u"
+            return base ** (n + 1) / (a * (n + 1)), "∫ uⁿ du = uⁿ⁺¹/(n+1)"
+        return _inverse_trig_form(base, n, x)
+    if not base.has(x):
+        lin = _linear(n, x)
+        if lin is not None and base != 1:
+            return f / (lin[0] * log(base)), "∫ aᵘ du = aᵘ/ln a"
+    return None
+
+def _inverse_trig_form(q, n, x):
+    """1/(c + a·x²) and 1/sqrt(c - a·x²)."""
+    from sympy import Rational, asin, atan, sqrt
+    poly = q.as_poly(x)
+    if poly is None or poly.degree() != 2 or poly.coeff_monomial(x) != 0:
+        return None
+    a, c = poly.coeff_monomial(x ** 2), poly.coeff_monomial(1)
+    if n == -1 and a.is_positive and c.is_positive:
+        return atan(sqrt(a) * x / sqrt(c)) / sqrt(a * c), "∫ 1/(c² + u²) du = atan(u/c)/c"
+    if n == Rational(-1, 2) and a.is_negative and c.is_positive:
+        return asin(sqrt(-a) * x / sqrt(c)) / sqrt(-a), "∫ 1/√(c² - u²) du = asin(u/c)"
+    return None
+
+def _function_form(antiderivative: Callable[[Any], Any], formula: str):
+    def form(f, x):
+        lin = _linear(f.args[0], x)
+        if lin is None:
+            return None
+        return antiderivative(f.args[0]) / lin[0], formula
+    return form
+
+def _build_table() -> Dict[Any, Callable]:
+    """Standard forms keyed by the integrand's head, so a lookup is one dict access."""
+    from sympy import Pow, cos, cosh, exp, log, sin, sinh, tan
+    return {
+        Pow: _pow_form,
+        exp: _function_form(exp, "∫ eᵘ du = eᵘ"),
+        sin: _function_form(lambda u: -cos(u), "∫ sin u du = -cos u"),
+        cos: _function_form(sin, "∫ cos u du = sin u"),
+        tan: _function_form(lambda u: -log(cos(u)), "∫ tan u du = -ln cos u"),
+        sinh: _function_form(cosh, "∫ sinh u du = cosh u"),
+        cosh: _function_form(sinh, "∫ cosh u du = sinh u"),
+        log: _function_form(lambda u: u * log(u) - u, "∫ ln u du = u·ln u - u"),
+    }
+
+_TABLE: Optional[Dict[Any, Callable]] = None
+
+def _liate(f: Any, x: Any) -> int:
+    """LIATE rank of a factor for choosing u in integration by parts (lower is u)."""
+    from sympy import acos, asin, atan, exp, log
+    if isinstance(f, log):
+        return 0
+    if isinstance(f, (asin, acos, atan)):
+        return 1
+    if f.is_polynomial(x):
+        return 2
+    if isinstance(f, exp) or (f.is_Pow and not f.base.has(x)):
+        return 4
+    return 3
+
+class IntegrationEngine:
+    """
+    Staged antiderivatives: a table of standard forms, linearity, u-substitution
+    and by-parts heuristics, then sympy's manual_integrate, then full integrate()
+    under the remaining time budget. Each stage attempt is timed in its own span
+    with meta `hit`, and counted in `stats`. Steps of an attempt are logged only
+    once it succeeds, so abandoned heuristics never reach a streaming client.
+    """
+
+    def __init__(self, var: Any, log: StepLogger, budget_ms: Optional[float] = None):
+        global _TABLE
+        if _TABLE is None:
+            _TABLE = _build_table()
+        self.x = var
+        self.log = log
+        self.budget_ms = float(settings.INTEGRAL_BUDGET_MS if budget_ms is None else budget_ms)
+        self.start = time.perf_counter()
+        self.stats: Dict[str, List[int]] = {stage: [0, 0] for stage in STAGES}
+        self.stage: Optional[str] = None
+        self.timed_out = False
+        self._stages = {
+            "table": self._table,
+            "linearity": self._linearity,
+            "substitution": self._substitution,
+            "parts": self._parts,
+            "manual": self._manual,
+            "integrate": self._integrate_full,
+        }
+        # (integrand, variable) -> (antiderivative, steps); successes only
+        self._memo: Dict[Any, Tuple[Any, List[Pending]]] = {}
+
+    def integrate(self, expr: Any) -> Optional[Any]:
+        """Antiderivative of `expr`, logging its steps; None when every stage fails."""
+        with span("integrate") as s:
+            # Parsed input can hold unevaluated nodes such as Mul(1, f) that hide the head
+            found = self._integrate(expr.doit(), self.x, 0, cheap=False)
+            if s is not None:
+                s.meta.update(stage=self.stage, stats={k: v for k, v in self.stats.items() if v[0]})
+        if found is None:
+            return None
+        result, pending = found
+        for rule, before, after, note, meta in pending:
+            self.log.add(rule, before, after, note=note, meta=meta)
+        return result
+
+    def remaining_ms(self) -> float:
+        return self.budget_ms - (time.perf_counter() - self.start) * 1000
+
+    # -- pipeline --------------------------------------------------------
+
+    def _integrate(self, f: Any, x: Any, depth: int, cheap: bool) -> Optional[Tuple[Any, List[Pending]]]:
+        """
+        Run the stages on ∫ f dx in order. `cheap` (inside another heuristic)
+        stops before manual_integrate and integrate().
+        """
+        hit = self._memo.get((f, x))
+        if hit is not None:
+            return hit
+        if depth > _MAX_DEPTH:
+            return None
+        stages = STAGES[:4] if cheap else STAGES
+        for stage in stages:
+            if stage in ("manual", "integrate") and self.remaining_ms() <= 0:
+                self.timed_out = True
+                break
+            self.stats[stage][0] += 1
+            with span(f"integrate.{stage}") as s:
+                found = self._stages[stage](f, x, depth)
+                if s is not None:
+                    s.meta["hit"] = found is not None
+            if found is not None:
+                self.stats[stage][1] += 1
+                if depth == 0:
+                    self.stage = stage
+                self._memo[(f, x)] = found
+                return found
+        return None
+
+    def _step(self, rule: str, f: Any, x: Any, after: Any, depth: int, stage: str, note: Optional[str] = None) -> Pending:
+        from sympy import Integral
+        return (rule, Integral(f, x), after, note, {"stage": stage, "depth": depth})
+
+    # -- stages ----------------------------------------------------------
+
+    def _table(self, f: Any, x: Any, depth: int):
+        if not f.has(x):
+            return f * x, [self._step("Constant Rule", f, x, f * x, depth, "table", "∫ c dx = c·x")]
+        if f == x:
+            result = x ** 2 / 2
+            return result, [self._step("Power Rule", f, x, result, depth, "table", "∫ x dx = x²/2")]
+        form = _TABLE.get(f.func)
+        found = form(f, x) if form is not None else None
+        if found is None:
+            return None
+        result, formula = found
+        return result, [self._step("Standard Integral", f, x, result, depth, "table", formula)]
+
+    def _linearity(self, f: Any, x: Any, depth: int):
+        from sympy import Add, Integral, Mul
+        if f.is_Mul:
+            coeff, rest = f.as_independent(x, as_Add=False)
+            if coeff != 1:
+                inner = self._integrate(rest, x, depth + 1, cheap=False)
+                if inner is None:
+                    return None
+                step = self._step("Constant Multiple Rule", f, x, coeff * Integral(rest, x), depth, "linearity",
+                                  "∫ c·f dx = c·∫ f dx")
+                return coeff * inner[0], [step] + inner[1]
+            if f.is_polynomial(x):
+                f = f.expand()
+        if not f.is_Add:
+            return None
+        terms = Add.make_args(f)
+        steps = [self._step("Sum Rule", f, x, Add(*[Integral(t, x) for t in terms]), depth, "linearity",
+                            "∫ (f + g) dx = ∫ f dx + ∫ g dx")]
+        parts = []
+        for term in terms:
+            inner = self._integrate(term, x, depth + 1, cheap=False)
+            if inner is None:
+                return None
+            parts.append(inner[0])
+            steps.extend(inner[1])
+        return Add(*parts), steps
+
+    def _candidates(self, f: Any, x: Any) -> List[Any]:
+        """Inner expressions worth trying as u: function calls, their arguments, bases and exponents."""
+        from sympy import preorder_traversal
+        from sympy.core.function import Function
+        seen: List[Any] = []
+        for node in preorder_traversal(f):
+            if isinstance(node, Function) and len(node.args) == 1:
+                options = (node, node.args[0])
+            elif node.is_Pow:
+                options = (node.base, node.exp)
+            else:
+                continue
+            for u in options:
+                if u != x and u != f and u.has(x) and u not in seen:
+                    seen.append(u)
+        return seen[:8]
+
+    def _substitution(self, f: Any, x: Any, depth: int):
+        from sympy import Dummy, Integral, Symbol
+        u_sym = Symbol("u")
+        if u_sym in f.free_symbols or u_sym == x:
+            u_sym = Dummy("u")
+        for u in self._candidates(f, x):
+            du = u.diff(x)
+            if du == 0:
+                continue
+            g = (f / du).subs(u, u_sym)
+            if g.has(x):
+                continue
+            inner = self._integrate(g, u_sym, depth + 1, cheap=True)
+            if inner is None:
+                continue
+            result = inner[0].subs(u_sym, u)
+            steps = [self._step("u-Substitution", f, x, Integral(g, u_sym), depth, "substitution",
+                                f"u = {u}, du = ({du}) d{x}")]
+            steps.extend(inner[1])
+            steps.append(("Substitute back", inner[0], result, f"u = {u}", {"stage": "substitution", "depth": depth}))
+            return result, steps
+        return None
+
+    def _parts(self, f: Any, x: Any, depth: int):
+        from sympy import Integral, Mul, S
+        factors = Mul.make_args(f)
+        u = min(factors, key=lambda fac: _liate(fac, x))
+        # Only u whose derivative is simpler (log, inverse trig, polynomial) terminates;
+        # cyclic cases like eˣ·sin x are left to manual_integrate
+        if _liate(u, x) > 2 or (len(factors) == 1 and _liate(u, x) == 2):
+            return None
+        dv = f / u
+        v_found = self._integrate(dv, x, depth + 1, cheap=True)
+        if v_found is None:
+            return None
+        v = v_found[0]
+        du = u.diff(x)
+        rest = self._integrate(v * du, x, depth + 1, cheap=True) if v * du != 0 else (S.Zero, [])
+        if rest is None:
+            return None
+        step = self._step("Integration by Parts", f, x, u * v - Integral(v * du, x), depth, "parts",
+                          f"u = {u}, dv = ({dv}) d{x}")
+        return u * v - rest[0], [step] + v_found[1] + rest[1]
+
+    def _manual(self, f: Any, x: Any, depth: int):
+        from sympy.integrals.manualintegrate import DontKnowRule, integral_steps
+        budget = min(self.remaining_ms(), settings.INTEGRAL_MANUAL_BUDGET_MS)
+        try:
+            with time_budget(budget / 1000):
+                rule = integral_steps(f, x)
+                if _contains_rule(rule, DontKnowRule):
+                    return None
+                result = rule.eval()
+        except BudgetExceeded:
+            if deadline_passed():
+                raise
+            return None
+        except Exception:
+            # manual_integrate raises on forms it has no rule for; the next stage may still succeed
+            return None
+        note = "Rules: " + ", ".join(_rule_names(rule))
+        return result, [self._step("Manual Integration", f, x, result, depth, "manual", note)]
+
+    def _integrate_full(self, f: Any, x: Any, depth: int):
+        from sympy import Integral, integrate
+        try:
+            with time_budget(self.remaining_ms() / 1000):
+                result = integrate(f, x)
+        except BudgetExceeded:
+            if deadline_passed():
+                raise
+            self.timed_out = True
+            return None
+        if result.has(Integral):
+            return None
+        return result, [self._step("Integrate", f, x, result, depth, "integrate")]
+
+def _walk_rules(rule: Any):
+    import dataclasses
+    yield rule
+    if not dataclasses.is_dataclass(rule):
+        return
+    for field in dataclasses.fields(rule):
+        value = getattr(rule, field.name)
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if dataclasses.is_dataclass(item):
+                yield from _walk_rules(item)
+
+def _contains_rule(rule: Any, kind: type) -> bool:
+    return any(isinstance(r, kind) for r in _walk_rules(rule))
+
+def _rule_names(rule: Any) -> List[str]:
+    names: List[str] = []
+    for r in _walk_rules(rule):
+        name = type(r).__name__.removesuffix("Rule")
+        if name not in names:
+            names.append(name)
+    return names
+
+def continuous_on(f: Any, x: Any, lower: Any, upper: Any) -> bool:
+    """True when f is known to be continuous on the closed interval [lower, upper]."""
+    from sympy import Interval
+    from sympy.calculus.util import continuous_domain
+    interval = Interval(lower, upper)
+    try:
+        return continuous_domain(f, x, interval) == interval
+    except Exception:
+        return False
+
+def evaluate_at(F: Any, x: Any, point: Any, direction: str) -> Any:
+    """F(point), taking the one-sided limit where substitution is undefined (e.g. x·ln x at 0, or ∞)."""
+    from sympy import limit, nan, oo, zoo
+    value = F.subs(x, point)
+    if value.has(nan, zoo) or point in (oo, -oo):
+        value = limit(F, x, point, dir=direction)
+    return value
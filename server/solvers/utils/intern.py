@@ -0,0 +1,175 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+import sys
+import threading
+
+from server.config import settings
+
+# Process-wide counters across every Interner, reported by intern_stats()
+_totals_lock = threading.Lock()
+_totals = {"lookups": 0, "hits": 0, "nodes_saved": 0, "bytes_saved": 0}
+
+class Interner:
+    """
+    Hash-consing table for SymPy trees. Interning a tree replaces every
+    subtree that is structurally equal to one seen before with that earlier
+    object, so repeated subexpressions are stored once and later equality
+    checks between interned trees short-circuit on identity. SymPy objects
+    are immutable and may be shared through its cache, so a node whose
+    arguments change is rebuilt with `func(*args)` rather than modified.
+    With `max_entries`, the least recently used entries are evicted once
+    the table grows past the limit; evicting an entry only stops later
+    trees from sharing it. A `parent` table is consulted (never written)
+    before this one, so per-request tables reuse the long-lived instances.
+
+    Memory saved is estimated per interned tree as the size it would have
+    as an unshared tree minus the size of the nodes it added to the table.
+    """
+
+    def __init__(self, max_entries: int = 0, parent: Optional["Interner"] = None):
+        self.max_entries = max_entries
+        self.parent = parent
+        # expr -> (canonical expr, nodes in its tree, bytes of its tree unshared)
+        self._table: "OrderedDict[Any, Tuple[Any, int, int]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.lookups = 0
+        self.hits = 0
+        self.nodes_saved = 0
+        self.bytes_saved = 0
+        self.evicted = 0
+        self._new_nodes = 0
+        self._new_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def intern(self, expr: Any) -> Any:
+        """Canonical instance of `expr`; anything that is not a SymPy tree is returned unchanged."""
+        if not settings.INTERN_ENABLED:
+            return expr
+        try:
+            from sympy import Basic
+        except ImportError:
+            return expr
+        if not isinstance(expr, Basic) or _is_leaf(expr):
+            return expr
+        with self._lock:
+            before = (self.lookups, self.hits, self.nodes_saved, self.bytes_saved)
+            if self._lookup(expr) is expr:
+                return expr  # already canonical: nothing new is stored or saved
+            self._new_nodes = self._new_bytes = 0
+            out, nodes, size = self._node(expr)
+            self.nodes_saved += nodes - self._new_nodes
+            self.bytes_saved += size - self._new_bytes
+            if self.max_entries and len(self._table) > self.max_entries:
+                self.evict()
+            delta = (self.lookups - before[0], self.hits - before[1],
+                     self.nodes_saved - before[2], self.bytes_saved - before[3])
+        with _totals_lock:
+            for name, d in zip(("lookups", "hits", "nodes_saved", "bytes_saved"), delta):
+                _totals[name] += d
+        return out
+
+    def _lookup(self, e: Any) -> Optional[Any]:
+        entry = self._entry(e)
+        return entry[0] if entry is not None else None
+
+    def _entry(self, e: Any) -> Optional[Tuple[Any, int, int]]:
+        entry = self._table.get(e)
+        if entry is not None:
+            self._table.move_to_end(e)
+        elif self.parent is not None:
+            entry = self.parent._table.get(e)
+        return entry
+
+    def _node(self, e: Any) -> Tuple[Any, int, int]:
+        self.lookups += 1
+        entry = self._entry(e)
+        if entry is not None:
+            if entry[0] is not e:
+                self.hits += 1
+            return entry
+        args = e.args
+        nodes, own = 1, sys.getsizeof(e) + sys.getsizeof(args)
+        size = own
+        shared = []
+        for a in args:
+            if _is_leaf(a):
+                shared.append(a)
+                continue
+            canon, n, b = self._node(a)
+            shared.append(canon)
+            nodes += n
+            size += b
+        if any(s is not a for s, a in zip(shared, args)):
+            e = _rebuild(e, shared)
+        self._new_nodes += 1
+        self._new_bytes += own
+        entry = self._table[e] = (e, nodes, size)
+        return entry
+
+    def evict(self) -> int:
+        """Drop least recently used entries down to 3/4 of max_entries; returns how many."""
+        with self._lock:
+            excess = len(self._table) - self.max_entries * 3 // 4
+            for _ in range(max(0, excess)):
+                self._table.popitem(last=False)
+            self.evicted += max(0, excess)
+            return max(0, excess)
+
+    def table_bytes(self) -> int:
+        """Approximate memory the table itself costs, to weigh against bytes_saved."""
+        return sys.getsizeof(self._table) + len(self._table) * sys.getsizeof((None, 0, 0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._table),
+                "table_bytes": self.table_bytes(),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "nodes_saved": self.nodes_saved,
+                "bytes_saved": self.bytes_saved,
+                "evicted": self.evicted,
+            }
+
+@lru_cache(maxsize=None)
+def _leaf_types() -> Tuple[type, ...]:
+    # Floats of equal value can differ in precision, and matrices and Dicts
+    # keep their entries outside `_args`
+    from sympy import Dict as SympyDict, Float
+    from sympy.matrices import MatrixBase
+    return (Float, MatrixBase, SympyDict)
+
+def _is_leaf(e: Any) -> bool:
+    return not e.args or isinstance(e, _leaf_types())
+
+def _rebuild(e: Any, args: list) -> Any:
+    """
+    `e` with its arguments replaced by equal (interned) ones, as a new node.
+    Falls back to `e` itself if the class re-evaluates to something else.
+    """
+    try:
+        try:
+            new = e.func(*args, evaluate=False)
+        except TypeError:
+            new = e.func(*args)
+    except Exception:
+        return e
+    return new if new == e and new.args == tuple(args) else e
+
+# Long-lived trees (the parse cache) share this table
+shared = Interner(max_entries=settings.INTERN_MAX_ENTRIES)
+
+def intern_expr(expr: Any) -> Any:
+    return shared.intern(expr)
+
+def intern_stats() -> Dict[str, Any]:
+    """Totals for this process across the shared table and per-request step interners."""
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["hit_rate"] = round(totals["hits"] / totals["lookups"], 4) if totals["lookups"] else 0.0
+    totals["shared_entries"] = len(shared)
+    totals["shared_table_bytes"] = shared.table_bytes()
+    return totals
@@ -1,4 +1,11 @@
-from typing import Any, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from .trace import span
+
+# False when the client asked for steps without LaTeX (options.step_latex)
+_latex_enabled: ContextVar[bool] = ContextVar("latex_enabled", default=True)
 
 def to_latex(x: Any) -> Optional[str]:
     """Convert SymPy expression to LaTeX string."""
@@ -10,3 +17,44 @@ def to_latex(x: Any) -> Optional[str]:
         return sympy_latex(x)
     except Exception:
         return str(x)
+
+@contextmanager
+def step_latex(enabled: bool = True):
+    """Enable or disable LaTeX rendering for steps logged in this context."""
+    token = _latex_enabled.set(bool(enabled))
+    try:
+        yield
+    finally:
+        _latex_enabled.reset(token)
+
+class LatexMemo:
+    """
+    Per-request LaTeX renderer that renders each distinct object only once.
+    Hashable objects are keyed by value, mutable ones (matrices, lists) by identity.
+    """
+    
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = _latex_enabled.get() if enabled is None else enabled
+        self._rendered: Dict[Tuple[Any, ...], Optional[str]] = {}
+        self.renders = 0
+    
+    def render(self, x: Any) -> Optional[str]:
+        if x is None or not self.enabled:
+            return None
+        try:
+            key: Tuple[Any, ...] = (type(x), x)
+            hash(key)
+        except TypeError:
+            key = ("id", id(x))
+        if key not in self._rendered:
+            with span("latex"):
+                self._rendered[key] = to_latex(x)
+            self.renders += 1
+        return self._rendered[key]
+    
+    def matrix_row(self, row: Tuple[Any, ...]) -> str:
+        """One matrix row as `a & b & c`; snapshots share rows, so each distinct row is rendered once."""
+        key = ("row", row)
+        if key not in self._rendered:
+            self._rendered[key] = " & ".join(self.render(x) or "" for x in row)
+        return self._rendered[key]
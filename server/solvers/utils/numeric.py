@@ -0,0 +1,338 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+import math
+import threading
+
+from server.config import settings
+
+# Richardson table depth for limits: the last sample is 2^-30 away from the point
+_LIMIT_SAMPLES = 30
+# Integrability probes: |x - p|·|f(x)| (or x·|f(x)| toward ±oo) at these two
+# offsets; a value that does not at least halve means f is not integrable there
+_PROBE_NEAR = (1e-6, 1e-12)
+_PROBE_FAR = (1e6, 1e12)
+# Tanh-sinh degree of the coarse pass compared against the full one
+_COARSE_DEGREE = 6
+
+class Estimate(NamedTuple):
+    """A numeric answer with its estimated absolute error."""
+    value: Any  # mpmath mpf or mpc
+    error: float
+    method: str
+    diverged: bool = False  # the integrand is not integrable, or the value grows under refinement
+
+    @property
+    def finite(self) -> bool:
+        return math.isfinite(abs(complex(self.value))) and math.isfinite(self.error)
+
+    @property
+    def converged(self) -> bool:
+        if self.diverged or not self.finite:
+            return False
+        scale = max(1.0, abs(complex(self.value)))
+        return self.error <= settings.NUMERIC_TOLERANCE * scale
+
+    def meta(self) -> Dict[str, Any]:
+        value = complex(self.value)
+        return {
+            "engine": "numeric",
+            "method": self.method,
+            "value": (value.real if value.imag == 0 else [value.real, value.imag]) if self.finite else None,
+            "error": self.error if math.isfinite(self.error) else None,
+            "converged": self.converged,
+            "diverged": self.diverged,
+        }
+
+def numeric_mode(options: Dict, warnings: List[str]) -> str:
+    """
+    Resolve options['numeric']: True ('numeric') skips the symbolic attempt,
+    False ('symbolic') skips the estimate, and 'auto' (the default) computes
+    the estimate first and cuts the symbolic attempt off at
+    Settings.NUMERIC_SYMBOLIC_BUDGET_MS.
+    """
+    value = options.get("numeric", "auto")
+    if value is True or value == "numeric":
+        return "numeric"
+    if value is False or value == "symbolic":
+        return "symbolic"
+    if value != "auto":
+        warnings.append(f"Unknown numeric option '{value}', using auto")
+    return "auto"
+
+_local = threading.local()
+
+def _context():
+    """
+    A private mpmath context per thread: the global mpmath.mp precision is
+    shared by every request in the process, so it is never changed here.
+    """
+    ctx = getattr(_local, "ctx", None)
+    if ctx is None or ctx.dps != settings.NUMERIC_DPS:
+        import mpmath
+        ctx = mpmath.MPContext()
+        ctx.dps = settings.NUMERIC_DPS
+        _local.ctx = ctx
+        # lambdify resolves function names here first, so they evaluate at ctx's precision
+        _local.namespace = {name: getattr(ctx, name) for name in dir(ctx) if not name.startswith("_")}
+    return ctx, _local.namespace
+
+def compile_mpmath(expr: Any, x: Any) -> Optional[Callable]:
+    """expr as a function of x evaluated in the private context; None if it has other free symbols."""
+    from sympy import lambdify
+    if expr.free_symbols - {x}:
+        return None
+    _, namespace = _context()
+    return lambdify(x, expr, modules=[namespace, "mpmath"])
+
+def _to_mp(ctx, value: Any):
+    """A real SymPy number (or ±oo) as an mpf of ctx."""
+    if value.is_infinite:
+        return ctx.inf if value.is_extended_positive else -ctx.inf
+    from sympy import Float
+    return ctx.mpf(Float(value.evalf(ctx.dps), ctx.dps)._mpf_)
+
+def quad_estimate(expr: Any, x: Any, lower: Any, upper: Any) -> Optional[Estimate]:
+    """
+    Tanh-sinh quadrature over [lower, upper], split at interior singularities,
+    with quadosc for sin/cos tails on infinite ranges. The estimate is marked
+    diverged when f is not integrable at a singular point (endpoints
+    included) or toward an infinite bound, or when the value keeps growing
+    as the rule is refined.
+    """
+    f = compile_mpmath(expr, x)
+    if f is None or not (lower.is_extended_real and upper.is_extended_real):
+        return None
+    ctx, _ = _context()
+    singular = _singularities(expr, x, lower, upper)
+    points = [lower] + [p for p in singular if p != lower and p != upper] + [upper]
+    mp_points = [_to_mp(ctx, p) for p in points]
+    infinite = lower.is_infinite or upper.is_infinite
+    omega = _frequency(expr, x) if infinite else 0
+    try:
+        if omega:
+            value, error = _quad_oscillatory(ctx, f, mp_points, omega)
+            method = "tanh-sinh quadrature with quadosc tails"
+        else:
+            value, error = ctx.quad(f, mp_points, error=True)
+            method = "tanh-sinh quadrature"
+        diverged = not ctx.isfinite(value) or _not_integrable(ctx, f, [_to_mp(ctx, p) for p in singular],
+                                                              mp_points[0], mp_points[-1], omega)
+        if not diverged and omega == 0 and (singular or infinite):
+            coarse = ctx.quad(f, mp_points, maxdegree=_COARSE_DEGREE)
+            growth = float(abs(value) - abs(coarse))
+            diverged = growth > max(10 * float(error), 1e-3 * float(abs(coarse)))
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+    error = float(error)
+    if omega is None:
+        # sin/cos of a non-linear argument on an infinite range: tanh-sinh cannot resolve the tail
+        error = max(error, float(abs(value)))
+    return Estimate(value, error, method, diverged)
+
+def _singularities(expr: Any, x: Any, lower: Any, upper: Any) -> List[Any]:
+    """Finite real singularities of expr on the closed interval [lower, upper]."""
+    from sympy import Interval
+    from sympy.calculus.singularities import singularities
+    try:
+        found = singularities(expr, x, Interval(lower, upper))
+    except Exception:
+        return []
+    if not found.is_FiniteSet:
+        return []
+    return sorted(p for p in found if p.is_real and p.is_finite)
+
+def _frequency(expr: Any, x: Any) -> Optional[Any]:
+    """
+    ω when every sin/cos in expr has the argument ω·x + c for one ω; 0 when
+    expr has no sin/cos of x, None when the arguments are not of that form.
+    """
+    from sympy import cos, sin
+    omegas = set()
+    for t in expr.atoms(sin, cos):
+        if not t.has(x):
+            continue
+        poly = t.args[0].as_poly(x)
+        if poly is None or poly.degree() != 1:
+            return None
+        w = poly.coeff_monomial(x)
+        if not (w.is_number and w.is_real):
+            return None
+        omegas.add(abs(w))
+    if len(omegas) > 1:
+        return None
+    return float(omegas.pop()) if omegas else 0
+
+def _quad_oscillatory(ctx, f: Callable, points: List[Any], omega: float):
+    """
+    quadosc over the infinite ends and tanh-sinh over the finite middle. The
+    error compares the tails against a cheaper half-precision pass over whole
+    double periods, since quadosc has no error estimate of its own.
+    """
+    finite = [p for p in points if ctx.isfinite(p)] or [ctx.zero]
+    value, error = ctx.zero, ctx.zero
+    if len(finite) > 1:
+        value, error = ctx.quad(f, finite, error=True)
+    period = 2 * ctx.pi / omega
+    tails = []
+    if ctx.isinf(points[0]):
+        tails.append([-ctx.inf, finite[0]])
+    if ctx.isinf(points[-1]):
+        tails.append([finite[-1], ctx.inf])
+    for interval in tails:
+        tail = ctx.quadosc(f, interval, omega=omega)
+        with ctx.workdps(ctx.dps // 2):
+            error += abs(tail - ctx.quadosc(f, interval, period=2 * period))
+        value += tail
+    return value, error
+
+def _not_integrable(ctx, f: Callable, singular: List[Any], lower: Any, upper: Any, omega: Optional[float]) -> bool:
+    """
+    Probe f next to each singular point and toward infinite bounds: a pole of
+    order ≥ 1 keeps |x - p|·|f| from shrinking, and so does a tail decaying no
+    faster than 1/x. Oscillatory tails need a decaying envelope instead.
+    """
+    def weight(g: Callable, offsets) -> Optional[bool]:
+        try:
+            near, far = (float(abs(g(t))) for t in offsets)
+        except (ArithmeticError, ValueError, TypeError):
+            return None
+        if not (math.isfinite(near) and math.isfinite(far)):
+            return True
+        return near > 0 and far >= near / 2
+
+    for p in singular:
+        for side in (-1, 1):
+            if lower <= p + side * _PROBE_NEAR[0] <= upper:
+                if weight(lambda h: h * f(p + side * h), _PROBE_NEAR):
+                    return True
+    for end, sign in ((lower, -1), (upper, 1)):
+        if ctx.isfinite(end):
+            continue
+        if omega:
+            # max |f| over one period at each distance
+            period = 2 * ctx.pi / omega
+            g = lambda X: max(abs(f(sign * (X + k * period / 8))) for k in range(8))
+        elif omega is None:
+            continue
+        else:
+            g = lambda X: X * f(sign * X)
+        if weight(g, _PROBE_FAR):
+            return True
+    return False
+
+def limit_estimate(expr: Any, x: Any, point: Any) -> Optional[Estimate]:
+    """
+    Richardson extrapolation of f(point + h) (from the right) or f(±1/h) at
+    infinity for h = 2^-1 ... 2^-30. The error is the smallest difference
+    between neighbouring extrapolants of the last two table rows.
+    """
+    f = compile_mpmath(expr, x)
+    if f is None or not point.is_extended_real:
+        return None
+    ctx, _ = _context()
+    x0 = _to_mp(ctx, point)
+    if ctx.isinf(x0):
+        g = lambda h: f(ctx.sign(x0) / h)
+    else:
+        g = lambda h: f(x0 + h)
+    try:
+        previous: List[Any] = []
+        for k in range(1, _LIMIT_SAMPLES + 1):
+            row = [g(ctx.ldexp(1, -k))]
+            for j, prev in enumerate(previous, start=1):
+                row.append(row[j - 1] + (row[j - 1] - prev) / (2 ** j - 1))
+            if k < _LIMIT_SAMPLES:
+                previous = row
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+    best, best_error = row[0], abs(row[0] - previous[0])
+    for j in range(1, len(row)):
+        error = abs(row[j] - previous[j - 1])
+        if error < best_error:
+            best, best_error = row[j], error
+    if not ctx.isfinite(best):
+        return None
+    return Estimate(best, float(best_error), "Richardson extrapolation")
+
+def taylor_coefficients(expr: Any, x: Any, point: Any, n: int) -> Optional[List[Any]]:
+    """First n Taylor coefficients at a finite point by high-precision numerical differentiation."""
+    f = compile_mpmath(expr, x)
+    if f is None or not point.is_real:
+        return None
+    ctx, _ = _context()
+    try:
+        coeffs = ctx.taylor(f, _to_mp(ctx, point), n - 1)
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+    # Differentiation noise far below the working precision is a zero coefficient
+    coeffs = [ctx.chop(c, tol=ctx.mpf(10) ** (-(ctx.dps // 2))) for c in coeffs]
+    # A complex or infinite coefficient means the point is a branch point or pole
+    if not all(ctx.isfinite(c) and ctx.im(c) == 0 for c in coeffs):
+        return None
+    return coeffs
+
+def partial_sums(coeffs: Sequence[Any], point: Any, at: Sequence[float], expr: Any, x: Any) -> Dict[str, Any]:
+    """
+    S_1 ... S_n of the truncated series at every point of `at` in one
+    vectorized pass, with |f - S_n| where f can be evaluated.
+    """
+    import numpy as np
+    from sympy import lambdify
+
+    c = np.array([complex(v) for v in coeffs])
+    t = np.asarray(at, dtype=float) - float(point)
+    powers = t[:, None] ** np.arange(len(c))
+    sums = np.cumsum(powers * c, axis=1)
+    if not np.iscomplexobj(sums) or not sums.imag.any():
+        sums = sums.real
+    out: Dict[str, Any] = {"at": list(at), "partial_sums": sums.tolist()}
+    try:
+        with np.errstate(all="ignore"):
+            exact = np.broadcast_to(lambdify(x, expr, "numpy")(np.asarray(at, dtype=float)), t.shape)
+        out["errors"] = np.abs(sums - exact[:, None]).tolist()
+    except Exception:
+        pass
+    return out
+
+def to_sympy(estimate: Estimate) -> Any:
+    """The estimate as a SymPy number carrying the digits its error supports."""
+    from sympy import Float, I, nan, oo
+    value = complex(estimate.value)
+    if not estimate.finite:
+        if value.imag == 0 and math.isinf(value.real):
+            return oo if value.real > 0 else -oo
+        return nan
+    scale = max(abs(value), 1e-300)
+    digits = 15 if estimate.error == 0 else int(-math.log10(max(estimate.error / scale, 1e-15)))
+    digits = min(15, max(digits, 2))
+    result = Float(value.real, digits)
+    if value.imag:
+        result += I * Float(value.imag, digits)
+    return result
+
+def describe(estimate: Estimate) -> str:
+    note = f"{estimate.method}, estimated error {estimate.error:.1e}"
+    if estimate.diverged:
+        return note + " (diverges)"
+    return note if estimate.converged else note + " (not converged)"
+
+def disagrees(result: Any, estimate: Estimate) -> bool:
+    """
+    True when a numeric symbolic result is outside the estimate's error band,
+    or is finite where the estimate diverged. A merely unconverged estimate
+    never disagrees.
+    """
+    if result.free_symbols or not result.is_number:
+        return False
+    if estimate.diverged:
+        return bool(result.is_finite)
+    if not estimate.converged:
+        return False
+    try:
+        value = complex(result.evalf(settings.NUMERIC_DPS))
+    except (TypeError, ValueError, OverflowError):
+        return False
+    # The estimate's own error widens the band only as far as a converged estimate allows,
+    # so a poor estimate cannot make every symbolic result look right
+    scale = max(1.0, abs(value))
+    tolerance = 10 * min(estimate.error, settings.NUMERIC_TOLERANCE * scale) + settings.NUMERIC_TOLERANCE * scale
+    return abs(value - complex(estimate.value)) > tolerance
@@ -1,30 +1,172 @@
-from typing import Tuple, Any, List
+from collections import OrderedDict
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Tuple, Any, Dict, List, Optional
+import ast
 import re
+import threading
+import time
 
-def parse_query(subject: str, query: str, options: dict) -> Tuple[Any, List[str]]:
+from server.config import settings
+from .intern import intern_expr
+
+_LOGIC_NAME = re.compile(r"\b([A-Za-z]\w*)\b(?!\s*\()")
+
+_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, Optional[str], str], Tuple[Any, Tuple[str, ...]]]" = OrderedDict()
+_counters = {"cache_hits": 0, "cache_misses": 0}
+_stages: Dict[str, Dict[str, float]] = {}
+
+@lru_cache(maxsize=None)
+def _parsers() -> Optional[SimpleNamespace]:
+    """Import SymPy parsing entry points once per process."""
+    try:
+        from sympy import Matrix, Symbol, sympify
+        from sympy.parsing.sympy_parser import parse_expr, standard_transformations, convert_xor
+    except ImportError:
+        return None
+    try:
+        from sympy.parsing.latex import parse_latex
+    except ImportError:
+        parse_latex = None
+    return SimpleNamespace(
+        Matrix=Matrix,
+        Symbol=Symbol,
+        sympify=sympify,
+        parse_expr=parse_expr,
+        parse_latex=parse_latex,
+        transformations=standard_transformations,
+        xor_transformations=standard_transformations + (convert_xor,),
+    )
+
+def warm_parsers() -> None:
+    """Build the plain and LaTeX parsers ahead of the first request."""
+    p = _parsers()
+    if p is None:
+        return
+    p.parse_expr("x", evaluate=False)
+    if p.parse_latex is not None:
+        try:
+            p.parse_latex("x")
+        except Exception:
+            pass  # ANTLR runtime missing; LaTeX queries will report a warning
+
+def _record(stage: str, t0: float, ok: bool) -> None:
+    ms = (time.perf_counter() - t0) * 1000
+    with _lock:
+        s = _stages.setdefault(stage, {"calls": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0})
+        s["calls"] += 1
+        s["failures"] += 0 if ok else 1
+        s["total_ms"] += ms
+        s["max_ms"] = max(s["max_ms"], ms)
+
+def parse_stats() -> Dict[str, Any]:
+    """Cache counters and per-stage timing for the parsers."""
+    with _lock:
+        stages = {
+            name: {**s, "total_ms": round(s["total_ms"], 3), "max_ms": round(s["max_ms"], 3),
+                   "mean_ms": round(s["total_ms"] / s["calls"], 3) if s["calls"] else 0.0}
+            for name, s in _stages.items()
+        }
+        return {**_counters, "entries": len(_cache), "stages": stages}
+
+def _copy(expr: Any) -> Any:
+    # Matrices are mutable; everything else SymPy hands back is immutable
+    return expr.copy() if getattr(expr, "is_Matrix", False) else expr
+
+def parse_query(subject: str, query: str, options: dict, fmt: Optional[str] = None) -> Tuple[Any, List[str]]:
     """
     Parse query into SymPy expression.
+    `fmt` is the input format from classify_query; when given, only that
+    parser runs instead of the sniff-and-fall-through chain.
     Returns (expr_or_struct, warnings)
     """
+    q = " ".join(query.split())
+    key = (subject, fmt, q)
+
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            _counters["cache_hits"] += 1
+        else:
+            _counters["cache_misses"] += 1
+    if hit is not None:
+        expr, warnings = hit
+        return _copy(expr), list(warnings)
+
+    if fmt is None:
+        expr, warnings = _parse_uncached(subject, q)
+    else:
+        expr, warnings = _parse_routed(subject, q, fmt)
+
+    # Cached trees share their repeated subexpressions with every other cached query
+    expr = intern_expr(expr)
+    with _lock:
+        _cache[key] = (_copy(expr), tuple(warnings))
+        while len(_cache) > settings.PARSE_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return expr, warnings
+
+def _parse_routed(subject: str, q: str, fmt: str) -> Tuple[Any, List[str]]:
+    """Run the single parser for a classified format; failures return the raw text."""
     warnings: List[str] = []
-    q = query.strip()
 
-    # Import SymPy components
+    p = _parsers()
+    if p is None:
+        warnings.append("SymPy import error: sympy is not installed")
+        return q, warnings
+
+    # Equations, combinatorics and recurrences are interpreted by their solvers
+    if fmt in ("equation", "combinatorics", "recurrence"):
+        return q, warnings
+
+    t0 = time.perf_counter()
     try:
-        from sympy import symbols, Matrix, sympify
-        from sympy.parsing.sympy_parser import parse_expr
-        from sympy.parsing.latex import parse_latex
-    except ImportError as e:
-        warnings.append(f"SymPy import error: {e}")
+        if fmt == "matrix":
+            try:
+                data = ast.literal_eval(q)
+            except (ValueError, SyntaxError):
+                # Symbolic entries such as [[a, 1], [0, a]]
+                data = p.parse_expr(q, transformations=p.xor_transformations)
+            expr = p.Matrix(data)
+        elif fmt == "latex":
+            if p.parse_latex is None:
+                raise ImportError("LaTeX parser unavailable")
+            expr = p.parse_latex(q)
+        elif fmt == "logic":
+            # Every bare name is a proposition, including E, I, S and N which SymPy predefines
+            names = {name for name in _LOGIC_NAME.findall(q) if name not in ("True", "False")}
+            expr = p.parse_expr(q, local_dict={name: p.Symbol(name) for name in names},
+                                transformations=p.transformations)
+        else:
+            transformations = p.transformations if subject == "discrete" else p.xor_transformations
+            expr = p.parse_expr(q, evaluate=False, transformations=transformations)
+        _record(fmt, t0, True)
+        return expr, warnings
+    except Exception as e:
+        _record(fmt, t0, False)
+        warnings.append(f"{fmt.capitalize()} parse warning: {e}")
+        return q, warnings
+
+def _parse_uncached(subject: str, q: str) -> Tuple[Any, List[str]]:
+    warnings: List[str] = []
+
+    p = _parsers()
+    if p is None:
+        warnings.append("SymPy import error: sympy is not installed")
         return q, warnings
 
     # Matrix quick handling (CSV-like or list notation)
     if subject == "la" and (q.startswith("[[") or (q.startswith("[") and "]," in q)):
+        t0 = time.perf_counter()
         try:
-            import ast
             data = ast.literal_eval(q)
-            return Matrix(data), warnings
+            expr = p.Matrix(data)
+            _record("matrix", t0, True)
+            return expr, warnings
         except Exception as e:
+            _record("matrix", t0, False)
             warnings.append(f"Matrix parse warning: {e}")
 
     # Try LaTeX parsing
@@ -32,21 +174,34 @@ def parse_query(subject: str, query: str, options: dict) -> Tuple[Any, List[str]
         "\\frac", "\\int", "\\sum", "\\begin{bmatrix}", "\\left", "\\right",
         "\\log", "\\sin", "\\cos", "\\lim", "\\sqrt", "\\partial"
     ]):
+        t0 = time.perf_counter()
         try:
-            expr = parse_latex(q)
+            if p.parse_latex is None:
+                raise ImportError("LaTeX parser unavailable")
+            expr = p.parse_latex(q)
+            _record("latex", t0, True)
             return expr, warnings
         except Exception as e:
+            _record("latex", t0, False)
             warnings.append(f"LaTeX parse warning: {e}")
 
-    # Fallback plain parser
+    # Fallback plain parser; outside discrete logic "^" means exponentiation,
+    # so "x^2" and "x**2" produce the same tree.
+    transformations = p.transformations if subject == "discrete" else p.xor_transformations
+    t0 = time.perf_counter()
     try:
-        expr = parse_expr(q, evaluate=False)
+        expr = p.parse_expr(q, evaluate=False, transformations=transformations)
+        _record("plain", t0, True)
         return expr, warnings
     except Exception as e:
+        _record("plain", t0, False)
         warnings.append(f"Plain parse warning: {e}")
         # Try sympify as last resort
+        t0 = time.perf_counter()
         try:
-            expr = sympify(q)
+            expr = p.sympify(q)
+            _record("sympify", t0, True)
             return expr, warnings
         except Exception:
+            _record("sympify", t0, False)
             return q, warnings  # Return raw string
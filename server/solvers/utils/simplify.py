@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Tuple
+import time
+
+from server.config import settings
+from .budget import BudgetExceeded, can_interrupt, deadline_passed, time_budget
+from .trace import span
+
+CHEAP_PASSES = ("cancel", "together", "trigsimp", "powsimp", "factor_terms")
+
+def budgeted_simplify(expr: Any, budget_ms: Optional[float] = None) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Tiered replacement for sympy.simplify.
+    Cheap passes run first and are kept only when they shrink count_ops.
+    Full simplify then runs on the original expression only while budget
+    remains, the expression is below Settings.SIMPLIFY_MAX_OPS and the
+    budget can interrupt it (see budget.can_interrupt); its
+    canonical form wins unless it is larger than the input. Returns
+    (result, meta) where meta lists each pass with its timing and size.
+    """
+    with span("simplify") as s:
+        result, meta = _run_passes(expr, budget_ms)
+        if s is not None:
+            s.meta.update(ops_before=meta["ops_before"], ops_after=meta["ops_after"])
+    return result, meta
+
+def _run_passes(expr: Any, budget_ms: Optional[float]) -> Tuple[Any, Dict[str, Any]]:
+    import sympy
+    
+    budget = float(settings.SIMPLIFY_BUDGET_MS if budget_ms is None else budget_ms)
+    start = time.perf_counter()
+    
+    def elapsed_ms() -> float:
+        return (time.perf_counter() - start) * 1000
+    
+    best = expr
+    ops_before = best_ops = sympy.count_ops(expr)
+    passes: List[Dict[str, Any]] = []
+    
+    def run(name: str, fn) -> None:
+        nonlocal best, best_ops
+        t0 = time.perf_counter()
+        try:
+            candidate = fn(expr if name == "simplify" else best)
+        except BudgetExceeded:
+            passes.append({"pass": name, "ms": round((time.perf_counter() - t0) * 1000, 3), "aborted": "budget"})
+            return
+        except Exception as e:
+            passes.append({"pass": name, "ms": round((time.perf_counter() - t0) * 1000, 3), "error": str(e)})
+            return
+        ops = sympy.count_ops(candidate)
+        if name == "simplify":
+            accepted = ops <= ops_before
+        else:
+            accepted = ops < best_ops
+        passes.append({"pass": name, "ms": round((time.perf_counter() - t0) * 1000, 3), "ops": int(ops), "accepted": accepted})
+        if accepted:
+            best, best_ops = candidate, ops
+    
+    for name in CHEAP_PASSES:
+        remaining = budget - elapsed_ms()
+        if remaining <= 0:
+            passes.append({"pass": name, "skipped": "budget"})
+            continue
+        # A single cheap pass (cancel on a large derivative) can also run for seconds
+        try:
+            with time_budget(remaining / 1000):
+                run(name, getattr(sympy, name))
+        except BudgetExceeded:
+            if deadline_passed():
+                raise
+            passes.append({"pass": name, "aborted": "budget"})
+    
+    remaining = budget - elapsed_ms()
+    if remaining <= 0:
+        passes.append({"pass": "simplify", "skipped": "budget"})
+    elif best_ops > settings.SIMPLIFY_MAX_OPS:
+        passes.append({"pass": "simplify", "skipped": "size"})
+    elif best_ops <= 1:
+        passes.append({"pass": "simplify", "skipped": "trivial"})
+    elif not can_interrupt():
+        # Outside a solver worker the budget is only checked between passes, and
+        # one simplify call can overrun it by far
+        passes.append({"pass": "simplify", "skipped": "uninterruptible"})
+    else:
+        try:
+            with time_budget(remaining / 1000):
+                run("simplify", sympy.simplify)
+        except BudgetExceeded:
+            if deadline_passed():
+                raise
+            passes.append({"pass": "simplify", "aborted": "budget"})
+    
+    meta = {
+        "passes": passes,
+        "ops_before": int(ops_before),
+        "ops_after": int(best_ops),
+        "budget_ms": budget,
+        "elapsed_ms": round(elapsed_ms(), 3),
+    }
+    return best, meta
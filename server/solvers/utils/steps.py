@@ -1,11 +1,31 @@
-from typing import Optional, Dict, Any, List
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional, Dict, Any, List
 from server.schemas import Step
+from .intern import Interner, shared
+from .latex import LatexMemo
+from .trace import span
+
+# Receives each Step as soon as it is logged (used by streaming solves)
+_step_sink: ContextVar[Optional[Callable[[Step], None]]] = ContextVar("step_sink", default=None)
+
+@contextmanager
+def stream_steps(callback: Optional[Callable[[Step], None]]):
+    """Deliver every step logged in this context to `callback` as it is added."""
+    token = _step_sink.set(callback)
+    try:
+        yield
+    finally:
+        _step_sink.reset(token)
 
 class StepLogger:
     def __init__(self, max_steps: int = 200):
         self.steps: List[Step] = []
         self.idx = 1
         self.max_steps = max_steps
+        self.latex = LatexMemo()
+        # Consecutive steps rewrite small parts of the same tree; keep one copy of the rest
+        self.interner = Interner(parent=shared)
 
     def add(
         self,
@@ -18,17 +38,21 @@ class StepLogger:
         if len(self.steps) >= self.max_steps:
             return
         
-        from .latex import to_latex
-        
-        self.steps.append(Step(
-            index=self.idx,
-            rule=rule,
-            before_latex=to_latex(before) if before is not None else None,
-            after_latex=to_latex(after) if after is not None else None,
-            note=note,
-            meta=meta or {}
-        ))
-        self.idx += 1
+        with span("step", rule=rule):
+            # LaTeX is rendered when the step is serialized, once per distinct expression
+            step = Step(
+                index=self.idx,
+                rule=rule,
+                note=note,
+                meta=meta or {}
+            )
+            step.attach_exprs(self.interner.intern(before), self.interner.intern(after), self.latex)
+            self.steps.append(step)
+            self.idx += 1
+            
+            sink = _step_sink.get()
+            if sink is not None:
+                sink(step)
 
     def get_steps(self) -> List[Step]:
         return self.steps
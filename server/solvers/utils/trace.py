@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import time
+
+class Span:
+    """One timed stage; children are the stages that ran inside it."""
+    __slots__ = ("name", "start", "end", "meta", "children")
+
+    def __init__(self, name: str, meta: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.meta = meta or {}
+        self.children: List["Span"] = []
+
+    @property
+    def ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name, "ms": round(self.ms, 3)}
+        if self.meta:
+            out["meta"] = self.meta
+        if self.children:
+            out["children"] = [c.to_dict() for c in self.children]
+        return out
+
+# Innermost open span of the current request; None when nothing is being traced
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+@contextmanager
+def tracing(name: str = "request") -> Iterator[Span]:
+    """Start a trace rooted at a new span; spans opened inside attach to it."""
+    root = Span(name)
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        _current.reset(token)
+
+@contextmanager
+def span(name: str, **meta: Any) -> Iterator[Optional[Span]]:
+    """Time a stage under the current span. A no-op outside `tracing()`."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(name, meta)
+    parent.children.append(s)
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def graft(tree: Dict[str, Any]) -> None:
+    """Attach a span tree recorded elsewhere (a solver worker) under the current span."""
+    parent = _current.get()
+    if parent is None or not tree:
+        return
+    parent.children.append(_from_dict(tree, parent.end or time.perf_counter()))
+
+def _from_dict(tree: Dict[str, Any], end: float) -> Span:
+    # Only durations cross the process boundary; rebuild them relative to `end`
+    s = Span(tree["name"], tree.get("meta"))
+    s.end = end
+    s.start = end - tree["ms"] / 1000
+    s.children = [_from_dict(c, end) for c in tree.get("children", [])]
+    return s
+
+def walk(root: Span) -> Iterator[Span]:
+    """Every span in the tree, depth-first."""
+    stack = [root]
+    while stack:
+        s = stack.pop()
+        yield s
+        stack.extend(reversed(s.children))
+
+def cprofile_requested(options: Dict[str, Any]) -> bool:
+    """options.profile is true for the span tree, "cprofile" to also profile the solver call."""
+    return options.get("profile") == "cprofile"
+
+@contextmanager
+def call_profile(enabled: bool, top: int = 25) -> Iterator[Dict[str, Any]]:
+    """
+    Run the block under cProfile when `enabled` and fill the yielded dict
+    with the `top` calls by cumulative time.
+    """
+    out: Dict[str, Any] = {}
+    if not enabled:
+        yield out
+        return
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield out
+    finally:
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({
+                "function": f"{filename}:{line}({func})",
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            })
+        rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+        out["calls"] = rows[:top]
+        out["total_calls"] = stats.total_calls
@@ -0,0 +1,174 @@
+"""
+Startup warm-up: import the SymPy submodules the solvers load lazily, build
+the parsers, and run one small query per mode so the first real request of
+a fresh process does not pay for them.
+"""
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from server.schemas import SolveResponse
+
+# Submodules pulled in on first use by a solver or the LaTeX/plain parsers
+PRELOAD_MODULES = (
+    "sympy",
+    "sympy.parsing.sympy_parser",
+    "sympy.parsing.latex",
+    "sympy.printing.latex",
+    "sympy.simplify",
+    "sympy.integrals.manualintegrate",
+    "sympy.integrals.risch",
+    "sympy.series",
+    "sympy.solvers.ode",
+    "sympy.solvers.recurr",
+    "sympy.matrices",
+    "sympy.logic.boolalg",
+    "sympy.polys.polyroots",
+    "sympy.utilities.lambdify",
+    "numpy",
+)
+
+# (subject, query, mode, options): one cheap case per dispatch path
+WARMUP_CORPUS: List[Tuple[str, str, str, Dict[str, Any]]] = [
+    ("calc1", "x^2 * sin(x)", "derivative", {}),
+    ("calc1", "\\frac{d}{dx} x^2", "auto", {}),
+    ("calc2", "x * exp(x)", "integral", {}),
+    ("calc1", "sin(x)/x", "limit", {"point": 0}),
+    ("calc2", "exp(x)", "series", {"n": 4}),
+    ("calc2", "Derivative(y(x), x) - y(x)", "ode", {}),
+    ("calc2", "x^2 - 1", "integral", {"definite": True, "lower": 0, "upper": 2}),
+    ("la", "[[1,2],[3,4]]", "rref", {}),
+    ("la", "[[2,1],[1,2]]", "eigen", {}),
+    ("la", "[[1,2],[3,4]]", "det", {}),
+    ("la", "[[1,2],[2,4]]", "nullspace", {}),
+    ("discrete", "!(A & B)", "logic", {}),
+    ("discrete", "C(10, 3)", "combinatorics", {}),
+    ("discrete", "a(n) = a(n-1) + a(n-2), a(0) = 0, a(1) = 1", "recurrence", {}),
+]
+
+def preload_modules(modules=PRELOAD_MODULES) -> Tuple[Dict[str, float], List[str]]:
+    """Import each module, returning per-module milliseconds and any import errors."""
+    timings: Dict[str, float] = {}
+    errors: List[str] = []
+    for name in modules:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            continue
+        timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+    return timings, errors
+
+def run_corpus(
+    dispatch: Optional[Callable[..., SolveResponse]] = None,
+    corpus=WARMUP_CORPUS
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Classify and parse every corpus query, and solve it when `dispatch` is
+    given. Returns per-case timings and errors; a failing case never raises.
+    """
+    from server.solvers.utils.classify import classify_query
+    from server.solvers.utils.parse import parse_query
+
+    cases: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    for subject, query, mode, options in corpus:
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            qc = classify_query(subject, query, mode)
+            expr, _ = parse_query(subject, qc.query, options, fmt=qc.format)
+            if dispatch is not None:
+                resp = dispatch(subject, expr, qc.mode, options)
+                # A solver can report errors and still return ok
+                ok = resp.ok and not resp.errors
+                if not ok:
+                    errors.append(f"{qc.mode}: {'; '.join(resp.errors)}")
+        except Exception as e:
+            ok = False
+            errors.append(f"{mode}: {e}")
+        cases.append({"mode": mode, "ms": round((time.perf_counter() - t0) * 1000, 1), "ok": ok})
+    return cases, errors
+
+def warm_up(dispatch: Optional[Callable[..., SolveResponse]] = None) -> Dict[str, Any]:
+    """Preload modules and parsers, then run the corpus; returns the timing report."""
+    from server.solvers.utils.parse import warm_parsers
+
+    t0 = time.perf_counter()
+    imports, errors = preload_modules()
+    t1 = time.perf_counter()
+    warm_parsers()
+    t2 = time.perf_counter()
+    cases, corpus_errors = run_corpus(dispatch)
+    t3 = time.perf_counter()
+    return {
+        "imports": imports,
+        "preload_ms": round((t1 - t0) * 1000, 1),
+        "parsers_ms": round((t2 - t1) * 1000, 1),
+        "corpus": cases,
+        "corpus_ms": round((t3 - t2) * 1000, 1),
+        "total_ms": round((t3 - t0) * 1000, 1),
+        "errors": errors + corpus_errors,
+    }
+
+class Startup:
+    """
+    Runs the warm-up in a background thread so the server can answer
+    /health (as not ready) while it is in progress.
+    """
+
+    def __init__(self):
+        self.status = "pending"  # pending | warming | ready
+        self.report: Dict[str, Any] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def start(self, steps: List[Tuple[str, Callable[[], Optional[Dict[str, Any]]]]]) -> None:
+        """
+        Run the independent (name, fn) steps concurrently (worker processes warm
+        up while this one does); a dict returned by fn is merged into the report.
+        """
+        self.status = "warming"
+        self._thread = threading.Thread(target=self._run, args=(steps,), name="warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def _run(self, steps) -> None:
+        t0 = time.perf_counter()
+        errors: List[str] = []
+        lock = threading.Lock()
+
+        def run_step(name: str, fn: Callable[[], Optional[Dict[str, Any]]]) -> None:
+            t = time.perf_counter()
+            try:
+                out = fn() or {}
+            except Exception as e:
+                # A failed warm-up step leaves that path cold; it must not keep the server unready
+                out = {"errors": [f"{name}: {e}"]}
+            with lock:
+                errors.extend(out.pop("errors", []))
+                self.report.update(out)
+                self.report[f"{name}_step_ms"] = round((time.perf_counter() - t) * 1000, 1)
+
+        threads = [threading.Thread(target=run_step, args=step, daemon=True) for step in steps[1:]]
+        for t in threads:
+            t.start()
+        if steps:
+            run_step(*steps[0])
+        for t in threads:
+            t.join()
+        self.report["startup_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        self.report["errors"] = errors
+        self.status = "ready"
+
+    def stats(self) -> Dict[str, Any]:
+        return {"status": self.status, **self.report}
@@ -84,6 +84,47 @@ export interface SolveResponse {
   warnings: string[];
   errors?: string[];
   elapsed_ms?: number;
+  timed_out?: boolean;
+  profile?: ProfileSpan | null;
+  result_srepr?: string | null;
+}
+
+// Span tree returned when options.profile is set
+export interface ProfileSpan {
+  name: string;
+  ms: number;
+  meta?: Record<string, any>;
+  children?: ProfileSpan[];
+}
+
+// Sample request: an expression, or the final result of a solve, over [x_min, x_max]
+export interface SampleRequest {
+  query?: string;
+  solve?: SolveRequest;
+  subject?: SubjectKey;
+  var?: string;
+  x_min: number;
+  x_max: number;
+  points?: number;
+  max_points?: number;
+  refine?: boolean;
+  params?: Record<string, number>;
+  encoding?: "json" | "delta" | "binary";
+  digits?: number;
+}
+
+// Sample response; `data` layout depends on `encoding`
+export interface SampleResponse {
+  ok: boolean;
+  expr_latex?: string | null;
+  encoding: "json" | "delta" | "binary";
+  count: number;
+  data: Record<string, any>;
+  breaks: number[];
+  cached: boolean;
+  warnings: string[];
+  errors?: string[];
+  elapsed_ms?: number;
 }
 
 // OCR response
@@ -110,6 +151,7 @@ export interface Example {
   title: string;
   query: string;
   mode: SolverMode;
+  options?: Record<string, any>;
   description?: string;
 }
 
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from server.admission import AdmissionController, AdmissionRejected
+
+def controller(limit=1, queue=0, timeout=0.05):
+    return AdmissionController({}, {"standard": limit}, {"standard": queue}, queue_timeout=timeout)
+
+def test_acquire_release_is_idempotent():
+    async def run():
+        admission = controller()
+        release = await admission.acquire("derivative")
+        with pytest.raises(AdmissionRejected) as e:
+            await admission.acquire("derivative")
+        assert e.value.status_code == 429
+        release()
+        release()
+        stats = admission.stats()["standard"]
+        assert stats["active"] == 0 and stats["rejected"] == 1
+        async with admission.slot("derivative"):
+            assert admission.stats()["standard"]["active"] == 1
+    asyncio.run(run())
+
+def test_queue_timeout_is_503():
+    async def run():
+        admission = controller(queue=1)
+        release = await admission.acquire("integral")
+        with pytest.raises(AdmissionRejected) as e:
+            await admission.acquire("integral")
+        assert e.value.status_code == 503 and e.value.retry_after >= 1
+        release()
+    asyncio.run(run())
@@ -0,0 +1,166 @@
+import random
+
+import pytest
+import sympy
+from sympy import ITE, And, Equivalent, Implies, Nand, Nor, Not, Or, Xor, false, latex, symbols, true
+from sympy.logic.boolalg import Xnor
+from sympy.logic.inference import satisfiable
+
+from server.solvers.discrete import simplify_logic
+from server.solvers.utils.classify import classify_query
+from server.solvers.utils.parse import parse_query
+from server.solvers.utils.boolean import BDD, TruthTable, literal_count, variables_of
+
+A, B, C, D, E = symbols("A B C D E")
+P, Q, R = symbols("p q r")
+
+FORMULAS = [
+    A,
+    ~A,
+    A & B,
+    A | B,
+    (A & B) | (A & ~B),
+    (A | B) & (~A | C) & (B | C),
+    Xor(A, B, C),
+    Xnor(A, B),
+    Implies(A, B) & Implies(B, C),
+    Equivalent(A, B, C),
+    ITE(A, B, C),
+    Nand(A, B) | Nor(C, D),
+    (A & B & C) | (~A & ~B & ~C) | (A & ~C),
+    Xor(A & B, C | D, E),
+]
+
+def random_formula(rng, names, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(names)
+    op = rng.choice([And, Or, Xor, Implies, Equivalent, Nand, Nor, Not, ITE])
+    if op is Not:
+        return Not(random_formula(rng, names, depth - 1))
+    arity = 3 if op is ITE else (2 if op is Implies else rng.randint(2, 3))
+    return op(*[random_formula(rng, names, depth - 1) for _ in range(arity)])
+
+rng = random.Random(7)
+FORMULAS += [random_formula(rng, [A, B, C, D, E], 4) for _ in range(30)]
+
+def rows(names):
+    """Assignments in TruthTable row order."""
+    n = len(names)
+    return [{v: bool((r >> (n - 1 - j)) & 1) for j, v in enumerate(names)} for r in range(1 << n)]
+
+def equivalent(f, g):
+    return satisfiable(Xor(f, g)) is False
+
+@pytest.mark.parametrize("expr", FORMULAS, ids=str)
+def test_truth_table(expr):
+    names = variables_of(expr)
+    tt = TruthTable(names)
+    table = tt.evaluate(expr)
+    expected = "".join("1" if expr.subs(row) is true else "0" for row in rows(names))
+    assert tt.bits(table) == expected
+    assert tt.count(table) == expected.count("1")
+
+@pytest.mark.parametrize("expr", FORMULAS, ids=str)
+def test_bdd(expr):
+    names = variables_of(expr)
+    bdd = BDD(names)
+    root = bdd.build(expr)
+    models = [m for m in satisfiable(expr, all_models=True) if m] if expr not in (true, false) else []
+    # Models leave out variables that do not matter; each stands for 2^missing rows
+    assert bdd.sat_count(root) == sum(1 << (len(names) - len(m)) for m in models)
+    assert (root == 0) == (satisfiable(expr) is False)
+    assert (root == 1) == (satisfiable(~expr) is False)
+    example = bdd.any_sat(root)
+    if example is not None:
+        assert expr.subs({v: example.get(v, False) for v in names}) is true
+    # Equivalent formulas build the same node
+    assert bdd.build(expr.simplify()) == root
+
+@pytest.mark.parametrize("expr", FORMULAS, ids=str)
+def test_isop(expr):
+    names = variables_of(expr)
+    bdd = BDD(names)
+    root = bdd.build(expr)
+    for f, to_expr, target in ((root, bdd.to_dnf, expr), (bdd.neg(root), bdd.to_cnf, expr)):
+        cubes, cover = bdd.isop(f, f)
+        assert cover == f
+        assert equivalent(to_expr(cubes), target)
+        # Irredundant: no cube can be dropped
+        for i in range(len(cubes)):
+            assert bdd.build(bdd.to_dnf(cubes[:i] + cubes[i + 1:])) != f
+        # Prime: no literal can be dropped from a cube
+        for c in cubes:
+            for i in range(len(c)):
+                shorter = bdd.build(bdd.to_dnf([c[:i] + c[i + 1:]]))
+                assert bdd.conj(shorter, bdd.neg(f)) != 0
+
+@pytest.mark.parametrize("expr", FORMULAS, ids=str)
+def test_isop_matches_sympy_minimum(expr):
+    from sympy import simplify_logic as sympy_simplify_logic
+
+    bdd = BDD(variables_of(expr))
+    root = bdd.build(expr)
+    cubes, _ = bdd.isop(root, root)
+    minimal = sympy_simplify_logic(expr, form="dnf", force=True)
+    literals = 0 if minimal in (true, false) else sum(len(And.make_args(t)) for t in Or.make_args(minimal))
+    # ISOP is not minimal in general, but it is on every formula here
+    assert literal_count(cubes) == literals
+
+@pytest.mark.parametrize("expr, result", [
+    (Or(A, ~A, evaluate=False), true),
+    (And(A, ~A, evaluate=False), false),
+    ((A & B) | (A & ~B), A),
+    (Implies(A, B) & A, A & B),
+    (Xor(A, B), (A & ~B) | (B & ~A)),
+])
+def test_simplify_logic(expr, result):
+    resp = simplify_logic(expr, {})
+    assert resp.ok
+    assert resp.steps[-1].rule in ("Tautology", "Contradiction", "Simplified")
+    assert resp.result_latex == latex(result)
+
+@pytest.mark.parametrize("form", ["dnf", "cnf"])
+def test_form_option(form):
+    expr = (A | B) & (~A | C)
+    resp = simplify_logic(expr, {"form": form})
+    assert resp.ok
+    rules = [s.rule for s in resp.steps]
+    assert ("Disjunctive normal form" in rules) == (form == "dnf")
+    assert ("Conjunctive normal form" in rules) == (form == "cnf")
+
+def test_rejects_non_boolean():
+    assert not simplify_logic(A + 1, {}).ok
+
+@pytest.mark.parametrize("query, expected", [
+    ("p ^ q", Xor(P, Q)),
+    ("p -> q", Implies(P, Q)),
+    ("a XOR b", Xor(*symbols("a b"))),
+    ("p xor q | r", Xor(P, Q) | R),
+    ("p & q -> r", Implies(P & Q, R)),
+    ("p -> q -> r", Implies(P, Implies(Q, R))),
+    ("(p -> q) <-> (~q -> ~p)", true),
+    ("p <=> q => r", Equivalent(P, Implies(Q, R))),
+])
+def test_logic_queries(query, expected):
+    from sympy import simplify_logic as sympy_simplify_logic
+
+    qc = classify_query("discrete", query)
+    assert qc.format == "logic"
+    expr, warnings = parse_query("discrete", qc.query, {}, qc.format)
+    assert not warnings and equivalent(expr, expected)
+    resp = simplify_logic(expr, {})
+    assert resp.ok
+    result = resp.steps[-1]._after
+    minimal = sympy_simplify_logic(expected)
+    assert equivalent(result, minimal)
+    assert sympy.count_ops(result) == sympy.count_ops(minimal)
+
+def test_rejects_malformed_not():
+    # What the plain parser used to build for "p ^ q"
+    malformed = Not(P, Q, evaluate=False)
+    assert len(malformed.args) == 2
+    with pytest.raises(ValueError):
+        TruthTable([P, Q]).evaluate(malformed)
+    with pytest.raises(ValueError):
+        BDD([P, Q]).build(malformed)
+    assert not simplify_logic(malformed, {}).ok
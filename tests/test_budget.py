@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+from sympy import sin, symbols
+
+from server.solvers.calculus import do_derivative
+from server.solvers.utils import budget
+from server.solvers.utils.budget import BudgetExceeded, can_interrupt, deadline_passed, time_budget
+from server.solvers.utils.simplify import budgeted_simplify
+
+x = symbols("x")
+
+def in_thread(fn):
+    out = {}
+    def target():
+        try:
+            out["value"] = fn()
+        except BaseException as e:
+            out["error"] = e
+    t = threading.Thread(target=target)
+    t.start()
+    t.join()
+    return out
+
+def test_cooperative_outside_workers():
+    def run():
+        finished = seen = False
+        try:
+            with time_budget(0.05):
+                time.sleep(0.1)
+                seen = deadline_passed()
+                finished = True
+        except BudgetExceeded:
+            return can_interrupt(), finished, seen
+    # Never interrupted mid-block: the overrun surfaces when the block exits
+    assert in_thread(run)["value"] == (False, True, True)
+
+def test_interrupts_in_worker(monkeypatch):
+    monkeypatch.setattr(budget, "_interrupts", True)
+    assert can_interrupt()
+    t0 = time.monotonic()
+    with pytest.raises(BudgetExceeded):
+        with time_budget(0.05):
+            while time.monotonic() - t0 < 5:
+                pass
+    assert time.monotonic() - t0 < 1
+
+def test_simplify_skips_uninterruptible_pass():
+    result, meta = in_thread(lambda: budgeted_simplify(sin(x)**2 + sin(x)**2 * x))["value"]
+    assert {"pass": "simplify", "skipped": "uninterruptible"} in meta["passes"]
+
+def test_simplify_always_logged():
+    resp = do_derivative(x**2, {})
+    step = resp.steps[-1]
+    assert step.rule == "Simplify" and step.note == "No simpler form found"
+    assert "passes" in step.meta
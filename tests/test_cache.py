@@ -0,0 +1,37 @@
+from sympy import Symbol
+
+from server.cache import ResultCache, canonical_key, flight_key
+from server.schemas import SolveResponse, Step
+
+x = Symbol("x")
+
+def response(latex=True, srepr=False):
+    step = Step(index=0, rule="Power rule", before_latex="x^{2}" if latex else None,
+                after_latex="2 x" if latex else None)
+    return SolveResponse(ok=True, result_latex="2 x", steps=[step],
+                         result_srepr="Mul(Integer(2), Symbol('x'))" if srepr else None)
+
+def test_key_ignores_presentation_options():
+    key = canonical_key("calc1", "derivative", {"var": "x"}, x**2)
+    shown = {"var": "x", "profile": True, "step_latex": False, "result_srepr": True}
+    assert canonical_key("calc1", "derivative", shown, x**2) == key
+    assert canonical_key("calc1", "derivative", {"var": "y"}, x**2) != key
+    assert flight_key(key, {"var": "x"}) == key
+    assert flight_key(key, shown) != key
+
+def test_presentation_served_from_one_entry():
+    cache = ResultCache()
+    key = canonical_key("calc1", "derivative", {}, x**2)
+    cache.put(key, response())
+    plain = cache.get(key, {"step_latex": False})
+    assert plain.steps[0].before_latex is None and plain.steps[0].after_latex is None
+    assert cache.get(key).steps[0].after_latex == "2 x"
+    # The entry has no srepr to give
+    assert cache.get(key, {"result_srepr": True}) is None
+    cache.put(key, response(srepr=True), {"result_srepr": True})
+    assert cache.get(key, {"result_srepr": True}).result_srepr is not None
+    assert cache.get(key).result_srepr is None
+    # A poorer response does not replace a richer entry
+    cache.put(key, response(latex=False), {"step_latex": False})
+    assert cache.get(key).steps[0].before_latex == "x^{2}"
+    assert cache.stats()["hits"] == 5 and cache.stats()["misses"] == 1
@@ -0,0 +1,48 @@
+import pytest
+
+from server.solvers.utils.classify import InvalidQuery, classify_query
+
+@pytest.mark.parametrize("subject, query, fmt", [
+    ("calc1", "\\frac{1}{x}", "latex"),
+    ("calc1", "x^{2}", "latex"),
+    ("calc1", "x_{1}^{2} + 3", "latex"),
+    ("calc1", "x^2 + 3*x", "plain"),
+    ("calc1", "x^2 = 4", "equation"),
+    ("la", "[[1, 2], [3, 4]]", "matrix"),
+    ("discrete", "a_{n} = 2*a_{n-1}, a_{0} = 1", "recurrence"),
+    ("discrete", "C(5, 2)", "combinatorics"),
+    ("discrete", "p && !q", "logic"),
+    ("discrete", "p ^ q", "logic"),
+    ("discrete", "p -> q", "logic"),
+    ("discrete", "a XOR b", "logic"),
+])
+def test_format(subject, query, fmt):
+    assert classify_query(subject, query).format == fmt
+
+def test_braced_exponent_parses_as_power():
+    import sympy
+    from server.solvers.utils.parse import parse_query
+
+    qc = classify_query("calc1", "x^{2}")
+    expr, warnings = parse_query("calc1", qc.query, {}, qc.format)
+    assert expr == sympy.Symbol("x") ** 2
+    assert not warnings
+
+@pytest.mark.parametrize("query", ["", "x +", "(x", "x__y", "x @ y"])
+def test_rejects(query):
+    with pytest.raises(InvalidQuery):
+        classify_query("calc1", query)
+
+def test_matrix_mode_needs_matrix():
+    with pytest.raises(InvalidQuery):
+        classify_query("la", "x^2", "det")
+
+@pytest.mark.parametrize("query, rewritten", [
+    ("p -> q", "Implies(p, q)"),
+    ("p & q => r", "Implies(p & q, r)"),
+    ("p -> q -> r", "Implies(p, Implies(q, r))"),
+    ("(p -> q) <-> r", "Equivalent((Implies(p, q)), r)"),
+    ("a XOR b", "a ^ b"),
+])
+def test_logic_rewrites(query, rewritten):
+    assert classify_query("discrete", query).query == rewritten
@@ -0,0 +1,88 @@
+import math
+
+import pytest
+import sympy
+from sympy.functions.combinatorial.numbers import stirling
+
+from server.solvers.discrete import CombinatoricsError, CombinatoricsEvaluator, do_combinatorics
+
+N = [0, 1, 2, 3, 7, 20, 52]
+NK = [(n, k) for n in N for k in (0, 1, 2, 3, n, n + 1)]
+PRIMES = [2, 7, 101, 1_000_000_007]
+
+def evaluate(text, mod=None):
+    return CombinatoricsEvaluator(mod).evaluate(text)
+
+@pytest.mark.parametrize("n, k", NK)
+def test_two_argument_functions(n, k):
+    assert evaluate(f"C({n},{k})") == sympy.binomial(n, k)
+    assert evaluate(f"P({n},{k})") == sympy.ff(n, k)
+    assert evaluate(f"S({n},{k})") == stirling(n, k, kind=2)
+    assert evaluate(f"s({n},{k})") == stirling(n, k, kind=1)
+
+@pytest.mark.parametrize("n", N)
+def test_unary_functions(n):
+    assert evaluate(f"{n}!") == sympy.factorial(n)
+    assert evaluate(f"catalan({n})") == sympy.catalan(n)
+    assert evaluate(f"bell({n})") == sympy.bell(n)
+    assert evaluate(f"D({n})") == sympy.subfactorial(n)
+
+@pytest.mark.parametrize("ks", [(0,), (3,), (2, 3), (1, 0, 4), (5, 5, 5)])
+def test_multinomial(ks):
+    args = ", ".join(map(str, ks))
+    assert evaluate(f"multinomial({args})") == sympy.factorial(sum(ks)) / sympy.prod(sympy.factorial(k) for k in ks)
+
+@pytest.mark.parametrize("m", PRIMES + [12, 1000])
+@pytest.mark.parametrize("text, exact", [
+    ("C(100,3)*P(20,5) + 5!", sympy.binomial(100, 3) * sympy.ff(20, 5) + 120),
+    ("C(1000,500)", sympy.binomial(1000, 500)),
+    ("catalan(40)", sympy.catalan(40)),
+    ("D(30)", sympy.subfactorial(30)),
+    ("30!", sympy.factorial(30)),
+    ("2^100 - 3", 2 ** 100 - 3),
+    ("10 % 4", 2),
+    ("C(20,10) % 1000 + 3^(20 % 7)", sympy.binomial(20, 10) % 1000 + 3 ** 6),
+])
+def test_modular(text, exact, m):
+    assert evaluate(text, m) == exact % m
+
+@pytest.mark.parametrize("m", PRIMES)
+def test_modular_division(m):
+    # C(10,3)/C(5,2) = 12, through the inverse of 10 where it exists
+    if m == 2:
+        with pytest.raises(CombinatoricsError):
+            evaluate("C(10,3)/C(5,2)", m)
+    else:
+        assert evaluate("C(10,3)/C(5,2)", m) == 12 % m
+
+def test_expression():
+    assert evaluate("C(100,3)*P(20,5) + 5!") == sympy.binomial(100, 3) * sympy.ff(20, 5) + 120
+
+@pytest.mark.parametrize("text", ["C(-1,2)", "7/2", "2^-1", "1/0", "foo(3)", "C(5)", "x + 1"])
+def test_rejects(text):
+    with pytest.raises(CombinatoricsError):
+        evaluate(text)
+
+def test_size_guard():
+    with pytest.raises(CombinatoricsError):
+        CombinatoricsEvaluator(max_bits=1000).evaluate("500!")
+    assert CombinatoricsEvaluator(101, max_bits=1000).evaluate("500!") == 0
+
+@pytest.mark.parametrize("n, k, m", [
+    (3000, 1400, 10**6),       # composite modulus: Legendre exponents, no inverses
+    (3000, 1400, 2 * 3 * 7**3),
+    (2500, 1200, 1009),        # prime modulus above n
+    (5000, 2400, 101),         # prime modulus below n: Lucas
+])
+def test_large_binomial_mod(n, k, m):
+    assert evaluate(f"C({n},{k})", m) == math.comb(n, k) % m
+
+def test_large_exact_binomial():
+    assert evaluate("C(3000,1400)") == math.comb(3000, 1400)
+    with pytest.raises(CombinatoricsError):
+        evaluate("C(4000000,2000000)")
+
+def test_response():
+    resp = do_combinatorics("C(10, 3)", {})
+    assert resp.ok and resp.result_latex == "120"
+    assert not do_combinatorics("C(10, 3)", {"mod": 1}).ok
@@ -0,0 +1,140 @@
+import random
+
+import numpy as np
+import pytest
+from sympy import Matrix, Rational, eye, latex, symbols, zeros
+
+from server.config import settings
+from server.solvers.linear_algebra import (
+    _from_numpy, _to_numpy, do_determinant, do_eigenvalues, do_nullspace, do_rref, domain_det, domain_nullspace,
+    domain_rref, numeric_nullspace, numeric_rref, rref_trace
+)
+
+def random_matrix(rng, rows, cols, rational=False, rank=None):
+    def entry():
+        if rational:
+            return Rational(rng.randint(-9, 9), rng.randint(1, 6))
+        return rng.randint(-9, 9)
+    M = Matrix(rows, cols, lambda i, j: entry())
+    if rank is not None:
+        # Rows past `rank` are combinations of the first ones
+        for i in range(rank, rows):
+            M[i, :] = sum((rng.randint(-3, 3) * M[j, :] for j in range(rank)), zeros(1, cols))
+    return M
+
+rng = random.Random(11)
+MATRICES = [
+    Matrix([[0]]),
+    Matrix([[5]]),
+    Matrix([[1, 2], [3, 4]]),
+    Matrix([[1, 2], [2, 4]]),
+    Matrix([[0, 0], [0, 0]]),
+    Matrix([[0, 1], [1, 0]]),
+    Matrix([[0, 0, 3], [0, 2, 0], [1, 0, 0]]),
+    Matrix([[1, 2, 3]]),
+    Matrix([[1], [2], [3]]),
+    Matrix([[Rational(1, 2), Rational(1, 3)], [Rational(1, 4), Rational(1, 6)]]),
+    Matrix([[Rational(-2, 3), 1, 0], [4, Rational(5, 7), -1]]),
+    eye(4),
+    Matrix(4, 4, lambda i, j: Rational(1, i + j + 1)),  # Hilbert
+]
+MATRICES += [random_matrix(rng, r, c) for r, c in [(3, 3), (4, 4), (3, 5), (5, 3), (6, 6)]]
+MATRICES += [random_matrix(rng, r, c, rational=True) for r, c in [(3, 3), (4, 4), (2, 4), (5, 2)]]
+MATRICES += [random_matrix(rng, r, c, rational=r % 2 == 0, rank=k) for r, c, k in [(4, 4, 2), (5, 5, 3), (4, 6, 1), (6, 4, 2)]]
+
+SQUARE = [M for M in MATRICES if M.is_square]
+# Past LA_TRACE_COALESCE_SIZE, so the trace is logged per pivot
+TRACED = MATRICES + [random_matrix(rng, 8, 7), random_matrix(rng, 8, 8, rational=True, rank=5)]
+
+@pytest.mark.parametrize("M", MATRICES, ids=str)
+def test_rref(M):
+    expected, pivots = M.rref()
+    assert domain_rref(M) == (expected, pivots)
+
+@pytest.mark.parametrize("M", SQUARE, ids=str)
+def test_det(M):
+    assert domain_det(M) == M.det()
+
+@pytest.mark.parametrize("M", MATRICES, ids=str)
+def test_nullspace(M):
+    basis = domain_nullspace(M)
+    assert basis == M.nullspace()
+    for v in basis:
+        assert M * v == zeros(M.rows, 1)
+
+@pytest.mark.parametrize("M", MATRICES, ids=str)
+def test_rref_trace(M):
+    expected, pivots = M.rref()
+    R, trace_pivots, ops, K = rref_trace(M)
+    assert (R, trace_pivots) == (expected, pivots)
+    # Replaying the logged row deltas ends at the RREF
+    state = [list(M.row(i)) for i in range(M.rows)]
+    for op in ops:
+        for i, row in op.delta.items():
+            state[i] = [K.to_sympy(a) for a in row]
+    assert Matrix(state) == expected
+
+@pytest.mark.parametrize("M", TRACED, ids=str)
+def test_traced_rref_steps(M):
+    resp = do_rref(M, {"trace": True})
+    payload = resp.model_dump()
+    # Snapshots render row by row through the memo, exactly as SymPy prints the matrix
+    for step, data in zip(resp.steps[1:-1], payload["steps"][1:-1]):
+        assert data["after_latex"] == latex(step._after.to_matrix())
+    if resp.steps[1:-1]:
+        assert resp.steps[-2]._after.to_matrix() == M.rref()[0]
+    coalesced = max(M.shape) > settings.LA_TRACE_COALESCE_SIZE
+    assert all(s.rule.startswith("Pivot on R") == coalesced for s in resp.steps[1:-1])
+
+@pytest.mark.parametrize("M", MATRICES, ids=str)
+def test_numeric_rref(M):
+    expected, pivots = M.rref()
+    R, numeric_pivots = numeric_rref(_to_numpy(M))
+    assert numeric_pivots == pivots
+    assert np.allclose(R, np.array(expected.tolist(), dtype=float))
+
+@pytest.mark.parametrize("M", MATRICES, ids=str)
+def test_numeric_nullspace(M):
+    A = _to_numpy(M)
+    N = numeric_nullspace(A)
+    assert N.shape == (M.cols, len(M.nullspace()))
+    assert np.allclose(A @ N, 0)
+    assert np.allclose(N.T @ N, np.eye(N.shape[1]))
+
+@pytest.mark.parametrize("M, engine", [
+    (Matrix([[1, 2], [3, 4]]), "exact"),
+    (Matrix([[Rational(1, 2), 1], [3, 4]]), "exact"),
+    (Matrix([[1.5, 2], [3, 4]]), "numeric"),
+])
+def test_engine_choice(M, engine):
+    resp = do_determinant(M, {})
+    assert resp.ok
+    assert resp.steps[-1].meta["engine"] == engine
+
+def test_symbolic_entries_stay_exact():
+    a = symbols("a")
+    M = Matrix([[a, 1], [1, a]])
+    resp = do_determinant(M, {"engine": "numeric"})
+    assert resp.ok and "symbolic entries" in resp.warnings[0]
+    assert do_nullspace(M, {}).ok
+
+@pytest.mark.parametrize("arr", [
+    np.array([[1.5, -2.25, 1234567.0], [3e9, 0.125, -7.0]]),
+    np.array([[1 + 2j, 3 - 1j], [-1j, 2 + 0j]]),
+], ids=["real", "complex"])
+def test_numeric_matrix_output(arr):
+    out = _from_numpy(arr, 6)
+    assert out.to_matrix() == Matrix(arr).evalf(6)
+    if not np.iscomplexobj(arr):
+        assert latex(out) == latex(Matrix(arr).evalf(6))
+
+def test_numeric_eigenvectors_one_step():
+    M = Matrix(5, 5, lambda i, j: Rational(3, 2) * ((i * 7 + j * 3) % 5 - 2))
+    resp = do_eigenvalues(M, {"engine": "numeric"})
+    assert resp.ok and [s.rule for s in resp.steps][-1] == "Eigenvector matrix"
+    V = np.array(resp.steps[-1]._after.to_matrix().evalf().tolist(), dtype=complex)
+    A = _to_numpy(M)
+    vals = np.diag(np.linalg.solve(V, A @ V))
+    assert np.allclose(A @ V, V * vals, atol=1e-4)
+    rounded = np.round(vals, 4)
+    assert list(rounded) == sorted(rounded, key=lambda z: (z.real, z.imag))
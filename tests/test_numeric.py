@@ -0,0 +1,52 @@
+import pytest
+from sympy import Rational, S, cos, exp, log, oo, pi, sin, sqrt, symbols
+
+from server.solvers.calculus import do_integral
+from server.solvers.utils.numeric import disagrees, quad_estimate
+
+x = symbols("x")
+
+@pytest.mark.parametrize("expr, lower, upper, value", [
+    (1 / sqrt(x), 0, 1, 2),
+    (log(x), 0, 1, -1),
+    (x**-2, 1, oo, 1),
+    (exp(-x**2), -oo, oo, sqrt(pi)),
+    (1 / (1 + x**2), -oo, oo, pi),
+    (sin(x) / x, 0, oo, pi / 2),
+    (sin(x) / x, -oo, oo, pi),
+    (sin(x)**2 / x**2, 0, oo, pi / 2),
+    (cos(3 * x) / (1 + x**2), 0, oo, pi / (2 * exp(3))),
+    (exp(x), 0, 100, exp(100) - 1),
+])
+def test_convergent(expr, lower, upper, value):
+    value = S(value)
+    estimate = quad_estimate(expr, x, S(lower), S(upper))
+    assert estimate.converged and not estimate.diverged
+    assert not disagrees(value, estimate)
+    assert disagrees(value * (1 + Rational(1, 10**6)), estimate)
+
+@pytest.mark.parametrize("expr, lower, upper", [
+    (x**-2, -1, 1),
+    (1 / x, 0, 1),
+    (1 / x, 1, oo),
+    (x**2, 0, oo),
+    (sin(x), 0, oo),
+    (1 / (x - 1), 1, 2),
+])
+def test_divergent(expr, lower, upper):
+    estimate = quad_estimate(expr, x, S(lower), S(upper))
+    assert estimate.diverged and not estimate.converged
+    assert disagrees(S(5), estimate)
+    assert estimate.meta()["converged"] is False
+
+def test_unresolved_oscillation():
+    # sin(x^2) converges to sqrt(pi/8), but not at a frequency quadosc can follow
+    estimate = quad_estimate(sin(x**2), x, S(0), oo)
+    assert not estimate.converged and not estimate.diverged
+    assert not disagrees(sqrt(pi / 8), estimate)
+
+def test_divergent_integral_response():
+    resp = do_integral(x**-2, {"definite": True, "lower": -1, "upper": 1, "numeric": "numeric"})
+    assert resp.ok
+    assert any("diverge" in w for w in resp.warnings)
+    assert resp.steps[-1].meta["diverged"] is True
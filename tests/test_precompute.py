@@ -0,0 +1,18 @@
+from server.solvers.utils import budget
+from server.precompute import PrecomputedStore, build, load_examples, request_key
+from server.solvers.utils.classify import classify_query
+
+def test_examples_keep_options(tmp_path, monkeypatch):
+    # As under the precompute CLI, which runs the solves on its main thread
+    monkeypatch.setattr(budget, "_interrupts", True)
+    example = next(r for r in load_examples() if r.mode == "limit")
+    assert example.options == {"point": "oo"}
+
+    db = str(tmp_path / "precomputed.sqlite")
+    assert build(db, [example])["solved"] == 1
+    store = PrecomputedStore(db)
+    qc = classify_query(example.subject, example.query, example.mode)
+    resp = store.get(request_key(example.subject, qc.mode, example.options, qc.format, qc.query))
+    assert resp is not None and resp.steps[-1].after_latex == "3" and not resp.warnings
+    # The same query without the option is a different request
+    assert store.get(request_key(example.subject, qc.mode, {}, qc.format, qc.query)) is None
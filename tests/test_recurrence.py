@@ -0,0 +1,90 @@
+import pytest
+import sympy
+from sympy import Rational, Symbol
+
+from server.solvers.discrete import (
+    closed_form, do_recurrence, nth_term_iterative, nth_term_matrix, parse_recurrence
+)
+from server.solvers.utils.steps import StepLogger
+
+k = Symbol("k", integer=True)
+
+# (query, closed form in k that SymPy agrees with, first index with a value)
+LINEAR = [
+    ("a(n) = a(n-1) + a(n-2), a(0) = 0, a(1) = 1", sympy.fibonacci(k), 0),
+    ("a_{n} = a_{n-1} + a_{n-2}, a_{0} = 2, a_{1} = 1", sympy.lucas(k), 0),
+    ("a(n) = 2a(n-1) + 1, a(0) = 0", 2 ** k - 1, 0),
+    ("a(n) = a(n-1) + n, a(0) = 0", k * (k + 1) / 2, 0),
+    ("a(n) = 3a(n-1) + 2^n, a(1) = 1", 5 * 3 ** (k - 1) - 2 ** (k + 1), 1),
+    ("a(n) = 4a(n-1) - 4a(n-2), a(0) = 1, a(1) = 4", (k + 1) * 2 ** k, 0),
+    ("a(n) = a(n-1)/2 + 1, a(0) = 0", 2 - Rational(1, 2) ** (k - 1), 0),
+    ("a(n+1) = 5a(n), a(2) = 1", 5 ** (k - 2), 2),
+]
+
+def exact(value):
+    return Rational(value.numerator, value.denominator) if hasattr(value, "denominator") else value
+
+@pytest.mark.parametrize("query, expected, first", LINEAR)
+def test_terms(query, expected, first):
+    rec = parse_recurrence(query)
+    for N in [first, first + 1, first + 2, first + 7, 60, 250]:
+        want = expected.subs(k, N)
+        assert exact(nth_term_iterative(rec, N, None, StepLogger())) == want
+        assert exact(nth_term_matrix(rec, N, None, StepLogger())) == want
+
+@pytest.mark.parametrize("query, expected, first", LINEAR)
+def test_closed_form(query, expected, first):
+    rec = parse_recurrence(query)
+    solution = closed_form(rec, StepLogger(), [])
+    assert solution is not None
+    for N in range(first, first + 10):
+        assert sympy.simplify(solution.subs(rec.n, N) - expected.subs(k, N)) == 0
+
+@pytest.mark.parametrize("m", [2, 7, 1_000_000_007])
+@pytest.mark.parametrize("query, expected, first", [case for case in LINEAR if "/" not in case[0]])
+def test_modular_terms(query, expected, first, m):
+    rec = parse_recurrence(query)
+    for N in [first, first + 5, 500]:
+        want = int(expected.subs(k, N)) % m
+        assert nth_term_iterative(rec, N, m, StepLogger()) == want
+        assert nth_term_matrix(rec, N, m, StepLogger()) == want
+
+def test_nonlinear_iterates():
+    rec = parse_recurrence("a(n) = n a(n-1), a(0) = 1")
+    assert rec.coeffs is None
+    assert nth_term_iterative(rec, 30, None, StepLogger()) == sympy.factorial(30)
+    rec = parse_recurrence("a(n) = a(n-1)^2 - 2, a(0) = 4")
+    # a(n) = (2 + √3)^(2^n) + (2 - √3)^(2^n)
+    root3 = sympy.sqrt(3)
+    assert nth_term_iterative(rec, 5, None, StepLogger()) == ((2 + root3) ** 32 + (2 - root3) ** 32).expand()
+
+def test_iteration_cache_keys_on_start():
+    first = parse_recurrence("a(n) = n a(n-1), a(0) = 1")
+    later = parse_recurrence("a(n) = n a(n-1), a(3) = 1")
+    assert nth_term_iterative(first, 12, None, StepLogger()) == sympy.factorial(12)
+    assert nth_term_iterative(later, 10, None, StepLogger()) == sympy.factorial(10) / sympy.factorial(3)
+    # Resuming from the cache gives the same values as a fresh run
+    assert nth_term_iterative(first, 20, None, StepLogger()) == sympy.factorial(20)
+
+def test_before_initial_values():
+    rec = parse_recurrence("a(n) = 2a(n-1), a(3) = 1")
+    assert nth_term_iterative(rec, 3, None, StepLogger()) == 1
+    assert nth_term_iterative(rec, 1, None, StepLogger()) is None
+    assert not do_recurrence("a(n) = 2a(n-1), a(3) = 1", {"term": 1}).ok
+
+@pytest.mark.parametrize("query", [
+    "a(n) = a(n-1) + a(n-2), a(0) = 0",  # too few initial values for a term
+    "a(n) = a(n-1) + a(n-2), a(0) = 0, a(2) = 1",  # not consecutive
+])
+def test_bad_initial_values(query):
+    assert not do_recurrence(query, {"term": 10}).ok
+
+@pytest.mark.parametrize("query", ["a(n) = 2", "a(n) = b(n-1)", "a(n) = a(n/2) + 1", "a(n) = a(n-1), b(n) = b(n-1)"])
+def test_parse_rejects(query):
+    with pytest.raises(ValueError):
+        parse_recurrence(query)
+
+def test_response():
+    resp = do_recurrence("a(n) = a(n-1) + a(n-2), a(0) = 0, a(1) = 1", {"term": 10 ** 6, "mod": 1_000_000_007})
+    assert resp.ok
+    assert resp.result_latex == str(sympy.fibonacci(10 ** 6) % 1_000_000_007)